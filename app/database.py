@@ -1,13 +1,18 @@
 """
 Database configuration and session management
 """
+import logging
 import os
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
 # Get database URL from environment or use SQLite by default
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./regex_generator.db")
 
+# Initialize logger
+logger = logging.getLogger(__name__)
+
 # Create async engine
 engine = create_async_engine(DATABASE_URL, echo=False)
 
@@ -18,10 +23,42 @@ class Base(DeclarativeBase):
     """Base class for SQLAlchemy models"""
     pass
 
+# Columns added to tables that existed before them, as (table, column).
+# create_all only creates missing tables, so databases from older versions
+# get these added on startup.
+ADDED_COLUMNS = [
+    ("regex_patterns", "redos_score"),
+    ("regex_requests", "input_hash"),
+    ("regex_requests", "result_flags"),
+]
+
+def add_missing_columns(conn) -> None:
+    """
+    Add ADDED_COLUMNS that are missing from existing tables, with their indexes
+    
+    Args:
+        conn: Synchronous connection inside a transaction
+    """
+    inspector = inspect(conn)
+    for table_name, column_name in ADDED_COLUMNS:
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        if column_name in existing:
+            continue
+        
+        table = Base.metadata.tables[table_name]
+        column = table.c[column_name]
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+        for index in table.indexes:
+            if column_name in index.columns:
+                index.create(conn, checkfirst=True)
+        logger.info(f"Added column {table_name}.{column_name}")
+
 async def create_db_and_tables():
-    """Create database tables if they don't exist"""
+    """Create database tables if they don't exist and add columns added since"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
 
 async def get_session() -> AsyncSession:
     """Dependency for getting database session"""
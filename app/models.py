@@ -3,7 +3,7 @@ SQLAlchemy ORM models for the application
 """
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Float
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.database import Base
@@ -17,12 +17,14 @@ class RegexPattern(Base):
     pattern: Mapped[str] = mapped_column(Text)
     sample_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    redos_score: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     test_cases: Mapped[List["TestCase"]] = relationship("TestCase", back_populates="regex_pattern", cascade="all, delete-orphan")
     requests: Mapped[List["RegexRequest"]] = relationship("RegexRequest", back_populates="result_pattern")
+    benchmarks: Mapped[List["PatternBenchmark"]] = relationship("PatternBenchmark", back_populates="regex_pattern", cascade="all, delete-orphan")
     
     def __repr__(self) -> str:
         return f"<RegexPattern id={self.id} name={self.name}>"
@@ -35,6 +37,8 @@ class RegexRequest(Base):
     description: Mapped[str] = mapped_column(Text)
     sample_text: Mapped[str] = mapped_column(Text)
     expected_matches: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    input_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    result_flags: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     # Foreign keys
@@ -46,6 +50,27 @@ class RegexRequest(Base):
     def __repr__(self) -> str:
         return f"<RegexRequest id={self.id}>"
 
+class GenerationJob(Base):
+    """Model for storing queued regex generation jobs"""
+    __tablename__ = "generation_jobs"
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), default="queued", index=True)
+    description: Mapped[str] = mapped_column(Text)
+    sample_text: Mapped[str] = mapped_column(Text)
+    expected_matches: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    bypass_cache: Mapped[bool] = mapped_column(Boolean, default=False)
+    candidates: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<GenerationJob id={self.id} status={self.status}>"
+
 class TestCase(Base):
     """Model for storing test cases for regex patterns"""
     __tablename__ = "test_cases"
@@ -61,4 +86,24 @@ class TestCase(Base):
     regex_pattern: Mapped[RegexPattern] = relationship("RegexPattern", back_populates="test_cases")
     
     def __repr__(self) -> str:
-        return f"<TestCase id={self.id} should_match={self.should_match}>"
\ No newline at end of file
+        return f"<TestCase id={self.id} should_match={self.should_match}>"
+
+class PatternBenchmark(Base):
+    """Model for storing match-time scaling benchmarks of regex patterns"""
+    __tablename__ = "pattern_benchmarks"
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
+    pattern: Mapped[str] = mapped_column(Text)
+    growth_class: Mapped[str] = mapped_column(String(20))
+    exponent: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    timings: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    # Foreign keys
+    regex_pattern_id: Mapped[int] = mapped_column(Integer, ForeignKey("regex_patterns.id"))
+    
+    # Relationships
+    regex_pattern: Mapped[RegexPattern] = relationship("RegexPattern", back_populates="benchmarks")
+    
+    def __repr__(self) -> str:
+        return f"<PatternBenchmark id={self.id} growth_class={self.growth_class}>"
\ No newline at end of file
@@ -2,7 +2,7 @@
 API routes for regex patterns
 """
 import logging
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -10,7 +10,10 @@ from app.database import get_session
 from app.schemas import (
     RegexPatternCreate,
     RegexPatternResponse,
-    TestCaseResponse
+    TestCaseResponse,
+    LibraryScanRequest,
+    LibraryScanResponse,
+    PatternBenchmarkResponse
 )
 from app.services.db_service import (
     create_pattern,
@@ -18,8 +21,12 @@ from app.services.db_service import (
     get_patterns,
     update_pattern,
     delete_pattern,
-    get_test_cases
+    get_test_cases,
+    create_benchmark,
+    get_benchmarks
 )
+from app.services.library_service import scan_library
+from app.services.benchmark_service import benchmark_pattern
 
 # Initialize router
 router = APIRouter()
@@ -49,17 +56,50 @@ async def create_regex_pattern(
         logger.exception("Error creating pattern")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/scan", response_model=LibraryScanResponse)
+async def scan_patterns(
+    request: LibraryScanRequest,
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Report which saved patterns match a text, and where
+    """
+    try:
+        result = await scan_library(
+            db,
+            request.text,
+            include_spans=request.include_spans,
+            timeout=request.timeout
+        )
+        if not result["success"]:
+            return LibraryScanResponse(
+                status="error",
+                timed_out=result.get("timed_out", False),
+                message=result["error"]
+            )
+        
+        return LibraryScanResponse(
+            status="success",
+            pattern_ids=[match["pattern_id"] for match in result["matches"]],
+            matches=result["matches"]
+        )
+    
+    except Exception as e:
+        logger.exception("Error scanning pattern library")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("", response_model=List[RegexPatternResponse])
 async def read_patterns(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    max_risk: Optional[int] = Query(None, ge=0, le=100, description="Only patterns with a ReDoS risk score at or below this"),
     db: AsyncSession = Depends(get_session)
 ):
     """
     Get all regex patterns with pagination
     """
     try:
-        patterns = await get_patterns(db, skip=skip, limit=limit)
+        patterns = await get_patterns(db, skip=skip, limit=limit, max_redos_score=max_risk)
         return patterns
     
     except Exception as e:
@@ -159,4 +199,67 @@ async def read_pattern_test_cases(
     
     except Exception as e:
         logger.exception("Error getting test cases")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{pattern_id}/benchmark", response_model=PatternBenchmarkResponse)
+async def benchmark_regex_pattern(
+    pattern_id: int = Path(..., gt=0),
+    max_size: int = Query(65536, ge=64, le=1 << 20, description="Largest synthetic input length"),
+    budget: float = Query(5.0, gt=0, le=30, description="Total time budget in seconds"),
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Measure how a pattern's match time grows with input size and store the result
+    """
+    try:
+        pattern = await get_pattern(db, pattern_id)
+        if pattern is None:
+            raise HTTPException(status_code=404, detail="Pattern not found")
+        
+        result = await benchmark_pattern(
+            pattern.pattern,
+            sample_text=pattern.sample_text,
+            max_size=max_size,
+            budget=budget
+        )
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["error"])
+        
+        return await create_benchmark(
+            db,
+            regex_pattern_id=pattern_id,
+            pattern=pattern.pattern,
+            growth_class=result["growth_class"],
+            exponent=result["exponent"],
+            timings=result["timings"]
+        )
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        logger.exception("Error benchmarking pattern")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{pattern_id}/benchmarks", response_model=List[PatternBenchmarkResponse])
+async def read_pattern_benchmarks(
+    pattern_id: int = Path(..., gt=0),
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Get all benchmarks for a pattern, newest first
+    """
+    try:
+        # Check if pattern exists
+        pattern = await get_pattern(db, pattern_id)
+        if pattern is None:
+            raise HTTPException(status_code=404, detail="Pattern not found")
+        
+        return await get_benchmarks(db, pattern_id)
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        logger.exception("Error getting benchmarks")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,15 +1,31 @@
 """
 API routes for regex generation
 """
+import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, AsyncIterator, Dict
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
-from app.schemas import RegexGenerateRequest, RegexGenerateResponse
-from app.services.ai_service import generate_regex_with_ai
-from app.services.regex_service import test_regex
-from app.services.db_service import create_pattern, create_request, create_test_case
+from app.models import GenerationJob
+from app.schemas import (
+    RegexGenerateRequest,
+    RegexGenerateResponse,
+    RegexBatchGenerateRequest,
+    RegexBatchGenerateResponse,
+    GenerationJobResponse
+)
+from app.services.generation_service import (
+    generate_regex_pattern,
+    generate_regex_batch,
+    stream_generation,
+    GENERATION_BATCH_MAX_ITEMS
+)
+from app.services.job_service import job_queue, job_result
+from app.services.ai_service import ai_breaker
+from app.services.db_service import invalidate_cached_requests
 
 # Initialize router
 router = APIRouter()
@@ -17,6 +33,19 @@ router = APIRouter()
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+def _generation_response(result: Dict[str, Any]) -> RegexGenerateResponse:
+    """Build the response for a successful generation result"""
+    return RegexGenerateResponse(
+        status="success",
+        pattern=result["pattern"],
+        pattern_id=result["pattern_id"],
+        explanation=result["explanation"],
+        test_result=result["test_result"],
+        flags=result["flags"],
+        test_cases=result["test_cases"],
+        source=result["source"]
+    )
+
 @router.post("/generate", response_model=RegexGenerateResponse)
 async def generate_regex(
     request: RegexGenerateRequest,
@@ -24,70 +53,179 @@ async def generate_regex(
 ):
     """
     Generate a regex pattern using AI based on the provided information
+    
+    Identical requests (after normalization) reuse the stored pattern until
+    GENERATION_CACHE_TTL expires; set bypass_cache to force a new generation.
     """
     try:
-        # Generate regex with AI
-        result = await generate_regex_with_ai(
-            request.description,
-            request.sample_text,
-            request.expected_matches
-        )
-        
-        # Create regex request in database
-        db_request = await create_request(
-            db,
-            description=request.description,
-            sample_text=request.sample_text,
-            expected_matches=request.expected_matches
-        )
-        
-        # Create pattern name
-        pattern_name = request.description[:50] + "..." if len(request.description) > 50 else request.description
-        
-        # Create pattern in database
-        db_pattern = await create_pattern(
+        result = await generate_regex_pattern(
             db,
-            name=pattern_name,
-            pattern=result["pattern"],
-            sample_text=request.sample_text,
-            description=result["explanation"]
-        )
-        
-        # Update request with pattern ID
-        db_request.result_pattern_id = db_pattern.id
-        db.add(db_request)
-        await db.commit()
-        
-        # Create test cases
-        for test_case in result.get("test_cases", []):
-            if isinstance(test_case, dict) and "text" in test_case and "should_match" in test_case:
-                await create_test_case(
-                    db,
-                    regex_pattern_id=db_pattern.id,
-                    test_text=test_case["text"],
-                    should_match=test_case["should_match"]
-                )
-        
-        # Test the pattern against the sample text
-        test_result = await test_regex(
-            result["pattern"],
+            request.description,
             request.sample_text,
-            result.get("flags", "")
+            request.expected_matches,
+            bypass_cache=request.bypass_cache,
+            candidates=request.candidates
         )
         
         # Return response
+        return _generation_response(result)
+    
+    except Exception as e:
+        logger.exception("Error generating regex")
         return RegexGenerateResponse(
+            status="error",
+            message=str(e)
+        )
+
+@router.post("/generate/batch", response_model=RegexBatchGenerateResponse)
+async def batch_generate_regex(
+    request: RegexBatchGenerateRequest,
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Generate regex patterns for several requests concurrently
+    
+    Items are generated in parallel, paced by the provider rate limits
+    (OPENAI_RPM, OPENAI_TPM), and stored in one transaction. Each result
+    carries its own status, so one failing item doesn't fail the batch.
+    """
+    if len(request.items) > GENERATION_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can have at most {GENERATION_BATCH_MAX_ITEMS} items"
+        )
+    
+    try:
+        results = await generate_regex_batch(db, [item.model_dump() for item in request.items])
+        return RegexBatchGenerateResponse(
             status="success",
-            pattern=result["pattern"],
-            pattern_id=db_pattern.id,
-            explanation=result["explanation"],
-            test_result=test_result,
-            flags=result.get("flags", "")
+            results=[
+                _generation_response(result) if result["status"] == "success"
+                else RegexGenerateResponse(status="error", message=result["message"])
+                for result in results
+            ]
         )
     
     except Exception as e:
-        logger.exception("Error generating regex")
-        return RegexGenerateResponse(
+        logger.exception("Error generating regex batch")
+        return RegexBatchGenerateResponse(
             status="error",
             message=str(e)
-        )
\ No newline at end of file
+        )
+
+async def _format_ndjson(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Serialize records as newline-delimited JSON"""
+    async for record in records:
+        yield json.dumps(record) + "\n"
+
+async def _format_sse(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Serialize records as server-sent events named after the record type"""
+    async for record in records:
+        yield f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+
+STREAM_FORMATS = {
+    "ndjson": (_format_ndjson, "application/x-ndjson"),
+    "sse": (_format_sse, "text/event-stream"),
+}
+
+@router.post("/generate/stream")
+async def generate_regex_stream(
+    request: RegexGenerateRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """
+    Generate a regex pattern, streaming fields of the AI response as NDJSON
+    or server-sent events
+    
+    A "field" record is sent as soon as each field of the response is
+    complete, so the pattern can be tried while the explanation and test
+    cases are still arriving. A final "done" record carries the test result
+    and the ID of the stored pattern; failures end with an "error" record.
+    The AI response is streamed from a single call, so candidates is ignored.
+    """
+    formatter, media_type = STREAM_FORMATS[format]
+    records = stream_generation(
+        request.description,
+        request.sample_text,
+        request.expected_matches,
+        bypass_cache=request.bypass_cache
+    )
+    return StreamingResponse(formatter(records), media_type=media_type)
+
+def _job_response(job: GenerationJob) -> GenerationJobResponse:
+    """Build the response describing a job and, once it succeeded, its result"""
+    result = job_result(job)
+    return GenerationJobResponse(
+        status="success",
+        job_id=job.id,
+        job_status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=_generation_response(result) if result is not None else None,
+        message=job.error
+    )
+
+@router.post("/generate/jobs", response_model=GenerationJobResponse, status_code=202)
+async def submit_generation_job(request: RegexGenerateRequest):
+    """
+    Queue a regex generation and return its job ID right away
+    
+    Background workers process queued jobs GENERATION_WORKERS at a time;
+    poll GET /generate/jobs/{job_id} (optionally with wait) for the result.
+    """
+    try:
+        job = await job_queue.submit(
+            request.description,
+            request.sample_text,
+            request.expected_matches,
+            bypass_cache=request.bypass_cache,
+            candidates=request.candidates
+        )
+        return _job_response(job)
+    
+    except Exception as e:
+        logger.exception("Error queueing regex generation")
+        return GenerationJobResponse(
+            status="error",
+            message=str(e)
+        )
+
+@router.get("/generate/jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: int = Path(..., gt=0),
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish (long polling)")
+):
+    """
+    Get the status of a generation job, and its result once it succeeded
+    
+    With wait, the response is delayed until the job finishes or the wait
+    expires. No database session is held while waiting.
+    """
+    job = await job_queue.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    return _job_response(job)
+
+@router.delete("/generate/cache")
+async def clear_generation_cache(db: AsyncSession = Depends(get_session)):
+    """
+    Stop reusing all stored generations
+    """
+    try:
+        invalidated = await invalidate_cached_requests(db)
+        return {"status": "success", "invalidated": invalidated}
+    
+    except Exception as e:
+        logger.exception("Error clearing generation cache")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/generate/breaker")
+async def get_generation_breaker():
+    """
+    Get the state of the AI provider circuit breaker
+    
+    Reports whether calls go through (closed), fail fast (open) or wait for
+    a probe (half_open), the current adaptive timeout and recent latencies.
+    """
+    return {"status": "success", "breaker": ai_breaker.stats()}
@@ -1,11 +1,30 @@
 """
 API routes for regex testing
 """
+import os
+import json
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
+import tempfile
+from typing import Any, Dict, Iterator, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.schemas import RegexTestRequest, RegexTestResponse
-from app.services.regex_service import test_regex
+from app.schemas import (
+    RegexTestRequest,
+    RegexTestResponse,
+    RegexBatchTestRequest,
+    RegexBatchTestResponse,
+    RegexFileTestResponse
+)
+from app.services.regex_service import (
+    test_regex_cached,
+    regex_test_key,
+    test_regex_batch,
+    test_regex_file,
+    iter_regex_matches
+)
+from app.services.live_session import LiveSession, handle_live_message
 
 # Initialize router
 router = APIRouter()
@@ -13,20 +32,70 @@ router = APIRouter()
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Maximum accepted upload size for file-based testing (bytes)
+REGEX_UPLOAD_MAX_BYTES = int(os.environ.get("REGEX_UPLOAD_MAX_BYTES", str(1 << 30)))
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an entity tag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
 @router.post("/test", response_model=RegexTestResponse)
-async def test_regex_endpoint(request: RegexTestRequest):
+async def test_regex_endpoint(
+    request: RegexTestRequest,
+    response: Response,
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Test a regex pattern against text and return match information
+    
+    Successful responses carry an ETag derived from the request content.
+    Sending it back in If-None-Match yields a 304 without re-evaluating.
     """
     try:
-        # Test the pattern
-        result = await test_regex(
+        compact = request.match_format == "compact"
+        key = regex_test_key(
+            request.pattern,
+            request.test_text,
+            request.flags,
+            offset=request.offset,
+            max_matches=request.max_matches,
+            count_only=request.count_only,
+            compact=compact
+        )
+        etag = f'"{key[:32]}"'
+        
+        # The result is a pure function of the content, so a known tag is current
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        # Test the pattern, sharing identical evaluations in flight
+        result = await test_regex_cached(
             request.pattern,
             request.test_text,
-            request.flags
+            request.flags,
+            timeout=request.timeout,
+            offset=request.offset,
+            max_matches=request.max_matches,
+            count_only=request.count_only,
+            compact=compact,
+            key=key
         )
+        headers = {"ETag": etag} if result.get("success") else {}
+        
+        # Compact results are plain lists of ints; skip model validation
+        if compact:
+            return JSONResponse(content={"status": "success", "result": result, "message": None}, headers=headers)
         
         # Return response
+        response.headers.update(headers)
         return RegexTestResponse(
             status="success",
             result=result
@@ -39,10 +108,180 @@ async def test_regex_endpoint(request: RegexTestRequest):
             message=str(e)
         )
 
+@router.post("/test/batch", response_model=RegexBatchTestResponse)
+async def test_regex_batch_endpoint(request: RegexBatchTestRequest):
+    """
+    Test many patterns against many texts in one call
+    
+    Each pattern is compiled once; the result is a matrix of match counts
+    and spans with one row per pattern and one cell per text. Errors are
+    reported per row (invalid pattern) or per cell (timeout).
+    """
+    try:
+        results = await test_regex_batch(
+            [(spec.pattern, spec.flags) for spec in request.patterns],
+            request.texts,
+            include_spans=request.include_spans,
+            timeout=request.timeout
+        )
+        
+        return RegexBatchTestResponse(
+            status="success",
+            results=results
+        )
+    
+    except Exception as e:
+        logger.exception("Error running batch regex test")
+        return RegexBatchTestResponse(
+            status="error",
+            message=str(e)
+        )
+
+@router.post("/test/upload", response_model=RegexFileTestResponse)
+async def test_regex_upload_endpoint(
+    request: Request,
+    pattern: str = Query(..., description="The regex pattern to test"),
+    flags: str = Query("", description="Regex flags (i, m, s, x)"),
+    offset: int = Query(0, ge=0, description="Byte position to start matching from"),
+    max_matches: Optional[int] = Query(1000, ge=1, description="Maximum number of matches to return"),
+    timeout: Optional[float] = Query(None, gt=0, le=60, description="Wall-clock budget in seconds")
+):
+    """
+    Test a regex pattern against a raw uploaded file
+    
+    The request body is streamed to a temporary file, which is then
+    memory-mapped and matched with a bytes pattern. Results carry byte
+    offsets and line numbers.
+    """
+    fd, path = tempfile.mkstemp(prefix="regex-upload-")
+    try:
+        received = 0
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > REGEX_UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail="Uploaded file is too large")
+                f.write(chunk)
+        
+        result = await test_regex_file(
+            path,
+            pattern,
+            flags,
+            timeout=timeout,
+            offset=offset,
+            max_matches=max_matches
+        )
+        
+        return RegexFileTestResponse(
+            status="success",
+            result=result
+        )
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        logger.exception("Error testing regex against uploaded file")
+        return RegexFileTestResponse(
+            status="error",
+            message=str(e)
+        )
+    
+    finally:
+        os.unlink(path)
+
+def _format_ndjson(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Serialize records as newline-delimited JSON"""
+    for record in records:
+        yield json.dumps(record) + "\n"
+
+def _format_sse(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Serialize records as server-sent events named after the record type"""
+    for record in records:
+        yield f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+
+STREAM_FORMATS = {
+    "ndjson": (_format_ndjson, "application/x-ndjson"),
+    "sse": (_format_sse, "text/event-stream"),
+}
+
+@router.post("/test/stream")
+async def test_regex_stream_endpoint(
+    request: RegexTestRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """
+    Test a regex pattern and stream matches as NDJSON or server-sent events
+    
+    Matches are sent as they are found, followed by a summary record with
+    the totals. The generator is synchronous, so Starlette iterates it on a
+    worker thread while the regex module releases the GIL.
+    """
+    formatter, media_type = STREAM_FORMATS[format]
+    records = iter_regex_matches(
+        request.pattern,
+        request.test_text,
+        request.flags,
+        timeout=request.timeout,
+        offset=request.offset,
+        max_matches=request.max_matches
+    )
+    return StreamingResponse(formatter(records), media_type=media_type)
+
+@router.websocket("/live")
+async def live_regex_session(websocket: WebSocket):
+    """
+    Live testing session over a WebSocket
+    
+    The server keeps the compiled pattern and the current text. Clients send
+    JSON messages: {"type": "pattern", "pattern", "flags"} and
+    {"type": "text", "text"} answer with a "reset" carrying all matches;
+    {"type": "edit", "start", "end", "text"} answers with an "update" that
+    carries only the matches of the re-scanned region. Matching runs off the
+    event loop with the regex module's timeout as the budget.
+    """
+    await websocket.accept()
+    session = LiveSession()
+    loop = asyncio.get_running_loop()
+    
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (json.JSONDecodeError, KeyError):
+                await websocket.send_json({"type": "error", "error": "Messages must be JSON objects"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "error": "Messages must be JSON objects"})
+                continue
+            
+            reply = await loop.run_in_executor(None, handle_live_message, session, message)
+            await websocket.send_json(reply)
+    
+    except WebSocketDisconnect:
+        pass
+
 @router.get("/flags")
 async def get_flags():
     """
     Get information about available regex flags
     """
     from app.services.regex_service import get_flag_descriptions
-    return get_flag_descriptions()
\ No newline at end of file
+    return get_flag_descriptions()
+
+@router.get("/cache/stats")
+async def get_pattern_cache_stats():
+    """
+    Get hit/miss/eviction counters for the compiled pattern and result caches
+    
+    Sandbox workers keep their own caches; the executor counters report
+    timeouts and, in process mode, worker restarts.
+    """
+    from app.services.regex_service import get_cache_stats
+    from app.services.regex_executor import get_executor, REGEX_EXECUTION_MODE
+    from app.services.result_cache import result_cache
+    return {
+        "pattern_cache": get_cache_stats(),
+        "result_cache": result_cache.stats(),
+        "executor": {"mode": REGEX_EXECUTION_MODE, **get_executor().stats()}
+    }
\ No newline at end of file
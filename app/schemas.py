@@ -3,7 +3,7 @@ Pydantic models for request/response validation
 """
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 # Base schemas
 class TestCaseBase(BaseModel):
@@ -49,6 +49,7 @@ class TestCaseResponse(TestCaseBase):
 class RegexPatternResponse(RegexPatternBase):
     """Schema for regex pattern responses"""
     id: int
+    redos_score: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     test_cases: List[TestCaseResponse] = []
@@ -65,18 +66,57 @@ class RegexRequestResponse(RegexRequestBase):
     class Config:
         from_attributes = True
 
+class BenchmarkPoint(BaseModel):
+    """Schema for one timed run of a benchmark"""
+    size: int
+    seconds: Optional[float] = None
+    timed_out: bool = False
+
+class PatternBenchmarkResponse(BaseModel):
+    """Schema for pattern benchmark responses"""
+    id: int
+    regex_pattern_id: int
+    pattern: str
+    growth_class: str
+    exponent: Optional[float] = None
+    timings: Dict[str, List[BenchmarkPoint]]
+    created_at: datetime
+    
+    @field_validator("timings", mode="before")
+    @classmethod
+    def parse_timings(cls, value: Any) -> Any:
+        """Timings are stored as JSON text"""
+        if isinstance(value, str):
+            import json
+            return json.loads(value)
+        return value
+    
+    class Config:
+        from_attributes = True
+
 # Specialized schemas
 class RegexGenerateRequest(BaseModel):
     """Schema for regex generation request"""
     description: str = Field(..., description="Description of what the regex should do")
     sample_text: str = Field(..., description="Sample text containing examples of what to match")
     expected_matches: Optional[str] = Field(None, description="Specific parts of the sample text that should match")
+    bypass_cache: bool = Field(False, description="Always generate a new pattern instead of reusing a stored one")
+    candidates: Optional[int] = Field(None, ge=1, le=5, description="Maximum number of AI candidates to try concurrently until one passes verification")
+
+class RegexBatchGenerateRequest(BaseModel):
+    """Schema for batch regex generation request"""
+    items: List[RegexGenerateRequest] = Field(..., min_length=1, description="Generation requests to process together")
 
 class RegexTestRequest(BaseModel):
     """Schema for regex testing request"""
     pattern: str = Field(..., description="The regex pattern to test")
     test_text: str = Field(..., description="The text to test against")
     flags: str = Field("", description="Regex flags (i, m, s, x)")
+    timeout: Optional[float] = Field(None, gt=0, le=30, description="Wall-clock budget for evaluation in seconds")
+    offset: int = Field(0, ge=0, description="Character position to start matching from (resume cursor)")
+    max_matches: Optional[int] = Field(None, ge=1, description="Maximum number of matches to return")
+    count_only: bool = Field(False, description="Only count matches without returning match details")
+    match_format: str = Field("full", pattern="^(full|compact)$", description="Match format: full (per-match objects) or compact (columnar span arrays)")
 
 class GroupMatch(BaseModel):
     """Schema for group match information"""
@@ -92,12 +132,110 @@ class Match(BaseModel):
     end: int
     groups: List[GroupMatch] = []
 
+class CompactMatches(BaseModel):
+    """Schema for columnar match spans
+    
+    starts[g][k] / ends[g][k] give the span of group g (0 = whole match) in
+    the k-th match, or -1 when the group didn't participate.
+    """
+    group_count: int
+    starts: List[List[int]]
+    ends: List[List[int]]
+
 class RegexTestResult(BaseModel):
     """Schema for regex test result"""
     success: bool
     match_count: Optional[int] = None
     matches: Optional[List[Match]] = None
+    compact: Optional[CompactMatches] = None
     error: Optional[str] = None
+    timed_out: bool = False
+    truncated: bool = False
+    next_offset: Optional[int] = None
+    risk_score: Optional[int] = None
+    risk_level: Optional[str] = None
+
+class FileMatch(BaseModel):
+    """Schema for a match found in an uploaded file"""
+    start: int
+    end: int
+    line: int
+    column: int
+    full_match: str
+
+class RegexFileTestResult(BaseModel):
+    """Schema for regex test result over an uploaded file (byte offsets)"""
+    success: bool
+    match_count: Optional[int] = None
+    matches: Optional[List[FileMatch]] = None
+    size: Optional[int] = None
+    truncated: bool = False
+    next_offset: Optional[int] = None
+    error: Optional[str] = None
+    timed_out: bool = False
+    risk_score: Optional[int] = None
+    risk_level: Optional[str] = None
+
+class RegexFileTestResponse(BaseModel):
+    """Schema for uploaded file regex test response"""
+    status: str
+    result: Optional[RegexFileTestResult] = None
+    message: Optional[str] = None
+
+class PatternSpec(BaseModel):
+    """Schema for a pattern and its flags"""
+    pattern: str = Field(..., description="The regex pattern")
+    flags: str = Field("", description="Regex flags (i, m, s, x)")
+
+class RegexBatchTestRequest(BaseModel):
+    """Schema for testing many patterns against many texts"""
+    patterns: List[PatternSpec] = Field(..., min_length=1, max_length=100, description="Patterns to test")
+    texts: List[str] = Field(..., min_length=1, max_length=5000, description="Texts to test every pattern against")
+    include_spans: bool = Field(True, description="Include [start, end] spans of each match")
+    timeout: Optional[float] = Field(None, gt=0, le=30, description="Wall-clock budget per cell in seconds")
+
+class BatchCell(BaseModel):
+    """Schema for one pattern/text cell of a batch test"""
+    match_count: Optional[int] = None
+    spans: Optional[List[List[int]]] = None
+    error: Optional[str] = None
+    timed_out: bool = False
+
+class BatchPatternResult(BaseModel):
+    """Schema for one pattern row of a batch test"""
+    pattern: str
+    flags: str
+    success: bool
+    error: Optional[str] = None
+    cells: List[BatchCell] = []
+    risk_score: Optional[int] = None
+    risk_level: Optional[str] = None
+
+class RegexBatchTestResponse(BaseModel):
+    """Schema for batch regex test response"""
+    status: str
+    results: Optional[List[BatchPatternResult]] = None
+    message: Optional[str] = None
+
+class LibraryScanRequest(BaseModel):
+    """Schema for scanning a text against all saved patterns"""
+    text: str = Field(..., description="The text to scan")
+    include_spans: bool = Field(True, description="Report every match span instead of only which patterns hit")
+    timeout: Optional[float] = Field(None, gt=0, le=30, description="Wall-clock budget for the scan in seconds")
+
+class LibraryScanMatch(BaseModel):
+    """Schema for one saved pattern that matched"""
+    pattern_id: int
+    match_count: Optional[int] = None
+    spans: Optional[List[List[int]]] = None
+
+class LibraryScanResponse(BaseModel):
+    """Schema for library scan response"""
+    status: str
+    pattern_ids: List[int] = []
+    matches: List[LibraryScanMatch] = []
+    timed_out: bool = False
+    message: Optional[str] = None
 
 class RegexGenerateResponse(BaseModel):
     """Schema for regex generation response"""
@@ -107,6 +245,25 @@ class RegexGenerateResponse(BaseModel):
     explanation: Optional[str] = None
     test_result: Optional[RegexTestResult] = None
     flags: Optional[str] = None
+    test_cases: List[TestCaseBase] = []
+    source: Optional[str] = None
+    message: Optional[str] = None
+
+class RegexBatchGenerateResponse(BaseModel):
+    """Schema for batch regex generation response"""
+    status: str
+    results: List[RegexGenerateResponse] = []
+    message: Optional[str] = None
+
+class GenerationJobResponse(BaseModel):
+    """Schema for generation job responses"""
+    status: str
+    job_id: Optional[int] = None
+    job_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[RegexGenerateResponse] = None
     message: Optional[str] = None
 
 class RegexTestResponse(BaseModel):
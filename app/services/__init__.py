@@ -2,7 +2,14 @@
 Services initialization module
 """
 from app.services.ai_service import generate_regex_with_ai
-from app.services.regex_service import test_regex, get_flag_descriptions, explain_regex_component
+from app.services.generation_service import generate_regex_pattern
+from app.services.regex_service import (
+    test_regex,
+    get_flag_descriptions,
+    explain_regex_component,
+    compile_pattern,
+    get_cache_stats
+)
 from app.services.db_service import (
     create_pattern,
     get_pattern,
@@ -17,9 +24,12 @@ from app.services.db_service import (
 
 __all__ = [
     'generate_regex_with_ai',
+    'generate_regex_pattern',
     'test_regex',
     'get_flag_descriptions',
     'explain_regex_component',
+    'compile_pattern',
+    'get_cache_stats',
     'create_pattern',
     'get_pattern',
     'get_patterns',
@@ -3,19 +3,143 @@ Service for AI-powered regex generation
 """
 import os
 import json
+import time
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from app.services.sample_reducer import reduce_sample_text, estimate_tokens, PROMPT_TOKEN_BUDGET
+from app.services.rate_limiter import RateLimiter
+from app.services.circuit_breaker import CircuitBreaker
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-async def generate_regex_with_ai(
-    description: str, 
-    sample_text: str, 
+# Chat model used for generation
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo")
+
+# Base URL of the OpenAI-compatible API (None for api.openai.com)
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
+
+# Timeout for API requests (seconds)
+API_TIMEOUT = float(os.environ.get("API_TIMEOUT", "30"))
+
+# Size of the pooled HTTP connection pool to the API
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20"))
+
+# Maximum number of generation requests in flight at once
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "10"))
+
+# Provider rate limits to stay under (requests and tokens per minute, 0 disables)
+OPENAI_RPM = float(os.environ.get("OPENAI_RPM", "0"))
+OPENAI_TPM = float(os.environ.get("OPENAI_TPM", "0"))
+
+# Completion length limit of a generation (tokens)
+MAX_COMPLETION_TOKENS = 1000
+
+# Process-wide limiter shared by all calls to the provider
+rate_limiter = RateLimiter(OPENAI_RPM, OPENAI_TPM)
+
+# Consecutive failed calls after which calls to the provider fail fast
+AI_BREAKER_FAILURES = int(os.environ.get("AI_BREAKER_FAILURES", "5"))
+
+# How long calls fail fast before a probe call is let through (seconds)
+AI_BREAKER_RESET = float(os.environ.get("AI_BREAKER_RESET", "30"))
+
+# Adaptive call timeout: multiplier x latency percentile of recent calls,
+# at least AI_MIN_TIMEOUT and at most API_TIMEOUT
+AI_TIMEOUT_PERCENTILE = float(os.environ.get("AI_TIMEOUT_PERCENTILE", "99"))
+AI_TIMEOUT_MULTIPLIER = float(os.environ.get("AI_TIMEOUT_MULTIPLIER", "2"))
+AI_MIN_TIMEOUT = float(os.environ.get("AI_MIN_TIMEOUT", "5"))
+
+# Process-wide circuit breaker for calls to the provider
+ai_breaker = CircuitBreaker(
+    failure_threshold=AI_BREAKER_FAILURES,
+    reset_timeout=AI_BREAKER_RESET,
+    max_timeout=API_TIMEOUT,
+    min_timeout=AI_MIN_TIMEOUT,
+    percentile=AI_TIMEOUT_PERCENTILE,
+    multiplier=AI_TIMEOUT_MULTIPLIER
+)
+
+# Process-wide client and concurrency limit, created at startup
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def start_ai_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> Optional[AsyncOpenAI]:
+    """
+    Create the shared async OpenAI client if it doesn't exist yet
+    
+    The client keeps a pool of keep-alive connections, so generations reuse
+    connections (and TLS sessions) instead of opening one per call.
+    
+    Args:
+        api_key: API key (defaults to OPENAI_API_KEY)
+        base_url: API base URL (defaults to OPENAI_BASE_URL)
+        
+    Returns:
+        The shared client, or None if no API key is configured
+    """
+    global _client, _semaphore
+    if _client is not None:
+        return _client
+    
+    api_key = api_key or os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        logger.warning("OPENAI_API_KEY not set; AI generation is unavailable")
+        return None
+    
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+        ),
+        timeout=API_TIMEOUT
+    )
+    _client = AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url or OPENAI_BASE_URL,
+        timeout=API_TIMEOUT,
+        http_client=http_client
+    )
+    _semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return _client
+
+async def close_ai_client() -> None:
+    """Close the shared client and its connection pool"""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _semaphore = None
+
+def get_ai_client() -> Optional[AsyncOpenAI]:
+    """
+    Get the shared async OpenAI client, creating it on first use
+    
+    Returns:
+        The shared client, or None if no API key is configured
+    """
+    return _client or start_ai_client()
+
+# System prompt for generation requests
+SYSTEM_PROMPT = "You're a regex expert. Create precise regex patterns that match exactly what's needed, no more and no less."
+
+def build_generation_prompt(
+    description: str,
+    sample_text: str,
     expected_matches: Optional[str] = None
-) -> Dict[str, Any]:
+) -> str:
     """
-    Use OpenAI to generate a regex pattern based on the provided information
+    Build the user prompt for a generation request
+    
+    Sample texts that would push the prompt past PROMPT_TOKEN_BUDGET are
+    reduced to a representative excerpt; the generated pattern is still
+    tested against the full text afterwards.
     
     Args:
         description: Description of what the regex should do
@@ -23,44 +147,19 @@ async def generate_regex_with_ai(
         expected_matches: Specific parts of the sample text that should match
         
     Returns:
-        Dictionary containing pattern, explanation, test cases, and flags
+        Prompt text
     """
-    try:
-        import openai
-        
-        # Get API key from environment variable
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            logger.error("OPENAI_API_KEY not found in environment variables")
-            return {
-                "pattern": "Error: API key not found",
-                "explanation": "Please set the OPENAI_API_KEY environment variable",
-                "test_cases": [],
-                "flags": ""
-            }
-            
-        client = openai.OpenAI(api_key=api_key)
-        
-        # Prepare the prompt
-        prompt = f"""Generate a regular expression for the following requirement:
-Description: {description}
-
-Sample text:
-```
-{sample_text}
-```
-
-"""
-
-        if expected_matches:
-            prompt += f"""Expected matches:
+    if expected_matches:
+        expected_section = f"""Expected matches:
 ```
 {expected_matches}
 ```
 
 """
+    else:
+        expected_section = ""
 
-        prompt += """Respond ONLY with a JSON object that has the following fields:
+    instructions = """Respond ONLY with a JSON object that has the following fields:
 1. "pattern": the regex pattern string
 2. "explanation": a step-by-step explanation of how the regex works
 3. "test_cases": an array of sample texts that should or shouldn't match (at least 3 examples)
@@ -68,47 +167,324 @@ Sample text:
 
 Return ONLY the JSON and nothing else."""
 
-        # Call OpenAI API
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You're a regex expert. Create precise regex patterns that match exactly what's needed, no more and no less."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1000
-        )
+    # Whatever the rest of the prompt leaves of the budget goes to the sample
+    fixed_tokens = estimate_tokens(description + expected_section + instructions) + 32
+    excerpt, kept, total = reduce_sample_text(
+        sample_text,
+        expected_matches,
+        max(PROMPT_TOKEN_BUDGET - fixed_tokens, PROMPT_TOKEN_BUDGET // 4)
+    )
+    if excerpt == sample_text:
+        sample_heading = "Sample text:"
+    else:
+        sample_heading = f"Sample text (representative excerpt, {kept} of {total} lines):"
+
+    return f"""Generate a regular expression for the following requirement:
+Description: {description}
+
+{sample_heading}
+```
+{excerpt}
+```
+
+""" + expected_section + instructions
+
+def request_tokens(prompt: str) -> int:
+    """
+    Estimate the tokens a generation request counts against the TPM limit
+    
+    Args:
+        prompt: User prompt of the request
         
-        # Parse the response
-        response_text = response.choices[0].message.content
-        logger.debug(f"AI response: {response_text}")
+    Returns:
+        Estimated prompt tokens plus the completion limit
+    """
+    return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
+
+def parse_ai_response(response_text: str) -> Dict[str, Any]:
+    """
+    Parse the JSON object of a model response
+    
+    Args:
+        response_text: Raw response content, optionally fenced as ```json
+        
+    Returns:
+        Parsed dictionary
+        
+    Raises:
+        json.JSONDecodeError: If the response isn't valid JSON
+    """
+    # Check if the response starts with ```json and ends with ```
+    if response_text.startswith("```json") and "```" in response_text.split("```json", 1)[1]:
+        json_str = response_text.split("```json", 1)[1].split("```", 1)[0].strip()
+        return json.loads(json_str)
+    
+    # Try to parse the whole response as JSON
+    return json.loads(response_text)
+
+class JSONFieldStream:
+    """Incremental parser reporting top-level fields of a streamed JSON object
+    
+    Text before the opening brace (such as a ```json fence) is skipped. Each
+    top-level value is decoded as soon as its closing quote, bracket or
+    delimiter arrives, so early fields are available while later ones are
+    still being generated.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        self._token_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._expect = "key"
+        self.fields: Dict[str, Any] = {}
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of the response
+        
+        Args:
+            chunk: Next piece of response text
+            
+        Returns:
+            List of (field, value) pairs completed by this chunk
+        """
+        self._buffer += chunk
+        completed: List[Tuple[str, Any]] = []
         
-        # Extract JSON from the response
-        try:
-            # Check if the response starts with ```json and ends with ```
-            if response_text.startswith("```json") and "```" in response_text.split("```json", 1)[1]:
-                json_str = response_text.split("```json", 1)[1].split("```", 1)[0].strip()
-                result = json.loads(json_str)
-            else:
-                # Try to parse the whole response as JSON
-                result = json.loads(response_text)
-                
-            return result
+        while self._pos < len(self._buffer) and not self._done:
+            index = self._pos
+            ch = self._buffer[index]
+            self._pos += 1
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_token(index + 1, completed)
+                continue
             
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse AI response as JSON: {response_text}")
-            return {
-                "pattern": "Error parsing AI response",
-                "explanation": f"The AI did not return valid JSON. Response: {response_text[:100]}...",
-                "test_cases": [],
-                "flags": ""
-            }
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                continue
             
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token_start = index
+            elif ch in "{[":
+                if self._depth == 1:
+                    self._token_start = index
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._end_token(index + 1, completed)
+                elif self._depth == 0:
+                    self._end_scalar(index, completed)
+                    self._done = True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect = "value"
+                elif ch == ",":
+                    self._end_scalar(index, completed)
+                    self._expect = "key"
+                elif not ch.isspace() and self._token_start is None and self._expect == "value":
+                    self._token_start = index
+        
+        return completed
+    
+    def _end_token(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        """Decode a finished key, string or container at the top level"""
+        token = self._buffer[self._token_start:end]
+        self._token_start = None
+        if self._expect == "key":
+            self._key = json.loads(token)
+            self._expect = "colon"
+        elif self._expect == "value":
+            self._store(json.loads(token), completed)
+    
+    def _end_scalar(self, end: int, completed: List[Tuple[str, Any]]) -> None:
+        """Decode a pending number, boolean or null at the top level"""
+        if self._token_start is None or self._expect != "value":
+            return
+        token = self._buffer[self._token_start:end].strip()
+        self._token_start = None
+        self._store(json.loads(token), completed)
+    
+    def _store(self, value: Any, completed: List[Tuple[str, Any]]) -> None:
+        """Record a completed field"""
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._expect = "next"
+
+class AIServiceError(Exception):
+    """Raised when the AI provider can't produce a usable generation"""
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """Whether an error says the provider is unavailable or degraded"""
+    return isinstance(error, (
+        asyncio.TimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError
+    ))
+
+def _provider_error(error: Exception, timeout: float) -> AIServiceError:
+    """Record a failed provider call with the breaker and describe it"""
+    if not _is_provider_failure(error):
+        ai_breaker.record_abort()
+        return AIServiceError(f"AI request failed: {error}")
+    ai_breaker.record_failure()
+    if isinstance(error, asyncio.TimeoutError):
+        return AIServiceError(f"AI provider did not respond within {timeout:.1f}s")
+    return AIServiceError(f"AI provider unavailable: {error}")
+
+async def generate_regex_with_ai(
+    description: str, 
+    sample_text: str, 
+    expected_matches: Optional[str] = None,
+    temperature: float = 0.3
+) -> Dict[str, Any]:
+    """
+    Use OpenAI to generate a regex pattern based on the provided information
+    
+    Calls fail fast while the provider's circuit is open and are cut off
+    after the breaker's adaptive timeout.
+    
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+        temperature: Sampling temperature of the model
+        
+    Returns:
+        Dictionary containing pattern, explanation, test cases, and flags
+        
+    Raises:
+        CircuitOpenError: If the provider's circuit is open
+        AIServiceError: If the provider failed or returned no usable pattern
+    """
+    client = get_ai_client()
+    if client is None:
+        logger.error("OPENAI_API_KEY not found in environment variables")
+        raise AIServiceError("OPENAI_API_KEY not found in environment variables")
+    
+    # Prepare the prompt
+    prompt = build_generation_prompt(description, sample_text, expected_matches)
+    
+    # Call OpenAI API, waiting for the rate limits and for a slot if too many calls are in flight
+    timeout = ai_breaker.before_call()
+    try:
+        await rate_limiter.acquire(request_tokens(prompt))
+        async with _semaphore:
+            started = time.monotonic()
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=MAX_COMPLETION_TOKENS
+                ),
+                timeout
+            )
+    except asyncio.CancelledError:
+        ai_breaker.record_abort()
+        raise
     except Exception as e:
         logger.exception("Error generating regex with AI")
-        return {
-            "pattern": "Error generating regex",
-            "explanation": f"An error occurred: {str(e)}",
-            "test_cases": [],
-            "flags": ""
-        }
\ No newline at end of file
+        raise _provider_error(e, timeout) from e
+    ai_breaker.record_success(time.monotonic() - started)
+    
+    # Parse the response
+    response_text = response.choices[0].message.content or ""
+    logger.debug(f"AI response: {response_text}")
+    
+    # Extract JSON from the response
+    try:
+        result = parse_ai_response(response_text)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse AI response as JSON: {response_text}")
+        raise AIServiceError(f"The AI did not return valid JSON. Response: {response_text[:100]}...") from e
+    if not isinstance(result, dict) or not isinstance(result.get("pattern"), str):
+        raise AIServiceError("The AI did not return a pattern")
+    return result
+
+async def stream_regex_with_ai(
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the model's response text for a generation request
+    
+    Holds a concurrency slot until the stream is exhausted or closed. The
+    whole response has to arrive within the breaker's adaptive timeout.
+    
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+        
+    Yields:
+        Pieces of response content as they arrive
+        
+    Raises:
+        CircuitOpenError: If the provider's circuit is open
+        AIServiceError: If no API key is configured or the provider failed
+    """
+    client = get_ai_client()
+    if client is None:
+        raise AIServiceError("OPENAI_API_KEY not found in environment variables")
+    
+    prompt = build_generation_prompt(description, sample_text, expected_matches)
+    timeout = ai_breaker.before_call()
+    stream = None
+    try:
+        await rate_limiter.acquire(request_tokens(prompt))
+        async with _semaphore:
+            started = time.monotonic()
+            deadline = started + timeout
+            stream = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=MAX_COMPLETION_TOKENS,
+                    stream=True
+                ),
+                timeout
+            )
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except (asyncio.CancelledError, GeneratorExit):
+        ai_breaker.record_abort()
+        raise
+    except Exception as e:
+        logger.exception("Error streaming regex generation from AI")
+        raise _provider_error(e, timeout) from e
+    finally:
+        if stream is not None:
+            await stream.close()
+    ai_breaker.record_success(time.monotonic() - started)
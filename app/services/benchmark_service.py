@@ -0,0 +1,244 @@
+"""
+Service for benchmarking how a pattern's match time grows with input size
+"""
+import os
+import math
+import time
+import random
+import string
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+import regex
+
+from app.services.regex_executor import get_executor, RegexTimeoutError, RegexWorkerError
+from app.services.regex_service import compile_pattern
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Total time budget for one benchmark run (seconds)
+BENCHMARK_BUDGET = float(os.environ.get("BENCHMARK_BUDGET", "5.0"))
+
+# Budget for a single timed finditer call (seconds)
+BENCHMARK_RUN_TIMEOUT = float(os.environ.get("BENCHMARK_RUN_TIMEOUT", "1.0"))
+
+# Smallest input length; sizes double from here up to max_size
+BENCHMARK_MIN_SIZE = 16
+
+# Timings below this are dominated by noise and ignored when fitting
+NOISE_FLOOR = 1e-4
+
+# Characters tried when looking for something the pattern can consume
+PUMP_CANDIDATES = "a1 xA._-@/"
+
+def _pump(seed: str, size: int) -> str:
+    """Repeat a seed string up to the given length"""
+    if not seed:
+        return ""
+    return (seed * (size // len(seed) + 1))[:size]
+
+def _near_miss_seed(compiled: regex.Pattern, sample_text: str) -> str:
+    """
+    Find a string the pattern keeps consuming, to pump into near-misses
+
+    Prefers a real match from the sample text; otherwise picks a character
+    the pattern can start matching (a partial match on a run of it). Each
+    probe is bounded by BENCHMARK_RUN_TIMEOUT, and a probe that times out
+    yields no seed: the sample text may itself be a catastrophic input.
+    """
+    if sample_text:
+        try:
+            match = compiled.search(sample_text, timeout=BENCHMARK_RUN_TIMEOUT)
+        except TimeoutError:
+            match = None
+        if match and match.group(0):
+            return match.group(0)
+
+    for ch in PUMP_CANDIDATES:
+        try:
+            match = compiled.match(ch * 8, partial=True, timeout=BENCHMARK_RUN_TIMEOUT)
+        except TimeoutError:
+            continue
+        if match and match.end() > 0:
+            return ch
+    return "a"
+
+def generate_inputs(near_miss: str, sample_text: Optional[str], size: int, rng: random.Random) -> Dict[str, str]:
+    """
+    Build the synthetic inputs for one size
+
+    Args:
+        near_miss: String the pattern consumes, pumped into the adversarial input
+        sample_text: Stored sample text of the pattern (may be empty)
+        size: Input length in characters
+        rng: Random generator (seeded for reproducible runs)
+
+    Returns:
+        Dictionary mapping input kind (sample, random, adversarial,
+        adversarial_run) to text
+    """
+    inputs = {
+        "random": "".join(rng.choice(string.printable) for _ in range(size)),
+        # A pumped near-match that fails at the very end forces the engine
+        # through every way of splitting the input before giving up
+        "adversarial": _pump(near_miss, size - 1) + "\x00",
+        # The same with a run of its first character, which defeats required
+        # literal prefilters and exposes polynomial splitting: \d+\d+[a-z]
+        "adversarial_run": _pump(near_miss[:1], size - 1) + "\x00",
+    }
+    if sample_text:
+        inputs["sample"] = _pump(sample_text, size)
+    return inputs
+
+def fit_growth(points: List[Tuple[int, float]]) -> Tuple[Optional[float], float]:
+    """
+    Fit time = c * size^k by least squares in log-log space
+
+    Args:
+        points: List of (size, seconds) pairs above the noise floor
+
+    Returns:
+        Tuple of (exponent k or None if there aren't enough points, last doubling ratio)
+    """
+    if len(points) < 2:
+        return None, 0.0
+
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(seconds) for _, seconds in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    exponent = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance if variance else None
+    last_ratio = points[-1][1] / points[-2][1]
+    return exponent, last_ratio
+
+def classify_growth(exponent: Optional[float], last_ratio: float, timed_out: bool) -> str:
+    """
+    Map fitted growth to a class
+
+    Args:
+        exponent: Fitted power-law exponent
+        last_ratio: Time ratio over the last doubling of input size
+        timed_out: Whether any run exceeded its budget
+
+    Returns:
+        "linear", "polynomial" or "exponential"
+    """
+    # Doubling the input multiplies exponential run time by far more than
+    # any low-degree polynomial would; a timeout before there is a usable
+    # curve means the time exploded within a couple of doublings
+    if last_ratio > 20 or (timed_out and exponent is None):
+        return "exponential"
+    if exponent is None or exponent < 1.4:
+        return "linear"
+    return "polynomial"
+
+def run_benchmark(
+    pattern: str,
+    flag_str: str = "",
+    sample_text: Optional[str] = None,
+    max_size: int = 65536,
+    budget: float = BENCHMARK_BUDGET,
+    seed: int = 0,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Time finditer over inputs of growing length and fit a growth class
+
+    Sizes double from BENCHMARK_MIN_SIZE up to max_size. An input kind stops
+    growing once a run times out or the total budget is spent.
+
+    Args:
+        pattern: The regex pattern to benchmark
+        flag_str: String of regex flags (i, m, s, x)
+        sample_text: Stored sample text used for the "sample" inputs
+        max_size: Largest input length
+        budget: Total time budget in seconds
+        seed: Seed for the random inputs
+        timeout: Accepted for the executor contract; runs use BENCHMARK_RUN_TIMEOUT
+
+    Returns:
+        Dictionary with growth_class, exponent and raw timings per kind
+
+    Raises:
+        regex.error: If the pattern is invalid
+    """
+    compiled = compile_pattern(pattern, flag_str)
+    rng = random.Random(seed)
+    near_miss = _near_miss_seed(compiled, sample_text or "")
+    deadline = time.perf_counter() + budget
+
+    timings: Dict[str, List[Dict[str, Any]]] = {}
+    stopped: set = set()
+    size = BENCHMARK_MIN_SIZE
+    while size <= max_size and time.perf_counter() < deadline:
+        for kind, text in generate_inputs(near_miss, sample_text, size, rng).items():
+            if kind in stopped:
+                continue
+            run_timeout = max(0.001, min(BENCHMARK_RUN_TIMEOUT, deadline - time.perf_counter()))
+            started = time.perf_counter()
+            try:
+                for _ in compiled.finditer(text, timeout=run_timeout):
+                    pass
+                elapsed = time.perf_counter() - started
+                timings.setdefault(kind, []).append({"size": size, "seconds": elapsed, "timed_out": False})
+            except TimeoutError:
+                timings.setdefault(kind, []).append({"size": size, "seconds": None, "timed_out": True})
+                stopped.add(kind)
+        size *= 2
+
+    # The worst-behaved input kind decides the class
+    growth_class, exponent = "linear", None
+    rank = {"linear": 0, "polynomial": 1, "exponential": 2}
+    for kind, points in timings.items():
+        timed_out = any(point["timed_out"] for point in points)
+        measured = [(p["size"], p["seconds"]) for p in points if p["seconds"] and p["seconds"] >= NOISE_FLOOR]
+        kind_exponent, last_ratio = fit_growth(measured)
+        kind_class = classify_growth(kind_exponent, last_ratio, timed_out)
+        if rank[kind_class] > rank[growth_class] or (
+            kind_class == growth_class and (kind_exponent or 0) > (exponent or 0)
+        ):
+            growth_class, exponent = kind_class, kind_exponent
+
+    return {
+        "growth_class": growth_class,
+        "exponent": round(exponent, 3) if exponent is not None else None,
+        "timings": timings,
+    }
+
+async def benchmark_pattern(
+    pattern: str,
+    sample_text: Optional[str] = None,
+    max_size: int = 65536,
+    budget: float = BENCHMARK_BUDGET
+) -> Dict[str, Any]:
+    """
+    Benchmark a pattern on the configured regex executor
+
+    Args:
+        pattern: The regex pattern to benchmark
+        sample_text: Stored sample text used for the "sample" inputs
+        max_size: Largest input length
+        budget: Total time budget in seconds
+
+    Returns:
+        Dictionary with success flag, growth_class, exponent and timings
+    """
+    try:
+        result = await get_executor().run(
+            run_benchmark,
+            pattern,
+            "",
+            sample_text,
+            max_size=max_size,
+            budget=budget,
+            timeout=budget + BENCHMARK_RUN_TIMEOUT + 1
+        )
+        return {"success": True, **result}
+
+    except regex.error as e:
+        return {"success": False, "error": str(e)}
+
+    except (RegexTimeoutError, RegexWorkerError) as e:
+        return {"success": False, "error": str(e)}
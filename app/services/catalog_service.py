@@ -0,0 +1,232 @@
+"""
+Service for serving well-known formats from a curated pattern catalog
+"""
+import regex
+import logging
+from typing import Dict, Any, List, Tuple
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Longest keyword phrase, in words
+MAX_KEYWORD_WORDS = 3
+
+# Words that don't narrow down what a description asks for ("find all valid
+# e-mail addresses" asks for no more than "e-mail")
+FILLER_WORDS = frozenset((
+    "a", "an", "the", "all", "any", "every", "each", "some", "of", "in", "from", "for",
+    "find", "match", "matching", "matches", "extract", "get", "grab", "detect", "capture",
+    "valid", "validate", "regex", "regexp", "regular", "expression", "pattern", "text",
+    "address", "addresses", "number", "numbers", "string", "strings", "value", "values",
+    "format", "formats", "formatted", "like",
+))
+
+# Pattern pieces shared by several entries
+_HEX4 = "[0-9A-Fa-f]{1,4}"
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_DATE = r"\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])"
+
+# Curated patterns for common formats. Keywords are matched against the words
+# of a request's description; "matches" and "non_matches" are validation
+# samples, served as the generation's test cases.
+CATALOG: List[Dict[str, Any]] = [
+    {
+        "name": "email",
+        "pattern": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b",
+        "flags": "",
+        "explanation": "E-mail addresses: a local part of letters, digits and ._%+-, an @, "
+                       "then a domain whose last label is at least two letters.",
+        "keywords": ("email", "e-mail", "emails", "e-mails", "email address", "mail address"),
+        "matches": ["john.doe@example.com", "a+tag@mail.co.uk", "x_y%z@sub-domain.io"],
+        "non_matches": ["john.doe@", "@example.com", "user@localhost"],
+    },
+    {
+        "name": "ipv4",
+        "pattern": rf"(?<![\d.]){_OCTET}(?:\.{_OCTET}){{3}}(?!\.?\d)",
+        "flags": "",
+        "explanation": "IPv4 addresses in dotted-decimal notation, each octet between 0 and 255, "
+                       "not part of a longer run of numbers and dots.",
+        "keywords": ("ipv4", "ip", "ip address", "ip addresses", "ipv4 address"),
+        "matches": ["192.168.0.1", "10.0.0.255", "8.8.8.8"],
+        "non_matches": ["256.1.1.1", "1.2.3", "1.2.3.4.5"],
+    },
+    {
+        "name": "ipv6",
+        "pattern": (
+            r"(?<![:.\w])(?:"
+            rf"(?:{_HEX4}:){{7}}{_HEX4}"
+            rf"|(?:{_HEX4}:){{1,7}}:"
+            rf"|(?:{_HEX4}:){{1,6}}:{_HEX4}"
+            rf"|(?:{_HEX4}:){{1,5}}(?::{_HEX4}){{1,2}}"
+            rf"|(?:{_HEX4}:){{1,4}}(?::{_HEX4}){{1,3}}"
+            rf"|(?:{_HEX4}:){{1,3}}(?::{_HEX4}){{1,4}}"
+            rf"|(?:{_HEX4}:){{1,2}}(?::{_HEX4}){{1,5}}"
+            rf"|{_HEX4}:(?::{_HEX4}){{1,6}}"
+            rf"|:(?:(?::{_HEX4}){{1,7}}|:)"
+            r")(?![:.\w])"
+        ),
+        "flags": "",
+        "explanation": "IPv6 addresses, full or with one :: run of zero groups compressed. "
+                       "Forms with an embedded IPv4 address are not covered.",
+        "keywords": ("ipv6", "ip", "ip address", "ip addresses", "ipv6 address"),
+        "matches": ["2001:0db8:85a3:0000:0000:8a2e:0370:7334", "fe80::1", "::1", "2001:db8::"],
+        "non_matches": ["2001:db8:::1", "12345::1", "1:2:3:4:5:6:7:8:9"],
+    },
+    {
+        "name": "uuid",
+        "pattern": r"\b[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}\b",
+        "flags": "",
+        "explanation": "UUIDs: 32 hexadecimal digits in groups of 8-4-4-4-12 separated by dashes.",
+        "keywords": ("uuid", "uuids", "guid", "guids"),
+        "matches": ["123e4567-e89b-12d3-a456-426614174000", "00000000-0000-0000-0000-000000000000"],
+        "non_matches": ["123e4567e89b12d3a456426614174000", "123e4567-e89b-12d3-a456-42661417400g"],
+    },
+    {
+        "name": "iso_datetime",
+        "pattern": (
+            rf"(?<!\d){_DATE}T(?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d+)?)?"
+            r"(?:Z|[+-](?:[01]\d|2[0-3]):?[0-5]\d)?(?![\w:])"
+        ),
+        "flags": "",
+        "explanation": "ISO 8601 timestamps: a YYYY-MM-DD date, T, hours and minutes with optional "
+                       "seconds and fraction, and an optional Z or UTC offset.",
+        "keywords": ("timestamp", "timestamps", "datetime", "datetimes", "iso timestamp", "iso datetime", "iso 8601"),
+        "matches": ["2024-03-15T09:30:00Z", "2024-03-15T09:30", "2024-03-15T23:59:59.123+02:00"],
+        "non_matches": ["2024-03-15", "2024-03-15T24:00", "2024-13-15T09:30"],
+    },
+    {
+        "name": "iso_date",
+        "pattern": rf"(?<!\d){_DATE}(?!\d)",
+        "flags": "",
+        "explanation": "ISO 8601 dates: a four-digit year, a month from 01 to 12 and a day from "
+                       "01 to 31, separated by dashes.",
+        "keywords": ("iso date", "iso dates", "iso 8601", "yyyy-mm-dd", "date", "dates"),
+        "matches": ["2024-03-15", "1999-12-31", "2000-01-01"],
+        "non_matches": ["2024-13-01", "2024-00-10", "24-03-15", "2024-03-32"],
+    },
+    {
+        "name": "url",
+        "pattern": (
+            r"\bhttps?://[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*(?::\d+)?"
+            r"(?:/(?:[^\s<>\"']*[^\s<>\"'.,;:!?)\]])?)?"
+        ),
+        "flags": "",
+        "explanation": "HTTP and HTTPS URLs: scheme, host, optional port and path, "
+                       "without trailing sentence punctuation.",
+        "keywords": ("url", "urls", "link", "links", "web address", "hyperlink", "hyperlinks"),
+        "matches": ["https://example.com", "http://localhost:8000/api/v1?q=1", "https://example.com/a/b/"],
+        "non_matches": ["ftp://example.com", "example.com", "https//example.com"],
+    },
+    {
+        "name": "credit_card",
+        "pattern": (
+            r"\b(?:4\d{3}|5[1-5]\d{2}|2[2-7]\d{2}|6(?:011|5\d{2}))(?:[ -]?\d{4}){3}\b"
+            r"|\b3[47]\d{2}[ -]?\d{6}[ -]?\d{5}\b"
+        ),
+        "flags": "",
+        "explanation": "Visa, Mastercard, Discover and American Express card numbers, optionally "
+                       "grouped with spaces or dashes. The check digit is not verified.",
+        "keywords": ("credit card", "credit cards", "card number", "card numbers", "creditcard", "visa", "mastercard"),
+        "matches": ["4111 1111 1111 1111", "5500-0000-0000-0004", "371449635398431", "6011111111111117"],
+        "non_matches": ["1234 5678 9012 3456", "4111 1111 1111", "41111111111111111"],
+    },
+    {
+        "name": "mac_address",
+        "pattern": r"\b[0-9A-Fa-f]{2}([:-])(?:[0-9A-Fa-f]{2}\1){4}[0-9A-Fa-f]{2}\b",
+        "flags": "",
+        "explanation": "MAC addresses: six pairs of hexadecimal digits, all separated by the same "
+                       "colon or dash (captured in group 1).",
+        "keywords": ("mac", "mac address", "mac addresses", "hardware address"),
+        "matches": ["00:1A:2B:3C:4D:5E", "aa-bb-cc-dd-ee-ff"],
+        "non_matches": ["00:1A:2B:3C:4D", "00:1A-2B:3C:4D:5E", "00:1A:2B:3C:4D:5G"],
+    },
+    {
+        "name": "hex_color",
+        "pattern": r"#(?:[0-9A-Fa-f]{6}|[0-9A-Fa-f]{3})\b",
+        "flags": "",
+        "explanation": "Hexadecimal color codes: # followed by three or six hexadecimal digits.",
+        "keywords": ("hex color", "hex colors", "hex colour", "color code", "color codes", "colour code", "css color"),
+        "matches": ["#fff", "#1A2b3C"],
+        "non_matches": ["#ffff", "#12345g", "fff"],
+    },
+]
+
+def _words(text: str) -> List[str]:
+    """Case-folded words of a text, keeping inner dashes (e-mail, yyyy-mm-dd)"""
+    return regex.findall(r"\w+(?:-\w+)*", text.casefold())
+
+def _build_keyword_index() -> Dict[Tuple[str, ...], List[int]]:
+    """Map each keyword phrase, as a tuple of words, to the catalog entries using it"""
+    index: Dict[Tuple[str, ...], List[int]] = {}
+    for position, entry in enumerate(CATALOG):
+        for keyword in entry["keywords"]:
+            index.setdefault(tuple(_words(keyword)), []).append(position)
+    return index
+
+# Keyword phrase -> catalog entry positions
+KEYWORD_INDEX = _build_keyword_index()
+
+def match_catalog(description: str) -> List[Dict[str, Any]]:
+    """
+    Find catalog entries whose keywords appear in a description
+
+    Every run of up to MAX_KEYWORD_WORDS words is looked up in the keyword
+    index. Entries score the number of keyword words they matched, so
+    "iso date" beats a bare "date" and "ipv4" beats "ip".
+
+    Args:
+        description: Description of what the regex should do
+
+    Returns:
+        Matching catalog entries, best first
+    """
+    words = _words(description)
+    scores: Dict[int, int] = {}
+    for start in range(len(words)):
+        for length in range(1, min(MAX_KEYWORD_WORDS, len(words) - start) + 1):
+            for position in KEYWORD_INDEX.get(tuple(words[start:start + length]), ()):
+                scores[position] = scores.get(position, 0) + length
+    ranked = sorted(scores, key=lambda position: (-scores[position], position))
+    return [CATALOG[position] for position in ranked]
+
+def describes_entry(description: str, entry: Dict[str, Any]) -> bool:
+    """
+    Whether a description asks for an entry's format and nothing narrower
+
+    Every word must be part of one of the entry's keywords or a filler word.
+    "IPv4 addresses" qualifies, "IPv4 addresses in private ranges" doesn't:
+    the catalog pattern would match more than was asked for.
+
+    Args:
+        description: Description of what the regex should do
+        entry: Catalog entry
+
+    Returns:
+        True if the description names only the entry's format
+    """
+    words = _words(description)
+    keywords = {tuple(_words(keyword)) for keyword in entry["keywords"]}
+    covered = [word in FILLER_WORDS for word in words]
+    for start in range(len(words)):
+        for length in range(1, min(MAX_KEYWORD_WORDS, len(words) - start) + 1):
+            if tuple(words[start:start + length]) in keywords:
+                covered[start:start + length] = [True] * length
+    return all(covered)
+
+def catalog_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shape a catalog entry like a parsed AI response
+
+    Args:
+        entry: Catalog entry
+
+    Returns:
+        Dictionary with pattern, explanation, test_cases and flags
+    """
+    return {
+        "pattern": entry["pattern"],
+        "explanation": entry["explanation"],
+        "test_cases": [{"text": text, "should_match": True} for text in entry["matches"]]
+                      + [{"text": text, "should_match": False} for text in entry["non_matches"]],
+        "flags": entry["flags"]
+    }
@@ -0,0 +1,156 @@
+"""
+Circuit breaker with latency-based adaptive timeouts for calls to the AI provider
+"""
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit is open"""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker that also sizes call timeouts
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail fast for `reset_timeout` seconds. Then one probe call is let
+    through (half-open): its success closes the circuit, its failure opens
+    it again.
+
+    Timeouts follow the provider's recent latency: once `min_samples`
+    successful calls have been seen, a call may take `multiplier` times the
+    given latency percentile, kept between `min_timeout` and `max_timeout`.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_timeout: float = 30.0,
+        min_timeout: float = 5.0,
+        percentile: float = 99.0,
+        multiplier: float = 2.0,
+        window: int = 200,
+        min_samples: int = 20,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=window)
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def before_call(self) -> float:
+        """
+        Check that a call may go ahead
+
+        Returns:
+            Timeout for the call in seconds
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe in flight
+        """
+        with self._lock:
+            if self.state == "open" and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "open" or (self.state == "half_open" and self._probing):
+                self.rejected += 1
+                retry_in = max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+                raise CircuitOpenError(f"AI provider circuit is open; retry in {retry_in:.0f}s")
+            if self.state == "half_open":
+                self._probing = True
+            return self._timeout()
+
+    def record_success(self, latency: float) -> None:
+        """
+        Record a successful call, closing the circuit
+
+        Args:
+            latency: Duration of the call in seconds
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probing = False
+            if self.state != "closed":
+                logger.info("AI provider circuit closed")
+            self.state = "closed"
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        """Record a failed or timed out call, opening the circuit past the threshold"""
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"AI provider circuit opened after {self.consecutive_failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = self._clock()
+
+    def record_abort(self) -> None:
+        """Record a call abandoned by its caller, which says nothing about the provider"""
+        with self._lock:
+            self._probing = False
+
+    def _latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile of recent successful calls (lock held)"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[max(0, math.ceil(percentile / 100 * len(ordered)) - 1)]
+
+    def _timeout(self) -> float:
+        """Current call timeout (lock held)"""
+        if len(self._latencies) < self.min_samples:
+            return self.max_timeout
+        adaptive = self._latency_percentile(self.percentile) * self.multiplier
+        return min(self.max_timeout, max(self.min_timeout, adaptive))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker state and counters
+
+        Returns:
+            Dictionary with state, failure counts, current timeout, recent
+            latency percentiles and seconds until a probe is allowed
+        """
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = round(max(0.0, self.reset_timeout - (self._clock() - self.opened_at)), 3)
+            latency = {
+                f"p{percentile}": self._latency_percentile(percentile)
+                for percentile in (50, 95, 99)
+            }
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in": retry_in,
+                "timeout": self._timeout(),
+                "latency": {name: round(value, 3) if value is not None else None for name, value in latency.items()},
+                "samples": len(self._latencies),
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
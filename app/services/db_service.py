@@ -1,13 +1,18 @@
 """
 Service for database operations
 """
+import json
 import logging
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy import select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models import RegexPattern, RegexRequest, TestCase
+from app.models import RegexPattern, RegexRequest, TestCase, PatternBenchmark, GenerationJob
+from app.services.library_service import pattern_library
+from app.services.similarity_service import similarity_index
+from app.services.redos_service import get_risk_score
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -37,12 +42,15 @@ async def create_pattern(
         name=name,
         pattern=pattern,
         sample_text=sample_text,
-        description=description
+        description=description,
+        redos_score=get_risk_score(pattern)
     )
     db.add(db_pattern)
     await db.commit()
-    await db.refresh(db_pattern)
-    return db_pattern
+    pattern_library.upsert(db_pattern.id, db_pattern.pattern)
+    
+    # Reload with test cases so the response doesn't lazy-load outside the session's greenlet
+    return await get_pattern(db, db_pattern.id)
 
 async def get_pattern(db: AsyncSession, pattern_id: int) -> Optional[RegexPattern]:
     """
@@ -61,7 +69,12 @@ async def get_pattern(db: AsyncSession, pattern_id: int) -> Optional[RegexPatter
     result = await db.execute(query)
     return result.scalars().first()
 
-async def get_patterns(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[RegexPattern]:
+async def get_patterns(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    max_redos_score: Optional[int] = None
+) -> List[RegexPattern]:
     """
     Get all regex patterns with pagination
     
@@ -69,14 +82,32 @@ async def get_patterns(db: AsyncSession, skip: int = 0, limit: int = 100) -> Lis
         db: Database session
         skip: Number of records to skip
         limit: Maximum number of records to return
+        max_redos_score: Only include patterns scored at or below this ReDoS risk
         
     Returns:
         List of RegexPattern instances
     """
-    query = select(RegexPattern).order_by(RegexPattern.created_at.desc()).offset(skip).limit(limit)
+    query = select(RegexPattern).options(selectinload(RegexPattern.test_cases))
+    if max_redos_score is not None:
+        query = query.where(RegexPattern.redos_score <= max_redos_score)
+    query = query.order_by(RegexPattern.created_at.desc()).offset(skip).limit(limit)
     result = await db.execute(query)
     return list(result.scalars().all())
 
+async def get_all_pattern_strings(db: AsyncSession) -> List[Tuple[int, str]]:
+    """
+    Get the ID and pattern string of every saved pattern
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        List of (pattern_id, pattern) tuples
+    """
+    query = select(RegexPattern.id, RegexPattern.pattern).order_by(RegexPattern.id)
+    result = await db.execute(query)
+    return [(row.id, row.pattern) for row in result.all()]
+
 async def update_pattern(
     db: AsyncSession,
     pattern_id: int,
@@ -105,6 +136,7 @@ async def update_pattern(
         update_data["name"] = name
     if pattern is not None:
         update_data["pattern"] = pattern
+        update_data["redos_score"] = get_risk_score(pattern)
     if sample_text is not None:
         update_data["sample_text"] = sample_text
     if description is not None:
@@ -119,7 +151,12 @@ async def update_pattern(
     await db.commit()
     
     # Return the updated pattern
-    return await get_pattern(db, pattern_id)
+    db_pattern = await get_pattern(db, pattern_id)
+    if db_pattern is not None and pattern is not None:
+        pattern_library.upsert(db_pattern.id, db_pattern.pattern)
+        # Generations that produced the old pattern no longer describe it
+        await invalidate_cached_requests(db, pattern_id)
+    return db_pattern
 
 async def delete_pattern(db: AsyncSession, pattern_id: int) -> bool:
     """
@@ -137,10 +174,19 @@ async def delete_pattern(db: AsyncSession, pattern_id: int) -> bool:
     if not pattern:
         return False
     
+    # Bulk deletes skip ORM cascades, so the benchmarks go first
+    await db.execute(delete(PatternBenchmark).where(PatternBenchmark.regex_pattern_id == pattern_id))
+    request_ids = list((await db.execute(
+        select(RegexRequest.id).where(RegexRequest.result_pattern_id == pattern_id)
+    )).scalars().all())
+    
     # Delete the pattern
     query = delete(RegexPattern).where(RegexPattern.id == pattern_id)
     await db.execute(query)
     await db.commit()
+    pattern_library.remove(pattern_id)
+    # Similar requests would otherwise keep being offered the deleted pattern
+    similarity_index.remove(request_ids)
     return True
 
 # RegexRequest operations
@@ -149,7 +195,9 @@ async def create_request(
     description: str,
     sample_text: str,
     expected_matches: Optional[str] = None,
-    result_pattern_id: Optional[int] = None
+    result_pattern_id: Optional[int] = None,
+    input_hash: Optional[str] = None,
+    result_flags: Optional[str] = None
 ) -> RegexRequest:
     """
     Create a new regex generation request
@@ -160,6 +208,8 @@ async def create_request(
         sample_text: Sample text for testing
         expected_matches: Expected matches (if provided)
         result_pattern_id: ID of the resulting pattern (if available)
+        input_hash: Normalized input hash, set when the result may be reused
+        result_flags: Regex flags of the resulting pattern
         
     Returns:
         Created RegexRequest instance
@@ -168,13 +218,173 @@ async def create_request(
         description=description,
         sample_text=sample_text,
         expected_matches=expected_matches,
-        result_pattern_id=result_pattern_id
+        result_pattern_id=result_pattern_id,
+        input_hash=input_hash,
+        result_flags=result_flags
     )
     db.add(db_request)
     await db.commit()
     await db.refresh(db_request)
+    
+    # Reusable results become candidates for similar future requests
+    if result_pattern_id is not None and input_hash is not None:
+        similarity_index.add(
+            db_request.id, result_pattern_id, description, expected_matches, result_flags, db_request.created_at
+        )
     return db_request
 
+async def create_generations(db: AsyncSession, entries: List[Dict[str, Any]]) -> List[int]:
+    """
+    Store several generations and their requests in a single transaction
+    
+    Each entry has description, sample_text, expected_matches, input_hash and
+    flags, plus either pattern_id of an existing pattern to record the request
+    against, or name, pattern, explanation and test_cases (dictionaries with
+    test_text and should_match) of a new pattern. Nothing is stored if any
+    entry fails.
+    
+    Args:
+        db: Database session
+        entries: Generations to store
+        
+    Returns:
+        Pattern IDs in entry order
+    """
+    stored = []
+    for entry in entries:
+        db_pattern = None
+        if entry.get("pattern_id") is None:
+            db_pattern = RegexPattern(
+                name=entry["name"],
+                pattern=entry["pattern"],
+                sample_text=entry["sample_text"],
+                description=entry["explanation"],
+                redos_score=get_risk_score(entry["pattern"]),
+                test_cases=[
+                    TestCase(test_text=test_case["test_text"], should_match=test_case["should_match"])
+                    for test_case in entry["test_cases"]
+                ]
+            )
+            db.add(db_pattern)
+        db_request = RegexRequest(
+            description=entry["description"],
+            sample_text=entry["sample_text"],
+            expected_matches=entry["expected_matches"],
+            input_hash=entry["input_hash"],
+            result_flags=entry["flags"]
+        )
+        if db_pattern is not None:
+            db_request.result_pattern = db_pattern
+        else:
+            db_request.result_pattern_id = entry["pattern_id"]
+        db.add(db_request)
+        stored.append((entry, db_pattern, db_request))
+    
+    try:
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    
+    # Update the in-memory indexes only once the rows exist
+    pattern_ids = []
+    for entry, db_pattern, db_request in stored:
+        if db_pattern is not None:
+            pattern_library.upsert(db_pattern.id, db_pattern.pattern)
+        pattern_id = db_request.result_pattern_id
+        if entry["input_hash"] is not None:
+            similarity_index.add(
+                db_request.id,
+                pattern_id,
+                entry["description"],
+                entry["expected_matches"],
+                entry["flags"],
+                db_request.created_at
+            )
+        pattern_ids.append(pattern_id)
+    return pattern_ids
+
+async def get_indexable_requests(
+    db: AsyncSession
+) -> List[Tuple[int, int, str, Optional[str], Optional[str], datetime]]:
+    """
+    Get the requests whose results may be offered to similar requests
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        List of (request_id, pattern_id, description, expected_matches, flags, created_at) tuples
+    """
+    query = (
+        select(
+            RegexRequest.id,
+            RegexRequest.result_pattern_id,
+            RegexRequest.description,
+            RegexRequest.expected_matches,
+            RegexRequest.result_flags,
+            RegexRequest.created_at
+        )
+        .where(RegexRequest.result_pattern_id.is_not(None), RegexRequest.input_hash.is_not(None))
+        .order_by(RegexRequest.id)
+    )
+    result = await db.execute(query)
+    return [tuple(row) for row in result.all()]
+
+async def get_cached_request(
+    db: AsyncSession,
+    input_hash: str,
+    max_age: float
+) -> Optional[RegexRequest]:
+    """
+    Get the newest reusable generation request with the given input hash
+    
+    Args:
+        db: Database session
+        input_hash: Normalized input hash
+        max_age: Maximum age of the request in seconds
+        
+    Returns:
+        RegexRequest with its pattern and test cases loaded, or None
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    query = (
+        select(RegexRequest)
+        .join(RegexPattern, RegexRequest.result_pattern_id == RegexPattern.id)
+        .where(RegexRequest.input_hash == input_hash, RegexRequest.created_at >= cutoff)
+        .order_by(RegexRequest.created_at.desc())
+        .limit(1)
+        .options(selectinload(RegexRequest.result_pattern).selectinload(RegexPattern.test_cases))
+    )
+    result = await db.execute(query)
+    return result.scalars().first()
+
+async def invalidate_cached_requests(db: AsyncSession, pattern_id: Optional[int] = None) -> int:
+    """
+    Stop reusing stored generation results
+    
+    Args:
+        db: Database session
+        pattern_id: Only invalidate requests that produced this pattern (all if None)
+        
+    Returns:
+        Number of invalidated requests
+    """
+    query = select(RegexRequest.id).where(RegexRequest.input_hash.is_not(None))
+    if pattern_id is not None:
+        query = query.where(RegexRequest.result_pattern_id == pattern_id)
+    request_ids = list((await db.execute(query)).scalars().all())
+    if request_ids:
+        await db.execute(update(RegexRequest).where(RegexRequest.id.in_(request_ids)).values(input_hash=None))
+        await db.commit()
+    
+    # The similarity index must forget them too, or similar requests keep reusing the pattern
+    if pattern_id is None:
+        similarity_index.clear()
+    else:
+        similarity_index.remove(request_ids)
+    return len(request_ids)
+
 async def get_request(db: AsyncSession, request_id: int) -> Optional[RegexRequest]:
     """
     Get a regex request by ID
@@ -192,6 +402,167 @@ async def get_request(db: AsyncSession, request_id: int) -> Optional[RegexReques
     result = await db.execute(query)
     return result.scalars().first()
 
+# GenerationJob operations
+async def create_job(
+    db: AsyncSession,
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None,
+    bypass_cache: bool = False,
+    candidates: Optional[int] = None
+) -> GenerationJob:
+    """
+    Queue a generation job
+    
+    Args:
+        db: Database session
+        description: Description of what the regex should do
+        sample_text: Sample text for testing
+        expected_matches: Expected matches (if provided)
+        bypass_cache: Don't reuse stored results
+        candidates: Maximum number of AI candidates to try
+        
+    Returns:
+        Created GenerationJob instance
+    """
+    db_job = GenerationJob(
+        description=description,
+        sample_text=sample_text,
+        expected_matches=expected_matches,
+        bypass_cache=bypass_cache,
+        candidates=candidates
+    )
+    db.add(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    return db_job
+
+async def get_job(db: AsyncSession, job_id: int) -> Optional[GenerationJob]:
+    """
+    Get a generation job by ID, reloading it if the session already holds it
+    
+    Args:
+        db: Database session
+        job_id: ID of the job
+        
+    Returns:
+        GenerationJob instance or None if not found
+    """
+    query = select(GenerationJob).where(GenerationJob.id == job_id).execution_options(populate_existing=True)
+    result = await db.execute(query)
+    return result.scalars().first()
+
+async def claim_next_job(db: AsyncSession) -> Optional[GenerationJob]:
+    """
+    Mark the oldest queued job as running and return it
+    
+    The status change is conditional, so concurrent workers (in this or
+    another process) never claim the same job.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        The claimed GenerationJob, or None if the queue is empty
+    """
+    while True:
+        query = select(GenerationJob.id).where(GenerationJob.status == "queued").order_by(GenerationJob.id).limit(1)
+        job_id = (await db.execute(query)).scalar()
+        if job_id is None:
+            return None
+        
+        result = await db.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == job_id, GenerationJob.status == "queued")
+            .values(status="running", started_at=datetime.utcnow(), attempts=GenerationJob.attempts + 1)
+        )
+        await db.commit()
+        if result.rowcount:
+            return await get_job(db, job_id)
+
+async def finish_job(
+    db: AsyncSession,
+    job_id: int,
+    result: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None
+) -> None:
+    """
+    Record the outcome of a job
+    
+    Args:
+        db: Database session
+        job_id: ID of the job
+        result: Generation result (marks the job succeeded)
+        error: Error message (marks the job failed)
+    """
+    await db.execute(
+        update(GenerationJob)
+        .where(GenerationJob.id == job_id)
+        .values(
+            status="failed" if error is not None else "succeeded",
+            result=json.dumps(result) if result is not None else None,
+            error=error,
+            finished_at=datetime.utcnow()
+        )
+    )
+    await db.commit()
+
+async def requeue_interrupted_jobs(
+    db: AsyncSession,
+    max_attempts: int,
+    started_before: datetime
+) -> Tuple[int, int]:
+    """
+    Put jobs abandoned by a stopped or crashed process back in the queue
+    
+    Only jobs running since before started_before count as abandoned, so
+    jobs that live processes are still running are left alone. Jobs that
+    were already interrupted max_attempts times are failed instead, so a
+    job that crashes its worker can't do so forever.
+    
+    Args:
+        db: Database session
+        max_attempts: Number of attempts after which a job is given up
+        started_before: Jobs started before this time are requeued
+        
+    Returns:
+        Tuple of (requeued, failed) job counts
+    """
+    abandoned = (GenerationJob.status == "running", GenerationJob.started_at < started_before)
+    failed = await db.execute(
+        update(GenerationJob)
+        .where(*abandoned, GenerationJob.attempts >= max_attempts)
+        .values(status="failed", error="Interrupted too many times", finished_at=datetime.utcnow())
+    )
+    requeued = await db.execute(
+        update(GenerationJob)
+        .where(*abandoned)
+        .values(status="queued", started_at=None)
+    )
+    await db.commit()
+    return requeued.rowcount, failed.rowcount
+
+async def release_jobs(db: AsyncSession, job_ids: List[int]) -> int:
+    """
+    Put running jobs back in the queue without counting the attempt
+    
+    Used on shutdown for the jobs this process was running.
+    
+    Args:
+        db: Database session
+        job_ids: IDs of the jobs
+        
+    Returns:
+        Number of jobs requeued
+    """
+    result = await db.execute(
+        update(GenerationJob)
+        .where(GenerationJob.id.in_(job_ids), GenerationJob.status == "running")
+        .values(status="queued", started_at=None, attempts=GenerationJob.attempts - 1)
+    )
+    await db.commit()
+    return result.rowcount
+
 # TestCase operations
 async def create_test_case(
     db: AsyncSession,
@@ -250,4 +621,56 @@ async def delete_test_case(db: AsyncSession, test_case_id: int) -> bool:
     query = delete(TestCase).where(TestCase.id == test_case_id)
     result = await db.execute(query)
     await db.commit()
-    return result.rowcount > 0
\ No newline at end of file
+    return result.rowcount > 0
+
+# PatternBenchmark operations
+async def create_benchmark(
+    db: AsyncSession,
+    regex_pattern_id: int,
+    pattern: str,
+    growth_class: str,
+    exponent: Optional[float],
+    timings: Dict[str, Any]
+) -> PatternBenchmark:
+    """
+    Store a benchmark result for a pattern
+    
+    Args:
+        db: Database session
+        regex_pattern_id: ID of the benchmarked pattern
+        pattern: Pattern string at the time of the benchmark
+        growth_class: Fitted growth class (linear, polynomial, exponential)
+        exponent: Fitted power-law exponent (if available)
+        timings: Raw timings per input kind
+        
+    Returns:
+        Created PatternBenchmark instance
+    """
+    db_benchmark = PatternBenchmark(
+        regex_pattern_id=regex_pattern_id,
+        pattern=pattern,
+        growth_class=growth_class,
+        exponent=exponent,
+        timings=json.dumps(timings)
+    )
+    db.add(db_benchmark)
+    await db.commit()
+    await db.refresh(db_benchmark)
+    return db_benchmark
+
+async def get_benchmarks(db: AsyncSession, pattern_id: int) -> List[PatternBenchmark]:
+    """
+    Get all benchmarks for a pattern, newest first
+    
+    Args:
+        db: Database session
+        pattern_id: ID of the pattern
+        
+    Returns:
+        List of PatternBenchmark instances
+    """
+    query = select(PatternBenchmark).where(
+        PatternBenchmark.regex_pattern_id == pattern_id
+    ).order_by(PatternBenchmark.created_at.desc(), PatternBenchmark.id.desc())
+    result = await db.execute(query)
+    return list(result.scalars().all())
@@ -0,0 +1,699 @@
+"""
+Service for producing, reusing and persisting regex generations
+"""
+import os
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.services.ai_service import (
+    generate_regex_with_ai,
+    stream_regex_with_ai,
+    parse_ai_response,
+    JSONFieldStream,
+    OPENAI_MODEL
+)
+from app.services.regex_service import test_regex
+from app.services.result_cache import content_key
+from app.services.similarity_service import similarity_index, ensure_index_loaded
+from app.services.synthesis_service import synthesize_regex
+from app.services.catalog_service import match_catalog, describes_entry, catalog_result
+from app.services.db_service import (
+    create_pattern,
+    create_request,
+    create_test_case,
+    create_generations,
+    get_cached_request,
+    get_pattern
+)
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# How long a stored generation is reused for identical inputs (seconds, 0 disables)
+GENERATION_CACHE_TTL = float(os.environ.get("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Fields reported by stream_generation, in the order the prompt asks for them
+STREAMED_FIELDS = ("pattern", "explanation", "test_cases", "flags")
+
+# Maximum number of generations in one batch request
+GENERATION_BATCH_MAX_ITEMS = int(os.environ.get("GENERATION_BATCH_MAX_ITEMS", "100"))
+
+# Default number of AI candidates a generation may try (1 disables hedging)
+GENERATION_CANDIDATES = int(os.environ.get("GENERATION_CANDIDATES", "1"))
+
+# How long a candidate may take before another one is started (seconds)
+GENERATION_HEDGE_DELAY = float(os.environ.get("GENERATION_HEDGE_DELAY", "3"))
+
+# Sampling temperature of additional candidates, so they differ from the first
+HEDGE_TEMPERATURE = 0.8
+
+def normalize_generation_inputs(
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None
+) -> Tuple[str, str, List[str]]:
+    """
+    Normalize generation inputs so trivially different requests share a key
+
+    The description is case-folded with whitespace collapsed. The sample text
+    only has its line endings and trailing whitespace normalized, since its
+    exact content decides what the pattern has to match. Expected matches are
+    treated as a set of lines.
+
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        Tuple of (description, sample text, sorted expected match lines)
+    """
+    description = " ".join(description.split()).casefold()
+    sample_text = sample_text.replace("\r\n", "\n").rstrip()
+    expected = sorted({line.strip() for line in (expected_matches or "").splitlines() if line.strip()})
+    return description, sample_text, expected
+
+def generation_input_hash(
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None
+) -> str:
+    """
+    Hash normalized generation inputs (and the model) into a cache key
+
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return content_key("generation", OPENAI_MODEL, *normalize_generation_inputs(description, sample_text, expected_matches))
+
+def passes_verification(test_result: Dict[str, Any], expected_matches: Optional[str] = None) -> bool:
+    """
+    Whether a pattern's test result on the sample text is acceptable
+
+    The pattern has to match something, and every expected match line has to
+    be among the full matches.
+
+    Args:
+        test_result: Result of test_regex on the sample text
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        True if the pattern passes
+    """
+    if not test_result.get("success") or not test_result.get("match_count"):
+        return False
+    found = {match["full_match"] for match in test_result.get("matches", [])}
+    expected = normalize_generation_inputs("", "", expected_matches)[2]
+    return all(line in found for line in expected)
+
+def is_reusable(generation: Dict[str, Any], expected_matches: Optional[str] = None) -> bool:
+    """
+    Whether a generation is good enough to serve for identical or similar requests
+
+    Only patterns that pass verification on their own sample text are
+    reused, so failed or useless generations are retried next time.
+
+    Args:
+        generation: Result of produce_generation
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        True if the generation may be cached
+    """
+    return passes_verification(generation.get("test_result") or {}, expected_matches)
+
+async def build_generation(result: Dict[str, Any], sample_text: str) -> Dict[str, Any]:
+    """
+    Normalize a parsed AI response and test its pattern against the sample text
+
+    Args:
+        result: Parsed AI response with pattern, explanation, test_cases and flags
+        sample_text: Sample text containing examples of what to match
+
+    Returns:
+        Dictionary with pattern, explanation, flags, test_cases and test_result
+    """
+    flags = result.get("flags") or ""
+
+    test_cases = [
+        {"test_text": test_case["text"], "should_match": test_case["should_match"]}
+        for test_case in result.get("test_cases", [])
+        if isinstance(test_case, dict) and "text" in test_case and "should_match" in test_case
+    ]
+
+    # Test the pattern against the sample text
+    test_result = await test_regex(result["pattern"], sample_text, flags)
+
+    return {
+        "pattern": result["pattern"],
+        "explanation": result.get("explanation", ""),
+        "flags": flags,
+        "test_cases": test_cases,
+        "test_result": test_result
+    }
+
+async def produce_generation(
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Generate a pattern with AI and test it against the sample text
+
+    Nothing is written to the database.
+
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        Dictionary with pattern, explanation, flags, test_cases and test_result
+    """
+    result = await generate_regex_with_ai(description, sample_text, expected_matches)
+    return await build_generation(result, sample_text)
+
+async def produce_hedged_generation(
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None,
+    candidates: Optional[int] = None,
+    hedge_delay: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Generate a pattern with up to several concurrent AI calls
+
+    Another call is started whenever no candidate arrived within the hedge
+    delay, or as soon as one fails verification against the sample text and
+    expected matches, until there have been `candidates` calls. The first
+    candidate that passes wins and the calls still outstanding are
+    cancelled. If none passes, the first one that arrived is returned.
+
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+        candidates: Maximum number of AI calls (defaults to GENERATION_CANDIDATES)
+        hedge_delay: Seconds to wait for a candidate before starting another
+            (defaults to GENERATION_HEDGE_DELAY)
+
+    Returns:
+        Dictionary shaped like produce_generation
+    """
+    candidates = candidates or GENERATION_CANDIDATES
+    hedge_delay = GENERATION_HEDGE_DELAY if hedge_delay is None else hedge_delay
+
+    async def attempt(index: int) -> Dict[str, Any]:
+        if index == 0:
+            return await produce_generation(description, sample_text, expected_matches)
+        result = await generate_regex_with_ai(description, sample_text, expected_matches, temperature=HEDGE_TEMPERATURE)
+        return await build_generation(result, sample_text)
+
+    running: set = set()
+    launched = 0
+    fallback: Optional[Dict[str, Any]] = None
+    error: Optional[BaseException] = None
+
+    def launch() -> None:
+        nonlocal launched
+        running.add(asyncio.ensure_future(attempt(launched)))
+        launched += 1
+
+    launch()
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running,
+                timeout=hedge_delay if launched < candidates else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logger.info(f"Hedging generation with candidate {launched + 1} of {candidates}")
+                launch()
+                continue
+
+            for task in done:
+                running.discard(task)
+                if task.exception() is not None:
+                    logger.warning(f"Generation candidate failed: {task.exception()}")
+                    error = error or task.exception()
+                    continue
+                generation = task.result()
+                if passes_verification(generation["test_result"], expected_matches):
+                    logger.info(f"Generation candidate passed after {launched} of {candidates} calls")
+                    return generation
+                fallback = fallback or generation
+
+            # A rejected or failed candidate is replaced at once
+            if launched < candidates:
+                launch()
+    finally:
+        for task in running:
+            task.cancel()
+
+    if fallback is None:
+        raise error
+    return fallback
+
+async def produce_local_generation(
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Generate a pattern without the AI, if the inputs allow it
+
+    Catalog patterns for formats named in the description are tried first
+    and served if they pass verification on the sample text. Without
+    expected matches to verify against, an entry is only served if the
+    description asks for nothing narrower than its format. Synthesis from
+    expected matches only succeeds when the inferred pattern matches exactly
+    their occurrences in the sample text.
+
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        Dictionary shaped like produce_generation plus source, or None
+    """
+    for entry in match_catalog(description):
+        if not expected_matches and not describes_entry(description, entry):
+            continue
+        generation = await build_generation(catalog_result(entry), sample_text)
+        if passes_verification(generation["test_result"], expected_matches):
+            logger.info(f"Serving catalog pattern {entry['name']}")
+            return {**generation, "source": "catalog"}
+
+    result = await synthesize_regex(expected_matches, sample_text)
+    if result is None:
+        return None
+    generation = await build_generation(result, sample_text)
+    return {**generation, "source": "synthesized"}
+
+def pattern_name(description: str) -> str:
+    """Name of a generated pattern: its description, shortened to 50 characters"""
+    return description[:50] + "..." if len(description) > 50 else description
+
+async def persist_generation(
+    db: AsyncSession,
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str],
+    generation: Dict[str, Any],
+    input_hash: Optional[str] = None
+) -> int:
+    """
+    Store a generation as a pattern with test cases and record the request
+
+    Args:
+        db: Database session
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+        generation: Result of produce_generation
+        input_hash: Normalized input hash, given when the result may be reused
+
+    Returns:
+        ID of the created pattern
+    """
+    # Create pattern in database
+    db_pattern = await create_pattern(
+        db,
+        name=pattern_name(description),
+        pattern=generation["pattern"],
+        sample_text=sample_text,
+        description=generation["explanation"]
+    )
+
+    # Create regex request in database
+    await create_request(
+        db,
+        description=description,
+        sample_text=sample_text,
+        expected_matches=expected_matches,
+        result_pattern_id=db_pattern.id,
+        input_hash=input_hash,
+        result_flags=generation["flags"]
+    )
+
+    # Create test cases
+    for test_case in generation["test_cases"]:
+        await create_test_case(
+            db,
+            regex_pattern_id=db_pattern.id,
+            test_text=test_case["test_text"],
+            should_match=test_case["should_match"]
+        )
+
+    return db_pattern.id
+
+async def lookup_generation(db: AsyncSession, input_hash: str, sample_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a stored generation for identical inputs, if one is fresh enough
+
+    Args:
+        db: Database session
+        input_hash: Normalized input hash
+        sample_text: Sample text to report the test result against
+
+    Returns:
+        Dictionary shaped like produce_generation plus pattern_id, or None
+    """
+    if GENERATION_CACHE_TTL <= 0:
+        return None
+
+    db_request = await get_cached_request(db, input_hash, GENERATION_CACHE_TTL)
+    if db_request is None:
+        return None
+
+    db_pattern = db_request.result_pattern
+    flags = db_request.result_flags or ""
+    return {
+        "pattern": db_pattern.pattern,
+        "pattern_id": db_pattern.id,
+        "explanation": db_pattern.description or "",
+        "flags": flags,
+        "test_cases": [
+            {"test_text": test_case.test_text, "should_match": test_case.should_match}
+            for test_case in db_pattern.test_cases
+        ],
+        "test_result": await test_regex(db_pattern.pattern, sample_text, flags)
+    }
+
+async def lookup_similar_generation(
+    db: AsyncSession,
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Reuse the pattern of a similar earlier request if it works on this sample
+
+    Candidates come from the local trigram index, subject to the same
+    GENERATION_CACHE_TTL as identical requests; each one is re-verified
+    against the new sample text and expected matches before it is returned.
+
+    Args:
+        db: Database session
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        Dictionary shaped like produce_generation plus pattern_id and
+        similarity, or None
+    """
+    if GENERATION_CACHE_TTL <= 0:
+        return None
+
+    await ensure_index_loaded(db)
+
+    candidates = similarity_index.query(description, expected_matches, max_age=GENERATION_CACHE_TTL)
+    for pattern_id, flags, similarity in candidates:
+        db_pattern = await get_pattern(db, pattern_id)
+        if db_pattern is None:
+            continue
+
+        test_result = await test_regex(db_pattern.pattern, sample_text, flags)
+        if not passes_verification(test_result, expected_matches):
+            continue
+
+        return {
+            "pattern": db_pattern.pattern,
+            "pattern_id": db_pattern.id,
+            "explanation": db_pattern.description or "",
+            "flags": flags,
+            "test_cases": [
+                {"test_text": test_case.test_text, "should_match": test_case.should_match}
+                for test_case in db_pattern.test_cases
+            ],
+            "test_result": test_result,
+            "similarity": similarity
+        }
+
+    return None
+
+async def reuse_generation(
+    db: AsyncSession,
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str],
+    input_hash: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Find a stored generation for identical inputs, then for similar ones
+
+    Args:
+        db: Database session
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+        input_hash: Normalized input hash
+
+    Returns:
+        Dictionary shaped like generate_regex_pattern's result, or None
+    """
+    cached = await lookup_generation(db, input_hash, sample_text)
+    if cached is not None:
+        logger.info(f"Generation cache hit for pattern {cached['pattern_id']}")
+        return {**cached, "source": "cache"}
+
+    similar = await lookup_similar_generation(db, description, sample_text, expected_matches)
+    if similar is not None:
+        logger.info(f"Reusing pattern {similar['pattern_id']} of a similar request ({similar['similarity']:.2f})")
+        # Record the request so an identical one is an exact hit next time
+        await create_request(
+            db,
+            description=description,
+            sample_text=sample_text,
+            expected_matches=expected_matches,
+            result_pattern_id=similar["pattern_id"],
+            input_hash=input_hash,
+            result_flags=similar["flags"]
+        )
+        return {**similar, "source": "similar"}
+
+    return None
+
+async def generate_regex_pattern(
+    db: AsyncSession,
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None,
+    bypass_cache: bool = False,
+    candidates: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Generate a regex pattern, reusing a stored result for identical or
+    similar inputs before calling the AI
+
+    Args:
+        db: Database session
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+        bypass_cache: Don't reuse stored results (the new result replaces the cached one)
+        candidates: Maximum number of AI candidates to try (see produce_hedged_generation)
+
+    Returns:
+        Dictionary with pattern, pattern_id, explanation, flags, test_cases,
+        test_result and source ("cache", "similar", "catalog", "synthesized"
+        or "ai")
+    """
+    input_hash = generation_input_hash(description, sample_text, expected_matches)
+
+    if not bypass_cache:
+        reused = await reuse_generation(db, description, sample_text, expected_matches, input_hash)
+        if reused is not None:
+            return reused
+
+    generation = await produce_local_generation(description, sample_text, expected_matches)
+    if generation is None:
+        generation = await produce_hedged_generation(description, sample_text, expected_matches, candidates)
+        generation = {**generation, "source": "ai"}
+    pattern_id = await persist_generation(
+        db,
+        description,
+        sample_text,
+        expected_matches,
+        generation,
+        input_hash=input_hash if is_reusable(generation, expected_matches) else None
+    )
+    return {**generation, "pattern_id": pattern_id}
+
+async def generate_regex_batch(db: AsyncSession, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Generate regex patterns for several requests at once
+
+    Stored results are looked up first, one item after the other, since the
+    session can't be shared by concurrent tasks. The remaining items (items
+    with identical inputs only once) are then generated concurrently; calls
+    to the AI are paced by the shared provider rate limiter. All new
+    patterns and requests are written in a single transaction at the end.
+
+    Args:
+        db: Database session
+        items: Dictionaries with description, sample_text, expected_matches,
+            bypass_cache and candidates
+
+    Returns:
+        One dictionary per item, in order: generate_regex_pattern's result
+        with status "success", or status "error" and a message
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    entries: List[Tuple[List[int], Dict[str, Any]]] = []
+    pending: Dict[str, List[int]] = {}
+
+    for position, item in enumerate(items):
+        input_hash = generation_input_hash(item["description"], item["sample_text"], item["expected_matches"])
+        if item["bypass_cache"]:
+            pending.setdefault(input_hash, []).append(position)
+            continue
+        try:
+            cached = await lookup_generation(db, input_hash, item["sample_text"])
+            if cached is not None:
+                results[position] = {**cached, "source": "cache"}
+                continue
+            similar = await lookup_similar_generation(
+                db, item["description"], item["sample_text"], item["expected_matches"]
+            )
+        except Exception as e:
+            logger.exception("Error looking up a stored generation")
+            results[position] = {"status": "error", "message": str(e)}
+            continue
+        if similar is not None:
+            results[position] = {**similar, "source": "similar"}
+            entries.append(([position], {**item, **similar, "input_hash": input_hash}))
+        else:
+            pending.setdefault(input_hash, []).append(position)
+
+    async def produce(item: Dict[str, Any]) -> Dict[str, Any]:
+        args = (item["sample_text"], item["expected_matches"])
+        generation = await produce_local_generation(item["description"], *args)
+        if generation is None:
+            generation = await produce_hedged_generation(item["description"], *args, item.get("candidates"))
+            generation = {**generation, "source": "ai"}
+        return generation
+
+    groups = list(pending.items())
+    outcomes = await asyncio.gather(*(produce(items[positions[0]]) for _, positions in groups), return_exceptions=True)
+    for (input_hash, positions), outcome in zip(groups, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Error generating a batch item: {outcome}")
+            for position in positions:
+                results[position] = {"status": "error", "message": str(outcome)}
+            continue
+        item = items[positions[0]]
+        entries.append((positions, {
+            **item,
+            **outcome,
+            "name": pattern_name(item["description"]),
+            "input_hash": input_hash if is_reusable(outcome, item["expected_matches"]) else None
+        }))
+        for position in positions:
+            results[position] = outcome
+
+    pattern_ids = await create_generations(db, [entry for _, entry in entries])
+    for (positions, _), pattern_id in zip(entries, pattern_ids):
+        for position in positions:
+            results[position] = {**results[position], "pattern_id": pattern_id}
+
+    return [result if result.get("status") == "error" else {**result, "status": "success"} for result in results]
+
+async def stream_generation(
+    description: str,
+    sample_text: str,
+    expected_matches: Optional[str] = None,
+    bypass_cache: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate a regex pattern, reporting response fields as they arrive
+
+    Yields a "field" record for each top-level field of the model's JSON as
+    soon as it is complete (normally "pattern" first), then a "done" record
+    with the tested, persisted result. Reused and locally generated results
+    yield their fields at once. The stream opens its own database sessions, since
+    it outlives the request handler, and holds none while the model is
+    generating.
+
+    Args:
+        description: Description of what the regex should do
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Specific parts of the sample text that should match
+        bypass_cache: Don't reuse stored results
+
+    Yields:
+        Records with a "type" of "field", "done" or "error"
+    """
+    input_hash = generation_input_hash(description, sample_text, expected_matches)
+
+    try:
+        if not bypass_cache:
+            async with async_session() as db:
+                reused = await reuse_generation(db, description, sample_text, expected_matches, input_hash)
+            if reused is not None:
+                for field in STREAMED_FIELDS:
+                    yield {"type": "field", "field": field, "value": reused[field]}
+                yield {"type": "done", **reused}
+                return
+
+        generation = await produce_local_generation(description, sample_text, expected_matches)
+        if generation is not None:
+            for field in STREAMED_FIELDS:
+                yield {"type": "field", "field": field, "value": generation[field]}
+            async with async_session() as db:
+                pattern_id = await persist_generation(
+                    db,
+                    description,
+                    sample_text,
+                    expected_matches,
+                    generation,
+                    input_hash=input_hash if is_reusable(generation, expected_matches) else None
+                )
+            yield {"type": "done", **generation, "pattern_id": pattern_id}
+            return
+
+        parser = JSONFieldStream()
+        parts: List[str] = []
+        async for chunk in stream_regex_with_ai(description, sample_text, expected_matches):
+            parts.append(chunk)
+            for field, value in parser.feed(chunk):
+                yield {"type": "field", "field": field, "value": value}
+
+        response_text = "".join(parts)
+        try:
+            result = parse_ai_response(response_text)
+        except json.JSONDecodeError:
+            result = parser.fields
+        if not isinstance(result.get("pattern"), str):
+            logger.error(f"Failed to parse AI response as JSON: {response_text}")
+            yield {"type": "error", "message": "The AI did not return a valid pattern"}
+            return
+
+        generation = await build_generation(result, sample_text)
+        async with async_session() as db:
+            pattern_id = await persist_generation(
+                db,
+                description,
+                sample_text,
+                expected_matches,
+                generation,
+                input_hash=input_hash if is_reusable(generation, expected_matches) else None
+            )
+        yield {"type": "done", **generation, "pattern_id": pattern_id, "source": "ai"}
+
+    except Exception as e:
+        logger.exception("Error streaming regex generation")
+        yield {"type": "error", "message": str(e)}
@@ -0,0 +1,275 @@
+"""
+Service for running regex generations as queued background jobs
+"""
+import os
+import json
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from app.database import async_session
+from app.models import GenerationJob
+from app.services.generation_service import generate_regex_pattern
+from app.services.db_service import (
+    create_job,
+    get_job,
+    claim_next_job,
+    finish_job,
+    requeue_interrupted_jobs,
+    release_jobs
+)
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Number of jobs processed concurrently
+GENERATION_WORKERS = int(os.environ.get("GENERATION_WORKERS", "4"))
+
+# How often idle workers and waiting clients check the database (seconds)
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "2"))
+
+# Number of interrupted attempts after which a job is failed
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+
+# How long a job may run before it is taken to be abandoned by a crashed
+# process and requeued (seconds); must exceed the longest generation
+JOB_LEASE_TIMEOUT = float(os.environ.get("JOB_LEASE_TIMEOUT", "600"))
+
+# Job statuses after which nothing changes any more
+FINISHED_STATUSES = ("succeeded", "failed")
+
+class GenerationJobQueue:
+    """Pool of background workers processing generation jobs from the database
+
+    The generation_jobs table is the queue, so submitted jobs survive
+    restarts. Workers are woken as soon as a job is submitted in this
+    process and otherwise check the table every JOB_POLL_INTERVAL, which
+    also picks up jobs submitted by other processes. Each job opens its own
+    database sessions, so no session is held while the model is generating.
+    Jobs running longer than JOB_LEASE_TIMEOUT are taken to be abandoned by
+    a crashed process and requeued by any process's sweeper.
+    """
+
+    def __init__(self):
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Dict[int, asyncio.Event] = {}
+        self._waiters: Counter = Counter()
+        # IDs of the jobs this queue's workers are running
+        self._running: Set[int] = set()
+
+    @property
+    def running(self) -> bool:
+        """Whether workers are running"""
+        return bool(self._workers)
+
+    async def start(self, workers: int = GENERATION_WORKERS) -> None:
+        """
+        Requeue abandoned jobs and start the workers and the sweeper
+
+        Args:
+            workers: Number of concurrent workers
+        """
+        if self._workers:
+            return
+        await self._requeue_abandoned()
+
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work(), name=f"generation-worker-{index}") for index in range(workers)]
+        self._workers.append(asyncio.create_task(self._sweep(), name="generation-job-sweeper"))
+
+    async def stop(self) -> None:
+        """
+        Stop the workers and put the jobs they were running back in the queue
+
+        If requeueing fails the jobs stay "running" until their lease expires.
+        """
+        running = list(self._running)
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if not running:
+            return
+        try:
+            async with async_session() as db:
+                released = await release_jobs(db, running)
+            logger.info(f"Requeued {released} generation jobs interrupted by shutdown")
+        except Exception:
+            logger.exception("Error requeueing generation jobs on shutdown")
+
+    async def submit(
+        self,
+        description: str,
+        sample_text: str,
+        expected_matches: Optional[str] = None,
+        bypass_cache: bool = False,
+        candidates: Optional[int] = None
+    ) -> GenerationJob:
+        """
+        Queue a generation and wake an idle worker
+
+        Args:
+            description: Description of what the regex should do
+            sample_text: Sample text containing examples of what to match
+            expected_matches: Specific parts of the sample text that should match
+            bypass_cache: Don't reuse stored results
+            candidates: Maximum number of AI candidates to try
+
+        Returns:
+            The queued job
+        """
+        async with async_session() as db:
+            job = await create_job(db, description, sample_text, expected_matches, bypass_cache, candidates)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def wait(self, job_id: int, timeout: float) -> Optional[GenerationJob]:
+        """
+        Wait until a job has finished or the timeout expires
+
+        Args:
+            job_id: ID of the job
+            timeout: Maximum time to wait (seconds)
+
+        Returns:
+            The job in its latest state, or None if it doesn't exist
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with async_session() as db:
+            job = await get_job(db, job_id)
+        if job is None or job.status in FINISHED_STATUSES or timeout <= 0:
+            return job
+
+        # Only waiters on existing unfinished jobs get an event, shared and
+        # dropped with the last of them. The job is read again once the event
+        # is registered, in case it finished in between.
+        finished = self._finished.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] += 1
+        try:
+            while True:
+                async with async_session() as db:
+                    job = await get_job(db, job_id)
+                remaining = deadline - loop.time()
+                if job is None or job.status in FINISHED_STATUSES or remaining <= 0:
+                    return job
+                try:
+                    await asyncio.wait_for(finished.wait(), min(remaining, JOB_POLL_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                self._finished.pop(job_id, None)
+
+    async def _work(self) -> None:
+        """Claim and run jobs until cancelled"""
+        while True:
+            # Cleared before claiming so a submit during the claim isn't missed
+            self._wakeup.clear()
+            try:
+                async with async_session() as db:
+                    job = await claim_next_job(db)
+            except Exception:
+                logger.exception("Error claiming a generation job")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # A failure recording the outcome must not take the worker down with it
+            self._running.add(job.id)
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.exception(f"Error recording the outcome of generation job {job.id}")
+                await self._fail(job.id, f"Could not record the job outcome: {e}")
+            finally:
+                self._running.discard(job.id)
+                finished = self._finished.get(job.id)
+                if finished is not None:
+                    finished.set()
+
+    async def _sweep(self) -> None:
+        """Requeue abandoned jobs every JOB_POLL_INTERVAL until cancelled"""
+        while True:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            try:
+                await self._requeue_abandoned()
+            except Exception:
+                logger.exception("Error requeueing abandoned generation jobs")
+
+    async def _requeue_abandoned(self) -> None:
+        """Requeue jobs running for longer than JOB_LEASE_TIMEOUT and wake the workers"""
+        started_before = datetime.utcnow() - timedelta(seconds=JOB_LEASE_TIMEOUT)
+        async with async_session() as db:
+            requeued, failed = await requeue_interrupted_jobs(db, JOB_MAX_ATTEMPTS, started_before)
+        if requeued or failed:
+            logger.info(f"Requeued {requeued} abandoned generation jobs, gave up on {failed}")
+        if requeued and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self, job: GenerationJob) -> None:
+        """Run one claimed job and record its outcome"""
+        result: Optional[Dict[str, Any]] = None
+        error: Optional[str] = None
+        try:
+            async with async_session() as db:
+                result = await generate_regex_pattern(
+                    db,
+                    job.description,
+                    job.sample_text,
+                    job.expected_matches,
+                    bypass_cache=job.bypass_cache,
+                    candidates=job.candidates
+                )
+        except Exception as e:
+            logger.exception(f"Error running generation job {job.id}")
+            error = str(e)
+
+        async with async_session() as db:
+            await finish_job(db, job.id, result=result, error=error)
+
+    async def _fail(self, job_id: int, error: str) -> None:
+        """
+        Mark a job failed after its outcome couldn't be recorded
+
+        If that fails too the job stays running and is requeued once its lease expires.
+        """
+        try:
+            async with async_session() as db:
+                await finish_job(db, job_id, error=error)
+        except Exception:
+            logger.exception(f"Error marking generation job {job_id} failed")
+
+# Process-wide generation job queue
+job_queue = GenerationJobQueue()
+
+async def start_job_workers() -> None:
+    """Start the generation job workers"""
+    await job_queue.start()
+
+async def stop_job_workers() -> None:
+    """Stop the generation job workers"""
+    await job_queue.stop()
+
+def job_result(job: GenerationJob) -> Optional[Dict[str, Any]]:
+    """
+    Decode the stored result of a job
+
+    Args:
+        job: The job
+
+    Returns:
+        Generation result dictionary, or None if the job hasn't succeeded
+    """
+    return json.loads(job.result) if job.result else None
@@ -0,0 +1,297 @@
+"""
+Service for scanning text against the whole saved pattern library
+"""
+import os
+import regex
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.regex_executor import get_executor, RegexTimeoutError, RegexWorkerError, REGEX_TIMEOUT
+from app.services.regex_service import compile_pattern
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Number of patterns combined into one shard matcher
+LIBRARY_SHARD_SIZE = int(os.environ.get("LIBRARY_SHARD_SIZE", "64"))
+
+# Constructs that change meaning when a pattern is embedded in a larger one:
+# numbered/named backreferences, recursion, conditionals, global inline flags and our own
+# group prefix. Patterns using them are scanned on their own instead.
+STANDALONE_CONSTRUCTS = regex.compile(
+    r"\\[1-9]|\\g<|\(\?P=|\(\?&|\(\?R\)|\(\?[+-]?\d+\)|\(\?\(|\(\?[a-zA-Z0-9^-]+\)|_lib_\d"
+)
+
+def _group_name(pattern_id: int) -> str:
+    """Name of the capture group wrapping a library pattern"""
+    return f"_lib_{pattern_id}"
+
+def build_shard_pattern(members: List[Tuple[int, str]]) -> str:
+    """
+    Combine patterns into a single matcher that reports every pattern
+    matching at each position
+
+    The matcher is a guard alternation of all members, followed by one
+    optional lookahead per member that captures its match in a named group.
+    The guard keeps positions where nothing matches cheap; the lookaheads
+    make overlapping matches from different patterns visible at once.
+
+    Args:
+        members: List of (pattern_id, pattern) pairs
+
+    Returns:
+        Combined pattern string
+    """
+    guard = "|".join(f"(?:{pattern})" for _, pattern in members)
+    captures = "".join(
+        f"(?:(?=(?P<{_group_name(pattern_id)}>{pattern}))|)" for pattern_id, pattern in members
+    )
+    return f"(?=(?:{guard})){captures}"
+
+def run_library_scan(
+    shards: List[Tuple[str, List[Tuple[int, str]]]],
+    standalone: List[Tuple[int, str]],
+    text: str,
+    include_spans: bool = True,
+    timeout: Optional[float] = None
+) -> Dict[int, List[List[int]]]:
+    """
+    Scan a text with shard matchers and standalone patterns (synchronous)
+
+    Runs on the regex executor; shard patterns go through the compiled
+    pattern cache, so only shards that changed since the last scan are
+    recompiled. Per-pattern spans are reduced to finditer's non-overlapping
+    semantics.
+
+    Args:
+        shards: List of (combined pattern, [(pattern_id, pattern), ...]) pairs
+        standalone: List of (pattern_id, pattern) pairs scanned individually
+        text: The text to scan
+        include_spans: Collect every span instead of stopping at the first
+        timeout: Matching budget in seconds enforced by the regex module
+
+    Returns:
+        Dictionary mapping matched pattern IDs to their spans
+    """
+    hits: Dict[int, List[List[int]]] = {}
+    standalone = list(standalone)
+
+    for shard_pattern, members in shards:
+        try:
+            compiled = compile_pattern(shard_pattern)
+        except regex.error:
+            # Members that only break in combination are scanned one by one
+            standalone.extend(members)
+            continue
+
+        names = [(pattern_id, _group_name(pattern_id)) for pattern_id, _ in members]
+        last_end: Dict[int, int] = {}
+        for match in compiled.finditer(text, concurrent=True, timeout=timeout):
+            for pattern_id, name in names:
+                start, end = match.span(name)
+                if start < 0 or start < last_end.get(pattern_id, 0):
+                    continue
+                if not include_spans and pattern_id in hits:
+                    continue
+                # Mirror finditer: an empty match can't repeat at the same spot
+                if start == end and hits.get(pattern_id) and hits[pattern_id][-1] == [start, end]:
+                    continue
+                hits.setdefault(pattern_id, []).append([start, end])
+                last_end[pattern_id] = end
+
+    for pattern_id, pattern in standalone:
+        compiled = compile_pattern(pattern)
+        if include_spans:
+            spans = [list(match.span()) for match in compiled.finditer(text, concurrent=True, timeout=timeout)]
+        else:
+            match = compiled.search(text, concurrent=True, timeout=timeout)
+            spans = [list(match.span())] if match else []
+        if spans:
+            hits[pattern_id] = spans
+
+    return hits
+
+class PatternLibrary:
+    """In-memory multi-pattern matcher over the saved RegexPattern rows
+
+    Patterns are grouped into fixed shards by ID. Creating, updating or
+    deleting a pattern only invalidates the combined matcher of its own
+    shard, which is rebuilt on the next scan.
+    """
+
+    def __init__(self, shard_size: int = LIBRARY_SHARD_SIZE):
+        self.shard_size = max(1, shard_size)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._combinable: Dict[int, Dict[int, str]] = {}
+        self._standalone: Dict[int, str] = {}
+        self._invalid: Dict[int, str] = {}
+        self._shard_patterns: Dict[int, str] = {}
+        self.rebuilds = 0
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the library has been populated from the database"""
+        return self._loaded
+
+    def load(self, patterns: List[Tuple[int, str]]) -> None:
+        """
+        Replace the library contents
+
+        Args:
+            patterns: List of (pattern_id, pattern) pairs
+        """
+        with self._lock:
+            self._combinable.clear()
+            self._standalone.clear()
+            self._invalid.clear()
+            self._shard_patterns.clear()
+            for pattern_id, pattern in patterns:
+                self._add(pattern_id, pattern)
+            self._loaded = True
+
+    def upsert(self, pattern_id: int, pattern: str) -> None:
+        """
+        Add or replace a pattern, invalidating its shard
+
+        Args:
+            pattern_id: ID of the pattern
+            pattern: Regex pattern string
+        """
+        with self._lock:
+            self._discard(pattern_id)
+            self._add(pattern_id, pattern)
+
+    def remove(self, pattern_id: int) -> None:
+        """
+        Remove a pattern, invalidating its shard
+
+        Args:
+            pattern_id: ID of the pattern
+        """
+        with self._lock:
+            self._discard(pattern_id)
+
+    def _add(self, pattern_id: int, pattern: str) -> None:
+        """Classify and store a pattern (lock held)"""
+        try:
+            compile_pattern(pattern)
+        except regex.error as e:
+            self._invalid[pattern_id] = str(e)
+            return
+
+        if STANDALONE_CONSTRUCTS.search(pattern):
+            self._standalone[pattern_id] = pattern
+            return
+
+        shard = pattern_id // self.shard_size
+        self._combinable.setdefault(shard, {})[pattern_id] = pattern
+        self._shard_patterns.pop(shard, None)
+
+    def _discard(self, pattern_id: int) -> None:
+        """Drop a pattern from every collection (lock held)"""
+        self._standalone.pop(pattern_id, None)
+        self._invalid.pop(pattern_id, None)
+        shard = pattern_id // self.shard_size
+        members = self._combinable.get(shard)
+        if members and members.pop(pattern_id, None) is not None:
+            self._shard_patterns.pop(shard, None)
+            if not members:
+                del self._combinable[shard]
+
+    def snapshot(self) -> Tuple[List[Tuple[str, List[Tuple[int, str]]]], List[Tuple[int, str]]]:
+        """
+        Get the current shard matchers and standalone patterns, rebuilding
+        any shard that was invalidated
+
+        Returns:
+            Tuple of (shards, standalone) as accepted by run_library_scan
+        """
+        with self._lock:
+            shards = []
+            for shard, members in sorted(self._combinable.items()):
+                if shard not in self._shard_patterns:
+                    self._shard_patterns[shard] = build_shard_pattern(sorted(members.items()))
+                    self.rebuilds += 1
+                shards.append((self._shard_patterns[shard], sorted(members.items())))
+            return shards, sorted(self._standalone.items())
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get library counters
+
+        Returns:
+            Dictionary with pattern, shard and rebuild counts
+        """
+        with self._lock:
+            return {
+                "combined": sum(len(members) for members in self._combinable.values()),
+                "standalone": len(self._standalone),
+                "invalid": len(self._invalid),
+                "shards": len(self._combinable),
+                "rebuilds": self.rebuilds,
+            }
+
+# Process-wide pattern library
+pattern_library = PatternLibrary()
+
+async def ensure_library_loaded(db: AsyncSession) -> None:
+    """
+    Populate the pattern library from the database on first use
+
+    Args:
+        db: Database session
+    """
+    if pattern_library.loaded:
+        return
+    from app.services.db_service import get_all_pattern_strings
+    pattern_library.load(await get_all_pattern_strings(db))
+
+async def scan_library(
+    db: AsyncSession,
+    text: str,
+    include_spans: bool = True,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Find which saved patterns match a text in a single pass per shard
+
+    Args:
+        db: Database session
+        text: The text to scan
+        include_spans: Report every span instead of only whether it matched
+        timeout: Budget in seconds (defaults to REGEX_TIMEOUT)
+
+    Returns:
+        Dictionary with success flag and a list of per-pattern matches
+    """
+    await ensure_library_loaded(db)
+    shards, standalone = pattern_library.snapshot()
+    budget = timeout if timeout is not None else REGEX_TIMEOUT
+
+    try:
+        hits = await get_executor().run(
+            run_library_scan,
+            shards,
+            standalone,
+            text,
+            include_spans=include_spans,
+            timeout=budget
+        )
+    except (RegexTimeoutError, RegexWorkerError) as e:
+        return {"success": False, "error": str(e), "timed_out": isinstance(e, RegexTimeoutError)}
+
+    return {
+        "success": True,
+        "matches": [
+            {
+                "pattern_id": pattern_id,
+                "match_count": len(spans) if include_spans else None,
+                "spans": spans if include_spans else None
+            }
+            for pattern_id, spans in sorted(hits.items())
+        ]
+    }
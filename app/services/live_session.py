@@ -0,0 +1,266 @@
+"""
+Service for live regex sessions that re-scan only the edited part of a text
+"""
+import os
+import logging
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple
+
+import regex
+
+from app.services.regex_executor import REGEX_TIMEOUT
+from app.services.regex_service import compile_pattern, match_to_dict
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Characters re-scanned on both sides of an edit, so lookarounds and word
+# boundaries that peek across the edit see the new text
+LIVE_CONTEXT = int(os.environ.get("LIVE_CONTEXT", "64"))
+
+# Largest text a live session keeps (characters)
+LIVE_MAX_TEXT = int(os.environ.get("LIVE_MAX_TEXT", str(1 << 22)))
+
+class LiveSession:
+    """Compiled pattern, current text and its matches for one live client
+
+    A pattern or full-text change re-scans everything. An edit re-scans a
+    window from the end of the last match ending well before the changed
+    range, where a full scan would resume too, since an attempt starting in
+    an unmatched stretch can run on into the edit. The window's end uses
+    `partial=True`: a match cut off by it, or an old match straddling it,
+    widens the window until the edge is settled. Matches after the window are
+    only shifted.
+    """
+
+    def __init__(self, timeout: float = REGEX_TIMEOUT):
+        self.timeout = timeout
+        self.pattern: Optional[str] = None
+        self.flags = ""
+        self.text = ""
+        self._compiled: Optional[regex.Pattern] = None
+        self._matches: List[Dict[str, Any]] = []
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    @property
+    def matches(self) -> List[Dict[str, Any]]:
+        """Current matches in text order"""
+        return self._matches
+
+    def clear(self) -> None:
+        """Forget the pattern and matches; the client must send the pattern again"""
+        self.pattern = None
+        self._compiled = None
+        self._store([])
+
+    def _store(self, matches: List[Dict[str, Any]]) -> None:
+        """Replace the match list and its position indexes"""
+        self._matches = matches
+        self._starts = [m["start"] for m in matches]
+        self._ends = [m["end"] for m in matches]
+
+    def _scan(self, text: str, pos: int, window_end: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Find the matches starting in a window
+
+        Unless the window reaches the end of the text, matching sees
+        LIVE_CONTEXT characters past it with `partial=True`, so lookaheads and
+        anchors near the edge are judged on real text.
+
+        Args:
+            text: The text to scan
+            pos: Position to start scanning at
+            window_end: End of the window
+
+        Returns:
+            Tuple of (complete matches, whether a match ran past the window end)
+        """
+        partial = window_end < len(text)
+        endpos = min(len(text), window_end + LIVE_CONTEXT) if partial else len(text)
+        matches = []
+        for match in self._compiled.finditer(
+            text, pos, endpos, partial=partial, concurrent=True, timeout=self.timeout
+        ):
+            # Matches from the window end on belong to the unchanged tail
+            if partial and match.start() >= window_end:
+                break
+            if match.partial or match.end() > window_end:
+                return matches, True
+            matches.append(match_to_dict(match))
+        return matches, False
+
+    def _reset(self, error: Optional[str] = None) -> Dict[str, Any]:
+        """Re-scan the whole text and describe the result as a reset"""
+        if self._compiled is None:
+            self._store([])
+        else:
+            self._store(self._scan(self.text, 0, len(self.text))[0])
+        return {
+            "type": "reset",
+            "matches": self._matches,
+            "match_count": len(self._matches),
+            "error": error,
+        }
+
+    def set_pattern(self, pattern: str, flags: str = "") -> Dict[str, Any]:
+        """
+        Compile a new pattern and re-scan the whole text
+
+        Args:
+            pattern: The regex pattern
+            flags: String of regex flags (i, m, s, x)
+
+        Returns:
+            Reset message with all matches, or the compile error
+        """
+        self.pattern, self.flags = pattern, flags
+        try:
+            self._compiled = compile_pattern(pattern, flags)
+        except regex.error as e:
+            self._compiled = None
+            return self._reset(str(e))
+        return self._reset()
+
+    def set_text(self, text: str) -> Dict[str, Any]:
+        """
+        Replace the whole text and re-scan it
+
+        Args:
+            text: The new text
+
+        Returns:
+            Reset message with all matches
+        """
+        if len(text) > LIVE_MAX_TEXT:
+            raise ValueError(f"Text exceeds {LIVE_MAX_TEXT} characters")
+        self.text = text
+        return self._reset()
+
+    def apply_edit(self, start: int, end: int, replacement: str) -> Dict[str, Any]:
+        """
+        Replace text[start:end] and re-scan only the affected region
+
+        The client applies the returned update by dropping its matches that
+        start in [update start, update old_end), inserting the update's
+        matches, and shifting matches that start at or after old_end by delta.
+
+        Args:
+            start: Start of the replaced range
+            end: End of the replaced range (exclusive)
+            replacement: Text inserted in place of the range
+
+        Returns:
+            Update message with the re-scanned window and the new matches in it
+
+        Raises:
+            ValueError: If the range is outside the text
+        """
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(f"Edit range {start}-{end} is outside the text (length {len(self.text)})")
+        if len(self.text) - (end - start) + len(replacement) > LIVE_MAX_TEXT:
+            raise ValueError(f"Text exceeds {LIVE_MAX_TEXT} characters")
+
+        old_text = self.text
+        text = old_text[:start] + replacement + old_text[end:]
+        delta = len(replacement) - (end - start)
+        self.text = text
+
+        if self._compiled is None:
+            return {"type": "update", "start": start, "old_end": end, "delta": delta, "matches": [], "match_count": 0}
+
+        # Old matches ending at least the context before the edit are kept.
+        # Scanning resumes where a full scan would after the last of them: an
+        # attempt between it and the edit may have run on into the edit (a+b
+        # on a long run of a's), so it must be retried too.
+        first = bisect_left(self._ends, start - LIVE_CONTEXT)
+        window_start = self._ends[first - 1] if first else 0
+        # Old matches from after the edit, candidates for keeping as they are
+        tail = bisect_left(self._starts, end, lo=first)
+
+        window_end = start + len(replacement) + LIVE_CONTEXT
+        # Old matches from before the edit's end are dropped, so the window
+        # must cover all of them or a match that survives the edit is lost
+        if tail > first:
+            window_end = max(window_end, max(self._ends[first:tail]) + delta)
+        while True:
+            # Close enough to the end to just scan the rest of the text
+            if window_end + LIVE_CONTEXT >= len(text):
+                window_end = len(text)
+            window, cut_off = self._scan(text, window_start, window_end)
+            if cut_off:
+                window_end += max(LIVE_CONTEXT, window_end - window_start)
+                continue
+            # Old matches kept after the window must start at or after its end
+            # and must not straddle it
+            at_end = window_end == len(text)
+            while tail < len(self._matches) and (at_end or self._starts[tail] + delta < window_end):
+                if self._ends[tail] + delta > window_end:
+                    window_end = self._ends[tail] + delta
+                    break
+                tail += 1
+            else:
+                break
+
+        # A kept empty match at the window start is found again by the re-scan
+        # and belongs to the window, which clients replace from its start on
+        if window and first and window[0]["end"] == window_start == self._starts[first - 1]:
+            first -= 1
+
+        shifted = []
+        for match in self._matches[tail:]:
+            if delta:
+                match = _shift_match(match, delta)
+            shifted.append(match)
+
+        self._store(self._matches[:first] + window + shifted)
+        return {
+            "type": "update",
+            "start": window_start,
+            "old_end": window_end - delta,
+            "delta": delta,
+            "matches": window,
+            "match_count": len(self._matches),
+        }
+
+def _shift_match(match: Dict[str, Any], delta: int) -> Dict[str, Any]:
+    """Move a match dictionary and its groups by delta characters"""
+    return {
+        **match,
+        "start": match["start"] + delta,
+        "end": match["end"] + delta,
+        "groups": [
+            {**group, "start": group["start"] + delta, "end": group["end"] + delta}
+            for group in match["groups"]
+        ],
+    }
+
+def handle_live_message(session: LiveSession, message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply one client message to a live session (synchronous)
+
+    Args:
+        session: The client's live session
+        message: {"type": "pattern", "pattern", "flags"}, {"type": "text", "text"}
+            or {"type": "edit", "start", "end", "text"}
+
+    Returns:
+        Message to send back to the client
+    """
+    kind = message.get("type")
+    try:
+        if kind == "pattern":
+            return session.set_pattern(str(message.get("pattern", "")), str(message.get("flags", "")))
+        if kind == "text":
+            return session.set_text(str(message.get("text", "")))
+        if kind == "edit":
+            return session.apply_edit(int(message["start"]), int(message["end"]), str(message.get("text", "")))
+        return {"type": "error", "error": f"Unknown message type: {kind}"}
+
+    except TimeoutError:
+        # The session's matches are no longer reliable
+        session.clear()
+        return {"type": "error", "error": f"Regex evaluation timed out after {session.timeout:g}s", "timed_out": True}
+
+    except (KeyError, TypeError, ValueError) as e:
+        return {"type": "error", "error": str(e)}
@@ -0,0 +1,73 @@
+"""
+Token-bucket rate limiting of calls to the AI provider
+"""
+import time
+import asyncio
+from typing import Optional
+
+class TokenBucket:
+    """Bucket refilled continuously at a per-minute rate, holding at most a minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self) -> None:
+        """Add what accrued since the last refill"""
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until the bucket holds the amount (capped at its capacity)"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits shared by all callers
+
+    Callers acquire one request and an estimated number of tokens before each
+    provider call and wait, in arrival order, until both buckets can cover
+    it. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any limit is configured"""
+        return self._requests is not None or self._tokens is not None
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        Wait until a request of the given size fits both limits, then take it
+
+        Args:
+            tokens: Estimated tokens of the request (prompt and completion)
+        """
+        if not self.enabled:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # The lock keeps waiters in arrival order; a large request isn't starved by small ones
+        async with self._lock:
+            while True:
+                delay = 0.0
+                for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill()
+                        delay = max(delay, bucket.delay(amount))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= min(tokens, self._tokens.capacity)
@@ -0,0 +1,293 @@
+"""
+Service for static ReDoS (catastrophic backtracking) risk analysis
+"""
+import os
+import string
+import logging
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+
+import regex
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (
+        MAXREPEAT, MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT, ATOMIC_GROUP,
+        SUBPATTERN, BRANCH, IN, LITERAL, NOT_LITERAL, ANY, ASSERT, ASSERT_NOT,
+        GROUPREF_EXISTS, CATEGORY, RANGE, NEGATE,
+        CATEGORY_DIGIT, CATEGORY_NOT_DIGIT, CATEGORY_SPACE, CATEGORY_NOT_SPACE,
+        CATEGORY_WORD, CATEGORY_NOT_WORD,
+    )
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import (
+        MAXREPEAT, MAX_REPEAT, MIN_REPEAT, SUBPATTERN, BRANCH, IN, LITERAL,
+        NOT_LITERAL, ANY, ASSERT, ASSERT_NOT, GROUPREF_EXISTS,
+        CATEGORY, RANGE, NEGATE,
+        CATEGORY_DIGIT, CATEGORY_NOT_DIGIT, CATEGORY_SPACE, CATEGORY_NOT_SPACE,
+        CATEGORY_WORD, CATEGORY_NOT_WORD,
+    )
+    POSSESSIVE_REPEAT = ATOMIC_GROUP = None
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Patterns scoring at or above this are treated as high risk
+REDOS_HIGH_SCORE = int(os.environ.get("REDOS_HIGH_SCORE", "60"))
+
+# Patterns scoring at or above this are treated as medium risk
+REDOS_MEDIUM_SCORE = int(os.environ.get("REDOS_MEDIUM_SCORE", "25"))
+
+# What test_regex does with high-risk patterns: "reject", "downgrade" or "off"
+REDOS_POLICY = os.environ.get("REDOS_POLICY", "downgrade").lower()
+
+# Wall-clock budget for high-risk patterns under the downgrade policy (seconds)
+REDOS_DOWNGRADE_TIMEOUT = float(os.environ.get("REDOS_DOWNGRADE_TIMEOUT", "0.5"))
+
+# Repeats with at least this many iterations are treated like unbounded ones
+LARGE_REPEAT = 10
+
+# Representative characters used to decide whether two char sets overlap
+SAMPLE_ALPHABET = frozenset(string.printable) | frozenset("é Ж٣ ")
+
+# Weight of each finding kind in the risk score
+FINDING_WEIGHTS = {
+    "nested_quantifier": 60,
+    "ambiguous_repetition": 60,
+    "overlapping_alternation": 50,
+    "adjacent_quantifiers": 25,
+}
+
+CATEGORY_TESTS = {
+    CATEGORY_DIGIT: lambda ch: ch.isdecimal(),
+    CATEGORY_NOT_DIGIT: lambda ch: not ch.isdecimal(),
+    CATEGORY_SPACE: lambda ch: ch.isspace(),
+    CATEGORY_NOT_SPACE: lambda ch: not ch.isspace(),
+    CATEGORY_WORD: lambda ch: ch.isalnum() or ch == "_",
+    CATEGORY_NOT_WORD: lambda ch: not (ch.isalnum() or ch == "_"),
+}
+
+REPEATS = (MAX_REPEAT, MIN_REPEAT)
+
+def _class_chars(items: List[Tuple[Any, Any]]) -> FrozenSet[str]:
+    """Evaluate a character class over the sample alphabet"""
+    negate = any(op is NEGATE for op, _ in items)
+    candidates = set(SAMPLE_ALPHABET)
+    candidates.update(chr(av) for op, av in items if op is LITERAL)
+
+    def member(ch: str) -> bool:
+        for op, av in items:
+            if op is LITERAL and ord(ch) == av:
+                return True
+            if op is RANGE and av[0] <= ord(ch) <= av[1]:
+                return True
+            if op is CATEGORY and CATEGORY_TESTS.get(av, lambda _: True)(ch):
+                return True
+        return False
+
+    return frozenset(ch for ch in candidates if member(ch) != negate)
+
+class _Analyzer:
+    """Walks a parsed pattern and collects risky structures"""
+
+    def __init__(self, parsed):
+        self.state = parsed.state
+        self.findings: List[Dict[str, str]] = []
+
+    def width(self, item) -> Tuple[int, int]:
+        """Minimum and maximum width of a single item"""
+        return sre_parse.SubPattern(self.state, [item]).getwidth()
+
+    def nullable(self, item) -> bool:
+        """Whether an item can match the empty string"""
+        return self.width(item)[0] == 0
+
+    def first_chars(self, items) -> FrozenSet[str]:
+        """Characters that can start a match of a sequence"""
+        chars: set = set()
+        for item in items:
+            chars |= self.item_first_chars(item)
+            if not self.nullable(item):
+                break
+        return frozenset(chars)
+
+    def item_first_chars(self, item) -> FrozenSet[str]:
+        """Characters that can start a match of a single item"""
+        op, av = item
+        if op is LITERAL:
+            return frozenset(chr(av))
+        if op is NOT_LITERAL:
+            return SAMPLE_ALPHABET - {chr(av)}
+        if op is ANY:
+            return SAMPLE_ALPHABET - {"\n"}
+        if op is IN:
+            return _class_chars(av)
+        if op in REPEATS or op is POSSESSIVE_REPEAT:
+            return self.first_chars(av[2]) if av[1] else frozenset()
+        if op is SUBPATTERN:
+            return self.first_chars(av[-1])
+        if op is ATOMIC_GROUP:
+            return self.first_chars(av)
+        if op is BRANCH:
+            return frozenset().union(*(self.first_chars(alt) for alt in av[1]))
+        if op is GROUPREF_EXISTS:
+            return frozenset().union(*(self.first_chars(alt) for alt in av[1:] if alt))
+        return frozenset()
+
+    def add(self, kind: str, description: str) -> None:
+        """Record a finding"""
+        self.findings.append({"kind": kind, "description": description})
+
+    def is_large_repeat(self, item) -> bool:
+        """Whether an item is a greedy/lazy repeat with many iterations"""
+        op, av = item
+        return op in REPEATS and (av[1] is MAXREPEAT or av[1] >= LARGE_REPEAT) and self.width(item)[1] > 0
+
+    def walk(self, items) -> None:
+        """Analyze a sequence and everything nested inside it"""
+        items = list(items)
+        self.check_adjacent(items)
+        for item in items:
+            op, av = item
+            if op in REPEATS:
+                if self.is_large_repeat(item):
+                    self.check_repeat_body(list(av[2]))
+                self.walk(av[2])
+            elif op is SUBPATTERN:
+                self.walk(av[-1])
+            elif op is BRANCH:
+                for alt in av[1]:
+                    self.walk(alt)
+            elif op in (ASSERT, ASSERT_NOT):
+                self.walk(av[1])
+            elif op is GROUPREF_EXISTS:
+                for alt in av[1:]:
+                    if alt:
+                        self.walk(alt)
+            # Atomic groups and possessive repeats never backtrack into
+            # their contents, so they are not descended into
+
+    def check_repeat_body(self, body) -> None:
+        """Look for ways one input can be split between iterations"""
+        body = self.flatten(body)
+        body_first = self.first_chars(body)
+
+        # A quantifier inside the body is followed by something that accepts
+        # the same characters, so each iteration can be split several ways:
+        # ([a-z]+.)+
+        for index, item in enumerate(body):
+            if self.is_large_repeat(item) and self.item_first_chars(item) & self.first_chars(body[index + 1:]):
+                self.add("nested_quantifier", "Quantified group contains a quantifier followed by overlapping characters")
+                return
+
+        # An iteration can end in a variable-length part that also accepts
+        # what the next iteration starts with: (a+)+, (\w+\s?)*, (a|aa)+
+        for item in reversed(body):
+            op, av = item
+            if op is ATOMIC_GROUP or op is POSSESSIVE_REPEAT:
+                break
+            lo, hi = self.width(item)
+            if lo != hi and self.item_first_chars(item) & body_first:
+                if op in REPEATS and (av[1] is MAXREPEAT or av[1] >= LARGE_REPEAT):
+                    self.add("nested_quantifier", "Quantified group contains an overlapping unbounded quantifier")
+                else:
+                    self.add("ambiguous_repetition", "Repeated group can match the same text in several ways")
+                break
+            if not self.nullable(item):
+                break
+
+        # Alternatives that can start with the same character: (\w|\d)+
+        for op, av in body:
+            if op is BRANCH:
+                seen: set = set()
+                for alt in av[1]:
+                    chars = self.first_chars(alt)
+                    if chars & seen:
+                        self.add("overlapping_alternation", "Alternatives under a quantifier overlap")
+                        break
+                    seen |= chars
+
+    def check_adjacent(self, items) -> None:
+        """Look for neighbouring unbounded repeats over overlapping chars: \\d+\\d+"""
+        previous = None
+        for item in items:
+            if self.is_large_repeat(item):
+                if previous is not None and self.item_first_chars(item) & self.item_first_chars(previous):
+                    self.add("adjacent_quantifiers", "Adjacent quantifiers over overlapping characters (polynomial)")
+                previous = item
+            elif not self.nullable(item):
+                previous = None
+
+    def flatten(self, items) -> List[Tuple[Any, Any]]:
+        """Inline a lone capturing/non-capturing group so its items are visible"""
+        items = list(items)
+        while len(items) == 1 and items[0][0] is SUBPATTERN:
+            items = list(items[0][1][-1])
+        return items
+
+# Fallback for syntax only the regex module understands: quantified group
+# whose body already contains a quantifier
+NESTED_QUANTIFIER_HEURISTIC = regex.compile(r"\((?:[^()\\]|\\.)*[+*}](?:[^()\\]|\\.)*\)[+*{]")
+
+def _level(score: int) -> str:
+    """Map a score to a risk level"""
+    if score >= REDOS_HIGH_SCORE:
+        return "high"
+    if score >= REDOS_MEDIUM_SCORE:
+        return "medium"
+    return "low"
+
+@lru_cache(maxsize=1024)
+def analyze_pattern(pattern: str) -> Dict[str, Any]:
+    """
+    Statically estimate the catastrophic backtracking risk of a pattern
+
+    The pattern is parsed with the standard library's regex parser and
+    checked for nested or ambiguous quantifiers, overlapping alternatives
+    under a quantifier and adjacent overlapping quantifiers. Syntax the
+    standard parser doesn't understand falls back to a textual heuristic.
+    Results are cached; treat the returned dictionary as read-only.
+
+    Args:
+        pattern: The regex pattern to analyze
+
+    Returns:
+        Dictionary with score (0-100), level (low, medium, high), findings
+        and whether the pattern could be fully parsed
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        findings = []
+        if NESTED_QUANTIFIER_HEURISTIC.search(pattern):
+            findings.append({"kind": "nested_quantifier", "description": "Quantified group contains a quantifier"})
+        score = min(100, sum(FINDING_WEIGHTS[f["kind"]] for f in findings))
+        return {"score": score, "level": _level(score), "findings": findings, "parsed": False}
+
+    analyzer = _Analyzer(parsed)
+    analyzer.walk(parsed)
+
+    # The first finding of a kind carries its full weight, repeats add a little
+    score = 0
+    seen_kinds = set()
+    for finding in analyzer.findings:
+        kind = finding["kind"]
+        score += 10 if kind in seen_kinds else FINDING_WEIGHTS[kind]
+        seen_kinds.add(kind)
+    score = min(100, score)
+
+    return {"score": score, "level": _level(score), "findings": analyzer.findings, "parsed": True}
+
+def get_risk_score(pattern: Optional[str]) -> Optional[int]:
+    """
+    Get the ReDoS risk score of a pattern
+
+    Args:
+        pattern: The regex pattern (None yields None)
+
+    Returns:
+        Risk score between 0 and 100, or None
+    """
+    if pattern is None:
+        return None
+    return analyze_pattern(pattern)["score"]
@@ -0,0 +1,422 @@
+"""
+Execution backends for regex evaluation (process sandbox, thread pool, inline)
+"""
+import os
+import queue
+import asyncio
+import logging
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Set, Union
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Where regex evaluation runs: "process", "thread" or "inline"
+REGEX_EXECUTION_MODE = os.environ.get("REGEX_EXECUTION_MODE", "process").lower()
+
+# Number of sandbox worker processes
+REGEX_WORKERS = int(os.environ.get("REGEX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Number of threads for the thread pool backend
+REGEX_THREADS = int(os.environ.get("REGEX_THREADS", str(os.cpu_count() or 1)))
+
+# Default wall-clock budget for a single evaluation (seconds)
+REGEX_TIMEOUT = float(os.environ.get("REGEX_TIMEOUT", "2.0"))
+
+class RegexTimeoutError(Exception):
+    """Raised when a regex evaluation exceeds its wall-clock budget"""
+    pass
+
+class RegexWorkerError(Exception):
+    """Raised when a sandbox worker fails or dies while evaluating"""
+    pass
+
+def _worker_main(conn) -> None:
+    """
+    Worker process loop: receive jobs over the pipe and send back results
+
+    Args:
+        conn: Child end of the pipe shared with the parent
+    """
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        func, args, kwargs = job
+        try:
+            conn.send((True, func(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+class _Worker:
+    """A single sandbox process and the parent end of its pipe"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        """Terminate the process immediately"""
+        try:
+            self.process.kill()
+            self.process.join(timeout=1)
+        finally:
+            self.conn.close()
+
+    def stop(self) -> None:
+        """Ask the process to exit, killing it if it doesn't"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+class RegexSandbox:
+    """Pool of killable worker processes for running untrusted patterns
+
+    Each evaluation is sent to an idle worker and given a hard wall-clock
+    budget. A worker that overruns its budget (e.g. catastrophic backtracking)
+    is killed and replaced, so a single pattern can't wedge the server.
+    Work functions are not passed a `timeout`; the watchdog is the budget.
+    """
+
+    def __init__(self, size: int = REGEX_WORKERS, timeout: float = REGEX_TIMEOUT):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        # Every live worker, idle or busy
+        self._workers: Set[_Worker] = set()
+        # Threads waiting on workers; one per worker, so none wait for long
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._started = False
+        self.timeouts = 0
+        self.restarts = 0
+
+    def start(self) -> None:
+        """Start the worker processes if they aren't running yet"""
+        with self._lock:
+            if self._started:
+                return
+            self._idle = queue.Queue()
+            for _ in range(self.size):
+                self._spawn()
+            self._pool = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="regex-sandbox")
+            self._started = True
+
+    def shutdown(self) -> None:
+        """Stop all worker processes, killing busy ones, and fail waiting calls"""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            workers, self._workers = self._workers, set()
+            pool, self._pool = self._pool, None
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            # Wakes calls waiting for a worker; each passes it on to the next
+            self._idle.put(None)
+
+        for worker in idle:
+            if worker is not None:
+                workers.discard(worker)
+                worker.stop()
+        for worker in workers:
+            worker.kill()
+        pool.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """
+        Get sandbox counters
+
+        Returns:
+            Dictionary with worker count, idle workers, timeouts and restarts
+        """
+        return {
+            "workers": self.size,
+            "idle": self._idle.qsize(),
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+    def _spawn(self) -> None:
+        """Start a worker and make it idle (called with the lock held)"""
+        worker = _Worker(self._context)
+        self._workers.add(worker)
+        self._idle.put(worker)
+
+    def _release(self, worker: _Worker) -> None:
+        """Return a worker to the idle queue unless shutdown already stopped it"""
+        with self._lock:
+            if worker in self._workers:
+                self._idle.put(worker)
+
+    def _replace(self, worker: _Worker) -> None:
+        """Kill a worker and put a fresh one in its place"""
+        worker.kill()
+        with self._lock:
+            if worker not in self._workers:
+                return
+            self._workers.discard(worker)
+            self.restarts += 1
+            self._spawn()
+
+    def call(self, func: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Run a picklable function in a worker process (blocking)
+
+        Args:
+            func: Module-level function to run
+            *args: Positional arguments for the function
+            timeout: Wall-clock budget in seconds (defaults to the sandbox timeout)
+            **kwargs: Keyword arguments for the function
+
+        Returns:
+            The function's return value
+
+        Raises:
+            RegexTimeoutError: If the budget is exceeded
+            RegexWorkerError: If the worker raised or died, or the sandbox was shut down
+        """
+        self.start()
+        budget = timeout if timeout is not None else self.timeout
+        idle = self._idle
+        worker = idle.get()
+        if worker is None:
+            idle.put(None)
+            raise RegexWorkerError("Regex sandbox was shut down")
+
+        # Anything but a clean reply leaves the worker in an unknown state,
+        # so it is replaced rather than returned
+        replied = False
+        try:
+            worker.conn.send((func, args, kwargs))
+            if not worker.conn.poll(budget):
+                self.timeouts += 1
+                logger.warning(f"Regex evaluation exceeded {budget}s; restarting worker")
+                raise RegexTimeoutError(f"Regex evaluation timed out after {budget:g}s")
+            ok, payload = worker.conn.recv()
+            replied = True
+        except (EOFError, OSError) as e:
+            logger.error(f"Regex worker died: {e}")
+            raise RegexWorkerError("Regex worker process died unexpectedly")
+        finally:
+            if replied:
+                self._release(worker)
+            else:
+                self._replace(worker)
+
+        if not ok:
+            raise RegexWorkerError(payload)
+        return payload
+
+    async def run(self, func: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Run a picklable function in a worker process without blocking the event loop
+
+        Args:
+            func: Module-level function to run
+            *args: Positional arguments for the function
+            timeout: Wall-clock budget in seconds (defaults to the sandbox timeout)
+            **kwargs: Keyword arguments for the function
+
+        Returns:
+            The function's return value
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, functools.partial(self.call, func, *args, timeout=timeout, **kwargs)
+        )
+
+class RegexThreadExecutor:
+    """Thread pool backend for regex evaluation
+
+    Work functions are called with a `timeout` keyword and are expected to
+    match with `concurrent=True`, so the regex module releases the GIL and
+    evaluations overlap with each other and with the event loop. Threads
+    can't be killed, so the budget is enforced by the regex module's own
+    timeout rather than by the executor.
+    """
+
+    def __init__(self, size: int = REGEX_THREADS, timeout: float = REGEX_TIMEOUT):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.timeouts = 0
+
+    def start(self) -> None:
+        """Create the thread pool if it doesn't exist yet"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="regex")
+
+    def shutdown(self) -> None:
+        """Shut down the thread pool, waiting for running evaluations"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def stats(self) -> dict:
+        """
+        Get executor counters
+
+        Returns:
+            Dictionary with thread count and timeouts
+        """
+        return {"threads": self.size, "timeouts": self.timeouts}
+
+    async def run(self, func: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Run a function on the thread pool
+
+        Args:
+            func: Function accepting a `timeout` keyword
+            *args: Positional arguments for the function
+            timeout: Wall-clock budget in seconds (defaults to the executor timeout)
+            **kwargs: Keyword arguments for the function
+
+        Returns:
+            The function's return value
+
+        Raises:
+            RegexTimeoutError: If the budget is exceeded
+        """
+        self.start()
+        budget = timeout if timeout is not None else self.timeout
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._pool, functools.partial(func, *args, timeout=budget, **kwargs)
+            )
+        except TimeoutError:
+            self.timeouts += 1
+            raise RegexTimeoutError(f"Regex evaluation timed out after {budget:g}s")
+
+class RegexInlineExecutor(RegexThreadExecutor):
+    """Inline backend: evaluates on the calling thread
+
+    Only suitable for development and trusted input; the regex module's
+    timeout still bounds each evaluation, but the event loop is blocked
+    while it runs.
+    """
+
+    def start(self) -> None:
+        """Nothing to start for inline execution"""
+        pass
+
+    def shutdown(self) -> None:
+        """Nothing to stop for inline execution"""
+        pass
+
+    def stats(self) -> dict:
+        """
+        Get executor counters
+
+        Returns:
+            Dictionary with timeouts
+        """
+        return {"timeouts": self.timeouts}
+
+    async def run(self, func: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Run a function on the calling thread
+
+        Args:
+            func: Function accepting a `timeout` keyword
+            *args: Positional arguments for the function
+            timeout: Wall-clock budget in seconds (defaults to the executor timeout)
+            **kwargs: Keyword arguments for the function
+
+        Returns:
+            The function's return value
+
+        Raises:
+            RegexTimeoutError: If the budget is exceeded
+        """
+        budget = timeout if timeout is not None else self.timeout
+        try:
+            return func(*args, timeout=budget, **kwargs)
+        except TimeoutError:
+            self.timeouts += 1
+            raise RegexTimeoutError(f"Regex evaluation timed out after {budget:g}s")
+
+RegexExecutor = Union[RegexSandbox, RegexThreadExecutor, RegexInlineExecutor]
+
+EXECUTOR_CLASSES = {
+    "process": RegexSandbox,
+    "thread": RegexThreadExecutor,
+    "inline": RegexInlineExecutor,
+}
+
+def create_executor(mode: str) -> RegexExecutor:
+    """
+    Create an executor for the given mode
+
+    Args:
+        mode: "process", "thread" or "inline"
+
+    Returns:
+        New executor instance
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in EXECUTOR_CLASSES:
+        raise ValueError(f"Unknown regex execution mode: {mode}")
+    return EXECUTOR_CLASSES[mode]()
+
+# Process-wide executor, started lazily or at application startup
+executor = create_executor(REGEX_EXECUTION_MODE)
+
+def get_executor() -> RegexExecutor:
+    """
+    Get the configured regex executor
+
+    Returns:
+        Executor for REGEX_EXECUTION_MODE
+    """
+    return executor
+
+def set_executor(new_executor: RegexExecutor) -> RegexExecutor:
+    """
+    Replace the process-wide executor, shutting down the previous one
+
+    Args:
+        new_executor: Executor to install
+
+    Returns:
+        The previous executor
+    """
+    global executor
+    previous = executor
+    executor = new_executor
+    previous.shutdown()
+    return previous
+
+def start_executor() -> None:
+    """Start the configured executor"""
+    executor.start()
+
+def shutdown_executor() -> None:
+    """Stop the configured executor"""
+    executor.shutdown()
@@ -1,71 +1,389 @@
 """
 Service for regex pattern testing and management
 """
+import os
+import mmap
 import regex
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.services.regex_executor import get_executor, RegexTimeoutError, RegexWorkerError, REGEX_TIMEOUT
+from app.services.redos_service import analyze_pattern, REDOS_POLICY, REDOS_DOWNGRADE_TIMEOUT
+from app.services.result_cache import result_cache, content_key
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-async def test_regex(pattern: str, text: str, flag_str: str = "") -> Dict[str, Any]:
+# Maximum number of compiled patterns kept in memory
+REGEX_CACHE_SIZE = int(os.environ.get("REGEX_CACHE_SIZE", "256"))
+
+# Supported flag characters and their regex module equivalents
+FLAG_MAP = {
+    "i": regex.IGNORECASE,
+    "m": regex.MULTILINE,
+    "s": regex.DOTALL,
+    "x": regex.VERBOSE,
+}
+
+def parse_flags(flag_str: str) -> int:
     """
-    Test a regex pattern against a text and return match information
+    Convert a flag string into regex module flags
     
     Args:
-        pattern: The regex pattern to test
-        text: The text to test against
         flag_str: String of regex flags (i, m, s, x)
         
     Returns:
-        Dictionary with match information
+        Combined integer flags; unknown characters are ignored
     """
-    try:
-        # Parse flags
-        flags = 0
-        if 'i' in flag_str:
-            flags |= regex.IGNORECASE
-        if 'm' in flag_str:
-            flags |= regex.MULTILINE
-        if 's' in flag_str:
-            flags |= regex.DOTALL
-        if 'x' in flag_str:
-            flags |= regex.VERBOSE
+    flags = 0
+    for flag_char, flag_value in FLAG_MAP.items():
+        if flag_char in (flag_str or ""):
+            flags |= flag_value
+    return flags
+
+class PatternCache:
+    """Size-bounded LRU cache of compiled regex patterns
+    
+    Entries are keyed on the pattern string and its normalized integer flags,
+    so "im" and "mi" share an entry. Compile errors are cached as well, so an
+    invalid pattern is only parsed once until it is evicted. Only their
+    message and position are kept: a cached exception instance would collect
+    the traceback, and with it the frames and texts, of every caller it is
+    raised in.
+    """
+    
+    def __init__(self, maxsize: int = REGEX_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, int], Union[regex.Pattern, Tuple[str, Optional[int]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, pattern: str, flags: int = 0) -> regex.Pattern:
+        """
+        Return the compiled pattern, compiling and caching it on a miss
+        
+        Args:
+            pattern: The regex pattern string
+            flags: Integer regex flags
             
-        # Compile regex
-        regex_pattern = regex.compile(pattern, flags)
-        
-        # Find all matches
-        matches = list(regex_pattern.finditer(text))
-        
-        # Prepare match information
-        match_info = []
-        for match in matches:
-            match_data = {
-                "full_match": match.group(0),
-                "start": match.start(),
-                "end": match.end(),
-                "groups": []
-            }
+        Returns:
+            Compiled regex pattern
             
-            # Add group information
-            for i in range(1, len(match.groups()) + 1):
-                if match.group(i) is not None:
-                    match_data["groups"].append({
-                        "group_num": i,
-                        "content": match.group(i),
-                        "start": match.start(i),
-                        "end": match.end(i)
-                    })
+        Raises:
+            regex.error: If the pattern does not compile (a fresh error each time)
+        """
+        key = (pattern, flags)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        
+        if entry is None:
+            # Compile outside the lock so one slow pattern doesn't block others
+            try:
+                entry = regex.compile(pattern, flags)
+            except regex.error as e:
+                entry = (e.msg, e.pos)
             
-            match_info.append(match_data)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        
+        if isinstance(entry, tuple):
+            message, pos = entry
+            raise regex.error(message, pattern, pos)
+        return entry
+    
+    def clear(self) -> None:
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+        
+        Returns:
+            Dictionary with size, maxsize, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+# Process-wide compiled pattern cache
+pattern_cache = PatternCache()
+
+def compile_pattern(pattern: str, flag_str: str = "") -> regex.Pattern:
+    """
+    Compile a pattern through the shared cache
+    
+    Args:
+        pattern: The regex pattern string
+        flag_str: String of regex flags (i, m, s, x)
+        
+    Returns:
+        Compiled regex pattern
+        
+    Raises:
+        regex.error: If the pattern is invalid
+    """
+    return pattern_cache.get(pattern, parse_flags(flag_str))
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Get statistics for the compiled pattern cache
+    
+    Returns:
+        Dictionary with cache counters
+    """
+    return pattern_cache.stats()
+
+def match_to_dict(match: regex.Match) -> Dict[str, Any]:
+    """
+    Convert a match object into the API's match dictionary
+    
+    Args:
+        match: Match returned by the regex module
+        
+    Returns:
+        Dictionary with the full match, its span and participating groups
+    """
+    match_data = {
+        "full_match": match.group(0),
+        "start": match.start(),
+        "end": match.end(),
+        "groups": []
+    }
+    
+    # Add group information
+    for i in range(1, len(match.groups()) + 1):
+        if match.group(i) is not None:
+            match_data["groups"].append({
+                "group_num": i,
+                "content": match.group(i),
+                "start": match.start(i),
+                "end": match.end(i)
+            })
+    
+    return match_data
+
+def matches_to_columns(matches: Iterable[regex.Match], group_count: int) -> Dict[str, Any]:
+    """
+    Convert matches into parallel span arrays
+    
+    Row 0 of "starts"/"ends" holds the whole-match spans and row g holds
+    group g's spans, with -1 for groups that didn't participate. Match text
+    is not repeated; clients slice it from the input they already have.
+    
+    Args:
+        matches: Iterable of match objects
+        group_count: Number of capture groups in the pattern
+        
+    Returns:
+        Dictionary with group_count, starts and ends
+    """
+    starts: List[List[int]] = [[] for _ in range(group_count + 1)]
+    ends: List[List[int]] = [[] for _ in range(group_count + 1)]
+    for match in matches:
+        for group_num, (start, end) in enumerate(match.regs):
+            starts[group_num].append(start)
+            ends[group_num].append(end)
+    
+    return {
+        "group_count": group_count,
+        "starts": starts,
+        "ends": ends
+    }
+
+def apply_redos_policy(
+    pattern: str,
+    timeout: Optional[float] = None
+) -> Tuple[Dict[str, Any], Optional[float], Optional[str]]:
+    """
+    Apply REDOS_POLICY to a pattern before it is run on any test path
+    
+    Args:
+        pattern: The regex pattern to test
+        timeout: Requested matching budget in seconds (None for REGEX_TIMEOUT)
+        
+    Returns:
+        Tuple of (risk_score and risk_level to report, budget to run with,
+        rejection error or None)
+    """
+    risk = analyze_pattern(pattern)
+    risk_info = {"risk_score": risk["score"], "risk_level": risk["level"]}
+    
+    if risk["level"] == "high" and REDOS_POLICY == "reject":
+        reasons = "; ".join(finding["description"] for finding in risk["findings"])
+        return risk_info, timeout, f"Pattern rejected: high risk of catastrophic backtracking ({reasons})"
+    
+    if risk["level"] == "high" and REDOS_POLICY == "downgrade":
+        budget = timeout if timeout is not None else REGEX_TIMEOUT
+        timeout = min(budget, REDOS_DOWNGRADE_TIMEOUT)
+    
+    return risk_info, timeout, None
+
+def iter_regex_matches(
+    pattern: str,
+    text: str,
+    flag_str: str = "",
+    timeout: Optional[float] = None,
+    offset: int = 0,
+    max_matches: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield match records for streaming responses
+    
+    Yields one {"type": "match", ...} record per match straight from the
+    finditer generator, followed by a {"type": "summary"} trailer with the
+    totals. Errors (invalid pattern, timeout, pattern rejected by
+    REDOS_POLICY) end the stream with a summary record carrying
+    success=False. Matching releases the GIL, so this is meant to be
+    iterated on a worker thread.
+    
+    Args:
+        pattern: The regex pattern to test
+        text: The text to test against
+        flag_str: String of regex flags (i, m, s, x)
+        timeout: Matching budget in seconds (defaults to REGEX_TIMEOUT)
+        offset: Character position to start searching from
+        max_matches: Maximum number of matches to stream (None for all)
+        
+    Yields:
+        Match records followed by a summary record
+    """
+    risk_info, timeout, rejection = apply_redos_policy(pattern, timeout)
+    if rejection is not None:
+        yield {"type": "summary", "success": False, "match_count": 0, "error": rejection, **risk_info}
+        return
+    
+    budget = timeout if timeout is not None else REGEX_TIMEOUT
+    match_count = 0
+    try:
+        regex_pattern = compile_pattern(pattern, flag_str)
+        match_iter = regex_pattern.finditer(text, offset, concurrent=True, timeout=budget)
+        limited = islice(match_iter, max_matches) if max_matches is not None else match_iter
+        for match in limited:
+            match_count += 1
+            yield {"type": "match", **match_to_dict(match)}
+        
+        next_match = next(match_iter, None) if max_matches is not None else None
+        summary = {"type": "summary", "success": True, "match_count": match_count, **risk_info}
+        if next_match is not None:
+            summary.update(truncated=True, next_offset=next_match.start())
+        yield summary
+        
+    except regex.error as e:
+        yield {"type": "summary", "success": False, "match_count": match_count, "error": str(e), **risk_info}
+        
+    except TimeoutError:
+        yield {
+            "type": "summary",
+            "success": False,
+            "match_count": match_count,
+            "error": f"Regex evaluation timed out after {budget:g}s",
+            "timed_out": True,
+            **risk_info
+        }
+
+def run_regex_test(
+    pattern: str,
+    text: str,
+    flag_str: str = "",
+    timeout: Optional[float] = None,
+    offset: int = 0,
+    max_matches: Optional[int] = None,
+    count_only: bool = False,
+    compact: bool = False
+) -> Dict[str, Any]:
+    """
+    Test a regex pattern against a text synchronously
+    
+    This is the unit of work run by the regex executor. Matching releases
+    the GIL so thread pool evaluations run in parallel; sandbox worker
+    processes each keep their own compiled pattern cache.
+    
+    Args:
+        pattern: The regex pattern to test
+        text: The text to test against
+        flag_str: String of regex flags (i, m, s, x)
+        timeout: Matching budget in seconds enforced by the regex module
+        offset: Character position to start searching from
+        max_matches: Maximum number of matches to return (None for all)
+        count_only: Only count matches, without building match details
+        compact: Return columnar span arrays instead of per-match dictionaries
+        
+    Returns:
+        Dictionary with match information. When more matches remain after
+        max_matches, "truncated" is True and "next_offset" is the start of
+        the next match, to be passed back as offset to resume.
+        
+    Raises:
+        TimeoutError: If matching exceeds the timeout
+    """
+    try:
+        # Compile regex (cached)
+        regex_pattern = compile_pattern(pattern, flag_str)
+        
+        # Find matches lazily so we can stop at the limit
+        match_iter = regex_pattern.finditer(text, offset, concurrent=True, timeout=timeout)
+        limited = islice(match_iter, max_matches) if max_matches is not None else match_iter
+        
+        match_info = None
+        compact_info = None
+        if count_only:
+            match_count = sum(1 for _ in limited)
+        elif compact:
+            compact_info = matches_to_columns(limited, regex_pattern.groups)
+            match_count = len(compact_info["starts"][0])
+        else:
+            # Prepare match information
+            match_info = [match_to_dict(match) for match in limited]
+            match_count = len(match_info)
+        
+        # Peek one match ahead to tell whether the output was cut short
+        next_match = next(match_iter, None) if max_matches is not None else None
             
         return {
             "success": True,
-            "match_count": len(matches),
-            "matches": match_info
+            "match_count": match_count,
+            "matches": match_info,
+            "compact": compact_info,
+            "truncated": next_match is not None,
+            "next_offset": next_match.start() if next_match is not None else None
+        }
+        
+    except regex.error as e:
+        # Invalid patterns are expected while users type; no traceback needed
+        logger.debug(f"Invalid regex pattern {pattern!r}: {e}")
+        return {
+            "success": False,
+            "error": str(e)
         }
         
+    except TimeoutError:
+        raise
+        
     except Exception as e:
         logger.exception("Error testing regex")
         return {
@@ -73,6 +391,413 @@ async def test_regex(pattern: str, text: str, flag_str: str = "") -> Dict[str, A
             "error": str(e)
         }
 
+async def test_regex(
+    pattern: str,
+    text: str,
+    flag_str: str = "",
+    timeout: Optional[float] = None,
+    offset: int = 0,
+    max_matches: Optional[int] = None,
+    count_only: bool = False,
+    compact: bool = False
+) -> Dict[str, Any]:
+    """
+    Test a regex pattern against a text and return match information
+    
+    The evaluation runs on the configured executor (sandbox worker process,
+    GIL-releasing thread pool or inline) with a wall-clock budget, so
+    catastrophic backtracking can't block the event loop. Patterns the
+    static ReDoS analyzer rates high risk are rejected or run with a
+    reduced budget, depending on REDOS_POLICY.
+    
+    Args:
+        pattern: The regex pattern to test
+        text: The text to test against
+        flag_str: String of regex flags (i, m, s, x)
+        timeout: Wall-clock budget in seconds (defaults to REGEX_TIMEOUT)
+        offset: Character position to start searching from
+        max_matches: Maximum number of matches to return (None for all)
+        count_only: Only count matches, without building match details
+        compact: Return columnar span arrays instead of per-match dictionaries
+        
+    Returns:
+        Dictionary with match information and the pattern's risk score
+    """
+    risk_info, timeout, rejection = apply_redos_policy(pattern, timeout)
+    if rejection is not None:
+        return {"success": False, "error": rejection, **risk_info}
+    
+    try:
+        result = await get_executor().run(
+            run_regex_test,
+            pattern,
+            text,
+            flag_str,
+            timeout=timeout,
+            offset=offset,
+            max_matches=max_matches,
+            count_only=count_only,
+            compact=compact
+        )
+    
+    except RegexTimeoutError as e:
+        result = {
+            "success": False,
+            "error": str(e),
+            "timed_out": True
+        }
+    
+    except RegexWorkerError as e:
+        logger.error(f"Error testing regex in executor: {e}")
+        result = {
+            "success": False,
+            "error": str(e)
+        }
+    
+    result.update(risk_info)
+    return result
+
+def regex_test_key(
+    pattern: str,
+    text: str,
+    flag_str: str = "",
+    offset: int = 0,
+    max_matches: Optional[int] = None,
+    count_only: bool = False,
+    compact: bool = False
+) -> str:
+    """
+    Content key of a regex test; identical keys give identical results
+    
+    Args:
+        pattern: The regex pattern to test
+        text: The text to test against
+        flag_str: String of regex flags (i, m, s, x)
+        offset: Character position to start searching from
+        max_matches: Maximum number of matches to return
+        count_only: Only count matches
+        compact: Return columnar span arrays
+        
+    Returns:
+        Hex content hash
+    """
+    return content_key("test", pattern, text, parse_flags(flag_str), offset, max_matches, count_only, compact)
+
+async def test_regex_cached(
+    pattern: str,
+    text: str,
+    flag_str: str = "",
+    timeout: Optional[float] = None,
+    offset: int = 0,
+    max_matches: Optional[int] = None,
+    count_only: bool = False,
+    compact: bool = False,
+    key: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Test a regex pattern through the result cache
+    
+    Identical tests running at the same time share one evaluation, and
+    successful results are served from the cache until evicted. Failures
+    (timeouts, invalid patterns, worker errors) are never cached. The
+    timeout isn't part of the key, so a concurrent identical test joins
+    the running evaluation whatever budget it asked for.
+    
+    Args:
+        pattern: The regex pattern to test
+        text: The text to test against
+        flag_str: String of regex flags (i, m, s, x)
+        timeout: Wall-clock budget in seconds (defaults to REGEX_TIMEOUT)
+        offset: Character position to start searching from
+        max_matches: Maximum number of matches to return (None for all)
+        count_only: Only count matches, without building match details
+        compact: Return columnar span arrays instead of per-match dictionaries
+        key: Precomputed regex_test_key of the same arguments
+        
+    Returns:
+        Dictionary with match information; treat it as read-only
+    """
+    if key is None:
+        key = regex_test_key(pattern, text, flag_str, offset, max_matches, count_only, compact)
+    
+    result, _ = await result_cache.get_or_compute(
+        key,
+        lambda: test_regex(
+            pattern,
+            text,
+            flag_str,
+            timeout=timeout,
+            offset=offset,
+            max_matches=max_matches,
+            count_only=count_only,
+            compact=compact
+        ),
+        cacheable=lambda value: value.get("success", False)
+    )
+    return result
+
+def run_regex_row(
+    pattern: str,
+    flag_str: str,
+    texts: List[str],
+    include_spans: bool = True,
+    cell_timeout: Optional[float] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Run one pattern against many texts, compiling it once
+    
+    Each cell is evaluated with its own matching budget, so a slow text
+    only fails its own cell. An invalid pattern fails the whole row.
+    
+    Args:
+        pattern: The regex pattern to test
+        flag_str: String of regex flags (i, m, s, x)
+        texts: Texts to test against
+        include_spans: Include [start, end] spans of each match
+        cell_timeout: Matching budget per text in seconds
+        timeout: Accepted for the executor contract; cells use cell_timeout
+        
+    Returns:
+        Dictionary with the row status and one cell per text
+    """
+    try:
+        regex_pattern = compile_pattern(pattern, flag_str)
+    except regex.error as e:
+        return {"pattern": pattern, "flags": flag_str, "success": False, "error": str(e), "cells": []}
+    
+    cells = []
+    for text in texts:
+        try:
+            matches = regex_pattern.finditer(text, concurrent=True, timeout=cell_timeout)
+            if include_spans:
+                spans = [list(match.span()) for match in matches]
+                cells.append({"match_count": len(spans), "spans": spans})
+            else:
+                cells.append({"match_count": sum(1 for _ in matches)})
+        except TimeoutError:
+            cells.append({
+                "error": f"Regex evaluation timed out after {cell_timeout:g}s",
+                "timed_out": True
+            })
+    
+    return {"pattern": pattern, "flags": flag_str, "success": True, "cells": cells}
+
+async def test_regex_batch(
+    patterns: List[Tuple[str, str]],
+    texts: List[str],
+    include_spans: bool = True,
+    timeout: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Test many patterns against many texts in one call
+    
+    Each pattern row runs as a separate executor job, so rows are spread
+    over sandbox workers or pool threads in parallel. REDOS_POLICY applies
+    per row: high-risk patterns are rejected or get a reduced cell budget.
+    
+    Args:
+        patterns: List of (pattern, flags) pairs
+        texts: Texts to test every pattern against
+        include_spans: Include [start, end] spans of each match
+        timeout: Matching budget per cell in seconds (defaults to REGEX_TIMEOUT)
+        
+    Returns:
+        One row dictionary per pattern, in request order
+    """
+    async def run_row(pattern: str, flag_str: str) -> Dict[str, Any]:
+        risk_info, cell_timeout, rejection = apply_redos_policy(pattern, timeout)
+        if rejection is not None:
+            return {"pattern": pattern, "flags": flag_str, "success": False, "error": rejection, "cells": [], **risk_info}
+        
+        cell_timeout = cell_timeout if cell_timeout is not None else REGEX_TIMEOUT
+        # Hard budget for a whole row in the process sandbox
+        row_budget = cell_timeout * max(1, len(texts)) + 1
+        try:
+            row = await get_executor().run(
+                run_regex_row,
+                pattern,
+                flag_str,
+                texts,
+                include_spans=include_spans,
+                cell_timeout=cell_timeout,
+                timeout=row_budget
+            )
+        except (RegexTimeoutError, RegexWorkerError) as e:
+            row = {"pattern": pattern, "flags": flag_str, "success": False, "error": str(e), "cells": []}
+        row.update(risk_info)
+        return row
+    
+    return list(await asyncio.gather(*(run_row(pattern, flag_str) for pattern, flag_str in patterns)))
+
+def _count_newlines(buffer, start: int, end: int, chunk_size: int = 1 << 20) -> int:
+    """Count newlines in buffer[start:end] without copying it in one piece"""
+    count = 0
+    for chunk_start in range(start, end, chunk_size):
+        count += buffer[chunk_start:min(end, chunk_start + chunk_size)].count(b"\n")
+    return count
+
+def run_regex_file_test(
+    path: str,
+    pattern: str,
+    flag_str: str = "",
+    timeout: Optional[float] = None,
+    offset: int = 0,
+    max_matches: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Test a regex pattern against a file without loading it into memory
+    
+    The file is memory-mapped and matched with a bytes-compiled pattern, so
+    nothing is decoded up front. Character classes such as \\w and \\d
+    therefore follow bytes (ASCII) semantics. Offsets are byte positions;
+    line and column numbers are 1-based.
+    
+    Args:
+        path: Path of the file to scan
+        pattern: The regex pattern to test
+        flag_str: String of regex flags (i, m, s, x)
+        timeout: Matching budget in seconds enforced by the regex module
+        offset: Byte position to start searching from
+        max_matches: Maximum number of matches to return (None for all)
+        
+    Returns:
+        Dictionary with match information, file size and resume cursor
+        
+    Raises:
+        TimeoutError: If matching exceeds the timeout
+    """
+    try:
+        regex_pattern = pattern_cache.get(pattern.encode("utf-8"), parse_flags(flag_str))
+    except regex.error as e:
+        return {"success": False, "error": str(e)}
+    
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return {"success": True, "match_count": 0, "matches": [], "size": 0}
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            result = _scan_buffer(regex_pattern, buffer, timeout, offset, max_matches)
+    
+    # Raised only once the map is closed, so the traceback pins no match objects
+    if result is None:
+        raise TimeoutError(f"Regex matching exceeded {timeout:g}s")
+    result["size"] = size
+    return result
+
+def _scan_buffer(
+    regex_pattern: regex.Pattern,
+    buffer,
+    timeout: Optional[float],
+    offset: int,
+    max_matches: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    """
+    Match a bytes pattern over a buffer, tracking line numbers
+    
+    Kept separate so the match objects (which pin the buffer) are released
+    before the memory map is closed. A timeout is caught here rather than
+    propagated, since its traceback would keep them alive.
+    
+    Returns:
+        Dictionary with match information, or None if matching timed out
+    """
+    match_iter = regex_pattern.finditer(buffer, offset, concurrent=True, timeout=timeout)
+    limited = islice(match_iter, max_matches) if max_matches is not None else match_iter
+    
+    # Line numbers and the last line start are tracked incrementally between matches
+    line = 1 + _count_newlines(buffer, 0, offset)
+    line_pos = offset
+    line_start = buffer.rfind(b"\n", 0, offset) + 1
+    match_info = []
+    match = next_match = None
+    try:
+        for match in limited:
+            start, end = match.span()
+            line += _count_newlines(buffer, line_pos, start)
+            newline = buffer.rfind(b"\n", line_pos, start)
+            if newline >= 0:
+                line_start = newline + 1
+            line_pos = start
+            match_info.append({
+                "start": start,
+                "end": end,
+                "line": line,
+                "column": start - line_start + 1,
+                "full_match": match.group(0).decode("utf-8", errors="replace")
+            })
+        
+        next_match = next(match_iter, None) if max_matches is not None else None
+    except TimeoutError:
+        del match_iter, limited, match
+        return None
+    
+    return {
+        "success": True,
+        "match_count": len(match_info),
+        "matches": match_info,
+        "truncated": next_match is not None,
+        "next_offset": next_match.start() if next_match is not None else None
+    }
+
+async def test_regex_file(
+    path: str,
+    pattern: str,
+    flag_str: str = "",
+    timeout: Optional[float] = None,
+    offset: int = 0,
+    max_matches: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Test a regex pattern against a file on the configured executor
+    
+    Only the path crosses the process boundary; sandbox workers map the
+    file themselves. REDOS_POLICY applies as in test_regex.
+    
+    Args:
+        path: Path of the file to scan
+        pattern: The regex pattern to test
+        flag_str: String of regex flags (i, m, s, x)
+        timeout: Wall-clock budget in seconds (defaults to REGEX_TIMEOUT)
+        offset: Byte position to start searching from
+        max_matches: Maximum number of matches to return (None for all)
+        
+    Returns:
+        Dictionary with match information and the pattern's risk score
+    """
+    risk_info, timeout, rejection = apply_redos_policy(pattern, timeout)
+    if rejection is not None:
+        return {"success": False, "error": rejection, **risk_info}
+    
+    try:
+        result = await get_executor().run(
+            run_regex_file_test,
+            path,
+            pattern,
+            flag_str,
+            timeout=timeout,
+            offset=offset,
+            max_matches=max_matches
+        )
+    
+    except RegexTimeoutError as e:
+        result = {
+            "success": False,
+            "error": str(e),
+            "timed_out": True
+        }
+    
+    except RegexWorkerError as e:
+        logger.error(f"Error testing regex file in executor: {e}")
+        result = {
+            "success": False,
+            "error": str(e)
+        }
+    
+    result.update(risk_info)
+    return result
+
 def get_flag_descriptions() -> List[Dict[str, str]]:
     """
     Get descriptions of available regex flags
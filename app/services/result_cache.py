@@ -0,0 +1,162 @@
+"""
+Content-addressed result cache with single-flight coalescing
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Approximate memory budget for cached results (bytes of their JSON encoding)
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(32 << 20)))
+
+def content_key(*parts: Any) -> str:
+    """
+    Hash JSON-serializable request parts into a cache key
+
+    Args:
+        *parts: Values that fully determine the result
+
+    Returns:
+        Hex SHA-256 digest of the parts
+    """
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8", "surrogatepass")).hexdigest()
+
+class ResultCache:
+    """Memory-bounded LRU of results keyed by a content hash
+
+    Concurrent lookups of a key that is being computed wait for that single
+    computation instead of starting their own. The computation runs as a
+    task of its own, so a caller that disconnects doesn't cancel it for the
+    others. Sizes are estimated from each result's JSON encoding.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached result
+
+        Args:
+            key: Content key
+
+        Returns:
+            The cached result, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a result, evicting least recently used ones past the budget
+
+        Results larger than the whole budget are not stored.
+
+        Args:
+            key: Content key
+            value: JSON-serializable result
+        """
+        size = len(key) + len(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True
+    ) -> Tuple[Any, str]:
+        """
+        Get a cached result, join an identical computation in flight, or compute it
+
+        Args:
+            key: Content key
+            compute: Coroutine function producing the result
+            cacheable: Whether a computed result may be stored
+
+        Returns:
+            Tuple of (result, source) where source is "cache", "coalesced" or "computed"
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, "cache"
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), "coalesced"
+
+        self.misses += 1
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+
+        def _finish(done: "asyncio.Future[Any]") -> None:
+            self._inflight.pop(key, None)
+            if done.cancelled() or done.exception() is not None:
+                return
+            if cacheable(done.result()):
+                self.put(key, done.result())
+
+        task.add_done_callback(_finish)
+        return await asyncio.shield(task), "computed"
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = self.misses = self.coalesced = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with entry count, size, budget, hits, misses,
+            coalesced lookups and evictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+# Process-wide cache of /api/regex/test results
+result_cache = ResultCache()
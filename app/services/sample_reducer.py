@@ -0,0 +1,158 @@
+"""
+Reduction of large sample texts to a representative excerpt for prompting
+"""
+import os
+import math
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import regex
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Approximate prompt size budget for a generation request (tokens)
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "2000"))
+
+# Longest sample line kept in an excerpt (characters)
+PROMPT_MAX_LINE_CHARS = int(os.environ.get("PROMPT_MAX_LINE_CHARS", "240"))
+
+# Rough number of characters per token for English text and code
+CHARS_PER_TOKEN = 4
+
+# Runs of characters collapsed into one symbol when computing a line's shape
+SHAPE_RUNS = (
+    (regex.compile(r"\d+"), "9"),
+    (regex.compile(r"\p{Lu}+"), "A"),
+    (regex.compile(r"\p{Ll}+|\p{Lo}+"), "a"),
+    (regex.compile(r"\s+"), " "),
+    (regex.compile(r"a(?: a)+"), "a"),
+)
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens a text takes in a prompt
+
+    Args:
+        text: The text
+
+    Returns:
+        Approximate token count
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def line_shape(line: str) -> str:
+    """
+    Shape of a line: digit, letter-case and whitespace runs collapsed, and
+    lowercase phrases collapsed into one word, other characters kept, so "2024-01-02 ERROR disk full" and
+    "2023-11-30 ERROR out of memory" share a shape
+
+    Args:
+        line: A line of text
+
+    Returns:
+        Shape string
+    """
+    shape = line.strip()
+    for run, symbol in SHAPE_RUNS:
+        shape = run.sub(symbol, shape)
+    return shape
+
+def _shorten(line: str, anchor: Optional[str] = None) -> str:
+    """Cut a line to PROMPT_MAX_LINE_CHARS, keeping the anchor text in view"""
+    if len(line) <= PROMPT_MAX_LINE_CHARS:
+        return line
+    start = 0
+    if anchor is not None and anchor in line:
+        start = max(0, line.index(anchor) - (PROMPT_MAX_LINE_CHARS - len(anchor)) // 2)
+        start = min(start, len(line) - PROMPT_MAX_LINE_CHARS)
+    return line[start:start + PROMPT_MAX_LINE_CHARS]
+
+def _spread(members: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+    """Reorder members so every prefix is spread evenly over the original order"""
+    bits = max(len(members) - 1, 0).bit_length()
+    order = (int(format(index, f"0{bits}b")[::-1], 2) if bits else 0 for index in range(1 << bits))
+    return [members[position] for position in order if position < len(members)]
+
+def _pick_representatives(
+    candidates: List[Tuple[int, str]],
+    budget: int
+) -> Tuple[List[Tuple[int, str]], int]:
+    """
+    Pick lines round-robin over their shape clusters until the budget is spent
+
+    Larger clusters go first in every round, so the first round covers every
+    kind of line before a second example of any kind is added. Within a
+    cluster, picks are spread over the whole text rather than taken from
+    its start.
+
+    Args:
+        candidates: (line number, line) pairs in text order
+        budget: Token budget for the picked lines
+
+    Returns:
+        Tuple of (picked pairs, remaining budget)
+    """
+    clusters: Dict[str, List[Tuple[int, str]]] = {}
+    for candidate in candidates:
+        clusters.setdefault(line_shape(candidate[1]), []).append(candidate)
+    ordered = sorted((_spread(cluster) for cluster in clusters.values()), key=len, reverse=True)
+
+    picked: List[Tuple[int, str]] = []
+    for round_index in range(max((len(cluster) for cluster in ordered), default=0)):
+        for cluster in ordered:
+            if round_index >= len(cluster):
+                continue
+            cost = estimate_tokens(cluster[round_index][1]) + 1
+            if cost > budget:
+                continue
+            picked.append(cluster[round_index])
+            budget -= cost
+        if budget <= 0:
+            break
+    return picked, budget
+
+def reduce_sample_text(
+    sample_text: str,
+    expected_matches: Optional[str] = None,
+    max_tokens: int = PROMPT_TOKEN_BUDGET
+) -> Tuple[str, int, int]:
+    """
+    Reduce a sample text to an excerpt that fits a token budget
+
+    Texts within the budget are returned unchanged. Otherwise lines are
+    shortened to PROMPT_MAX_LINE_CHARS and deduplicated; lines containing
+    expected matches are kept first, then a representative sample of the
+    remaining lines, spread over their shapes. Picked lines stay in their
+    original order.
+
+    Args:
+        sample_text: Sample text containing examples of what to match
+        expected_matches: Expected matches, one per line
+        max_tokens: Token budget for the excerpt
+
+    Returns:
+        Tuple of (excerpt, lines kept, lines in the sample text)
+    """
+    lines = sample_text.splitlines()
+    if estimate_tokens(sample_text) <= max_tokens:
+        return sample_text, len(lines), len(lines)
+
+    expected = [line.strip() for line in (expected_matches or "").splitlines() if line.strip()]
+    seen = set()
+    matching: List[Tuple[int, str]] = []
+    others: List[Tuple[int, str]] = []
+    for number, line in enumerate(lines):
+        anchor = next((match for match in expected if match in line), None)
+        line = _shorten(line, anchor)
+        if not line.strip() or line in seen:
+            continue
+        seen.add(line)
+        (matching if anchor is not None else others).append((number, line))
+
+    picked, budget = _pick_representatives(matching, max_tokens)
+    more, _ = _pick_representatives(others, budget)
+    picked = sorted(picked + more)
+
+    logger.info(f"Reduced sample text from {len(lines)} to {len(picked)} lines for the prompt")
+    return "\n".join(line for _, line in picked), len(picked), len(lines)
@@ -0,0 +1,227 @@
+"""
+Service for finding earlier generation requests similar to a new one
+"""
+import os
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Minimum Jaccard similarity of trigram sets for a request to count as similar
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.6"))
+
+# Number of similar requests whose patterns are re-verified per generation
+SIMILARITY_CANDIDATES = int(os.environ.get("SIMILARITY_CANDIDATES", "3"))
+
+# Words that say nothing about what to match, ignored when comparing requests
+STOP_WORDS = frozenset(
+    "a an the all any some each every of for to in on with from that which "
+    "match matches matching find extract validate validating get capture "
+    "regex regexp expression pattern please".split()
+)
+
+def request_trigrams(description: str, expected_matches: Optional[str] = None) -> FrozenSet[str]:
+    """
+    Character trigrams of a request's description and expected matches
+
+    Text is case-folded and split into words, dropping stop words; each word
+    is padded with spaces so short words and word boundaries contribute
+    trigrams too.
+
+    Args:
+        description: Description of what the regex should do
+        expected_matches: Specific parts of the sample text that should match
+
+    Returns:
+        Set of trigrams
+    """
+    text = f"{description}\n{expected_matches or ''}".casefold()
+    trigrams = set()
+    for word in text.split():
+        if word in STOP_WORDS:
+            continue
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(trigrams)
+
+class SimilarityIndex:
+    """In-memory character-trigram inverted index over generation requests
+
+    Each indexed request points at the pattern it produced. Lookups score
+    candidates sharing trigrams with the query by Jaccard similarity, using
+    only the posting lists of the query's trigrams. Requests that stop being
+    reusable must be removed, and lookups drop requests past their max age.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._entries: Dict[int, Tuple[int, str, FrozenSet[str], datetime]] = {}
+        self._postings: Dict[str, set] = {}
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the index has been populated from the database"""
+        return self._loaded
+
+    def load(self, requests: List[Tuple[int, int, str, Optional[str], Optional[str], datetime]]) -> None:
+        """
+        Replace the index contents
+
+        Args:
+            requests: List of (request_id, pattern_id, description, expected_matches, flags, created_at)
+        """
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            for request_id, pattern_id, description, expected_matches, flags, created_at in requests:
+                self._add(request_id, pattern_id, description, expected_matches, flags, created_at)
+            self._loaded = True
+
+    def add(
+        self,
+        request_id: int,
+        pattern_id: int,
+        description: str,
+        expected_matches: Optional[str] = None,
+        flags: Optional[str] = None,
+        created_at: Optional[datetime] = None
+    ) -> None:
+        """
+        Index a request
+
+        Args:
+            request_id: ID of the request
+            pattern_id: ID of the pattern it produced
+            description: Description of what the regex should do
+            expected_matches: Specific parts of the sample text that should match
+            flags: Regex flags of the pattern
+            created_at: When the request was stored (defaults to now, UTC)
+        """
+        with self._lock:
+            self._add(request_id, pattern_id, description, expected_matches, flags, created_at or datetime.utcnow())
+
+    def remove(self, request_ids: Iterable[int]) -> int:
+        """
+        Stop offering the results of some requests
+
+        Args:
+            request_ids: IDs of the requests
+
+        Returns:
+            Number of requests removed from the index
+        """
+        with self._lock:
+            return sum(self._remove(request_id) for request_id in request_ids)
+
+    def clear(self) -> None:
+        """Remove every request, keeping the index marked as loaded"""
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+
+    def _add(
+        self,
+        request_id: int,
+        pattern_id: int,
+        description: str,
+        expected_matches: Optional[str],
+        flags: Optional[str],
+        created_at: datetime
+    ) -> None:
+        """Index a request (lock held)"""
+        self._remove(request_id)
+        trigrams = request_trigrams(description, expected_matches)
+        self._entries[request_id] = (pattern_id, flags or "", trigrams, created_at)
+        for trigram in trigrams:
+            self._postings.setdefault(trigram, set()).add(request_id)
+
+    def _remove(self, request_id: int) -> bool:
+        """Unindex a request (lock held)"""
+        entry = self._entries.pop(request_id, None)
+        if entry is None:
+            return False
+        for trigram in entry[2]:
+            posting = self._postings.get(trigram)
+            if posting is not None:
+                posting.discard(request_id)
+                if not posting:
+                    del self._postings[trigram]
+        return True
+
+    def query(
+        self,
+        description: str,
+        expected_matches: Optional[str] = None,
+        limit: Optional[int] = None,
+        threshold: Optional[float] = None,
+        max_age: Optional[float] = None
+    ) -> List[Tuple[int, str, float]]:
+        """
+        Find patterns of the most similar indexed requests
+
+        Args:
+            description: Description of what the regex should do
+            expected_matches: Specific parts of the sample text that should match
+            limit: Maximum number of patterns (defaults to SIMILARITY_CANDIDATES)
+            threshold: Minimum Jaccard similarity (defaults to SIMILARITY_THRESHOLD)
+            max_age: Drop requests older than this many seconds (no limit if None)
+
+        Returns:
+            List of (pattern_id, flags, similarity), most similar first, one entry per pattern
+        """
+        limit = SIMILARITY_CANDIDATES if limit is None else limit
+        threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+        trigrams = request_trigrams(description, expected_matches)
+        if not trigrams:
+            return []
+
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age) if max_age is not None else None
+        with self._lock:
+            shared: Counter = Counter()
+            for trigram in trigrams:
+                shared.update(self._postings.get(trigram, ()))
+
+            best: Dict[int, Tuple[str, float]] = {}
+            for request_id, overlap in shared.items():
+                pattern_id, flags, other, created_at = self._entries[request_id]
+                if cutoff is not None and created_at < cutoff:
+                    self._remove(request_id)
+                    continue
+                similarity = overlap / (len(trigrams) + len(other) - overlap)
+                if similarity >= threshold and similarity > best.get(pattern_id, ("", 0.0))[1]:
+                    best[pattern_id] = (flags, similarity)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][1], -item[0]))[:limit]
+        return [(pattern_id, flags, similarity) for pattern_id, (flags, similarity) in ranked]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get index counters
+
+        Returns:
+            Dictionary with request and trigram counts
+        """
+        with self._lock:
+            return {"requests": len(self._entries), "trigrams": len(self._postings)}
+
+# Process-wide similarity index
+similarity_index = SimilarityIndex()
+
+async def ensure_index_loaded(db: AsyncSession) -> None:
+    """
+    Populate the similarity index from the database on first use
+
+    Args:
+        db: Database session
+    """
+    if similarity_index.loaded:
+        return
+    from app.services.db_service import get_indexable_requests
+    similarity_index.load(await get_indexable_requests(db))
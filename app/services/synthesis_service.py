@@ -0,0 +1,320 @@
+"""
+Service for synthesizing regex patterns from examples without calling the AI
+"""
+import os
+import time
+import logging
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+
+import regex
+
+from app.services.regex_executor import get_executor, RegexTimeoutError, RegexWorkerError
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Budget for trying all candidate patterns against the sample text (seconds)
+SYNTHESIS_TIMEOUT = float(os.environ.get("SYNTHESIS_TIMEOUT", "0.5"))
+
+# Character class per class key, with a description for the explanation
+CLASSES = {
+    "d": (r"\d", "digit"),
+    "U": ("[A-Z]", "uppercase letter"),
+    "L": ("[a-z]", "lowercase letter"),
+    "A": (r"[^\W\d_]", "letter"),
+    "w": (r"\w", "word character"),
+    "s": (r"\s", "whitespace character"),
+}
+
+# Members of each class key inside a bracketed character class
+CLASS_MEMBERS = {"d": "0-9", "U": "A-Z", "L": "a-z", "A": r"\p{L}", "w": r"\w", "s": r"\s"}
+
+# Characters that need escaping outside and inside character classes
+SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+CLASS_SPECIAL_CHARS = frozenset("]\\^-[")
+
+def _escape(text: str, special: frozenset = SPECIAL_CHARS) -> str:
+    """Escape only the characters that are special in a pattern"""
+    return "".join("\\" + ch if ch in special else ch for ch in text)
+
+def _class_key(ch: str, level: str) -> str:
+    """
+    Class key of a character at a generalization level
+
+    Args:
+        ch: The character
+        level: "fine" (digits, upper, lower), "medium" (digits, letters)
+            or "coarse" (word characters)
+
+    Returns:
+        Class key, or the character itself if it stays literal
+    """
+    if ch.isspace():
+        return "s"
+    if level == "coarse":
+        return "w" if ch.isalnum() or ch == "_" else ch
+    if "0" <= ch <= "9":
+        return "d"
+    if ch.isalpha():
+        if level == "fine" and "A" <= ch <= "Z":
+            return "U"
+        if level == "fine" and "a" <= ch <= "z":
+            return "L"
+        return "A"
+    return ch
+
+def _runs(text: str, level: str) -> List[Tuple[str, int]]:
+    """Split a text into runs of characters sharing a class key"""
+    runs: List[Tuple[str, int]] = []
+    for ch in text:
+        key = _class_key(ch, level)
+        if runs and runs[-1][0] == key:
+            runs[-1] = (key, runs[-1][1] + 1)
+        else:
+            runs.append((key, 1))
+    return runs
+
+def _quantifier(lengths: List[int], mode: str) -> Tuple[str, str]:
+    """
+    Quantifier (and its description) covering the given run lengths
+
+    Args:
+        lengths: Observed run lengths
+        mode: "open" (+ or *), "bounded" (observed range) or "natural"
+            (observed count if constant, open otherwise)
+
+    Returns:
+        Tuple of (quantifier, description of the amount)
+    """
+    low, high = min(lengths), max(lengths)
+    if mode == "open" or (mode == "natural" and low != high):
+        return ("+", "one or more") if low >= 1 else ("*", "any number of")
+    if low == high:
+        return ("", "one") if low == 1 else (f"{{{low}}}", str(low))
+    return f"{{{low},{high}}}", f"{low} to {high}"
+
+def _literal_part(key: str, count: int) -> Tuple[str, str]:
+    """Pattern and description of a run of one literal character"""
+    escaped = _escape(key)
+    if count == 1:
+        return escaped, f'"{key}"'
+    return f"{escaped}{{{count}}}", f'{count} x "{key}"'
+
+def _aligned_candidate(examples: List[str], level: str, mode: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    Generalize examples that share the same sequence of character classes
+
+    Args:
+        examples: Positive examples
+        level: Class generalization level
+        mode: Quantifier mode for class runs (see _quantifier)
+
+    Returns:
+        Tuple of (pattern, part descriptions), or None if the examples don't align
+    """
+    all_runs = [_runs(example, level) for example in examples]
+    keys = [key for key, _ in all_runs[0]]
+    if any([key for key, _ in runs] != keys for runs in all_runs[1:]):
+        return None
+
+    parts, descriptions = [], []
+    for index, key in enumerate(keys):
+        lengths = [runs[index][1] for runs in all_runs]
+        if key in CLASSES:
+            # Single characters everywhere stay single: [A-Z][a-z]+
+            quantifier, amount = _quantifier(lengths, "bounded" if max(lengths) == 1 else mode)
+            class_pattern, name = CLASSES[key]
+            parts.append(class_pattern + quantifier)
+            descriptions.append(f"{amount} {name}{'s' if amount != 'one' else ''}")
+        elif len(set(lengths)) == 1:
+            pattern, description = _literal_part(key, lengths[0])
+            parts.append(pattern)
+            descriptions.append(description)
+        else:
+            quantifier, amount = _quantifier(lengths, "bounded")
+            parts.append(_escape(key) + quantifier)
+            descriptions.append(f'{amount} x "{key}"')
+    return "".join(parts), descriptions
+
+def _common_prefix(texts: List[str]) -> str:
+    """Longest common prefix of some texts"""
+    prefix = texts[0]
+    for text in texts[1:]:
+        while not text.startswith(prefix):
+            prefix = prefix[:-1]
+    return prefix
+
+def _factored_candidate(examples: List[str], mode: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    Factor out the common literal prefix and suffix and generalize the middles
+    into one character class
+
+    Args:
+        examples: Positive examples
+        mode: Quantifier mode for the middle (see _quantifier)
+
+    Returns:
+        Tuple of (pattern, part descriptions), or None if nothing can be factored
+    """
+    prefix = _common_prefix(examples)
+    rests = [example[len(prefix):] for example in examples]
+    suffix = _common_prefix([rest[::-1] for rest in rests])[::-1]
+    middles = [rest[:len(rest) - len(suffix)] for rest in rests]
+    if not prefix and not suffix:
+        return None
+
+    members: List[str] = []
+    for key in sorted({_class_key(ch, "fine") for middle in middles for ch in middle}):
+        member = CLASS_MEMBERS.get(key) or _escape(key, CLASS_SPECIAL_CHARS)
+        if member not in members:
+            members.append(member)
+    if not members:
+        return None
+
+    quantifier, amount = _quantifier([len(middle) for middle in middles], mode)
+    parts = [_escape(prefix), f"[{''.join(members)}]{quantifier}", _escape(suffix)]
+    descriptions = []
+    if prefix:
+        descriptions.append(f'the prefix "{prefix}"')
+    descriptions.append(f"{amount} of [{''.join(members)}]")
+    if suffix:
+        descriptions.append(f'the suffix "{suffix}"')
+    return "".join(parts), descriptions
+
+def _candidates(examples: List[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Candidate patterns in order of preference
+
+    Classes go from the finest that fits the examples to the coarsest, so
+    digits stay \\d rather than \\w. Within a class level, lengths seen to
+    be constant are kept, then the observed ranges, then one-or-more. Each
+    structure is also tried between word boundaries.
+
+    Yields:
+        Tuples of (pattern, explanation)
+    """
+    seen: Set[str] = set()
+    structures = []
+    for build in (
+        lambda mode: _aligned_candidate(examples, "fine", mode),
+        lambda mode: _aligned_candidate(examples, "medium", mode),
+        lambda mode: _factored_candidate(examples, mode),
+        lambda mode: _aligned_candidate(examples, "coarse", mode),
+    ):
+        for mode in ("natural", "bounded", "open"):
+            structures.append(build(mode))
+
+    word_start = all(regex.match(r"\w", example) for example in examples)
+    word_end = all(regex.search(r"\w$", example) for example in examples)
+    for structure in structures:
+        if structure is None:
+            continue
+        pattern, descriptions = structure
+        explanation = "Synthesized from the expected matches: " + ", then ".join(descriptions) + "."
+        variants = [(pattern, explanation)]
+        if word_start or word_end:
+            bounded = ("\\b" if word_start else "") + pattern + ("\\b" if word_end else "")
+            variants.append((bounded, explanation + " Bounded by word boundaries."))
+        for variant in variants:
+            if variant[0] not in seen:
+                seen.add(variant[0])
+                yield variant
+
+def expected_spans(examples: List[str], sample_text: str) -> Optional[List[Tuple[int, int]]]:
+    """
+    Spans of every occurrence of the examples in the sample text
+
+    Args:
+        examples: Positive examples
+        sample_text: Text the examples were taken from
+
+    Returns:
+        Sorted spans, or None if an example doesn't occur in the sample text
+    """
+    spans: Set[Tuple[int, int]] = set()
+    for example in examples:
+        start = sample_text.find(example)
+        if start < 0:
+            return None
+        while start >= 0:
+            spans.add((start, start + len(example)))
+            start = sample_text.find(example, start + len(example))
+    return sorted(spans)
+
+def synthesize_pattern(
+    expected_matches: str,
+    sample_text: str,
+    timeout: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Infer a pattern from positive examples and the text around them
+
+    Examples are generalized into character classes and quantified runs,
+    or into a common literal prefix and suffix around one character class.
+    The first candidate whose matches in the sample text are exactly the
+    occurrences of the examples wins, so the rest of the sample text acts
+    as negative evidence.
+
+    Args:
+        expected_matches: Expected matches, one per line
+        sample_text: Sample text containing the expected matches
+        timeout: Matching budget in seconds shared by all candidates
+
+    Returns:
+        Dictionary with pattern, explanation, test_cases and flags, or None
+    """
+    examples = list(dict.fromkeys(line.strip() for line in expected_matches.splitlines() if line.strip()))
+    if not examples:
+        return None
+    target = expected_spans(examples, sample_text)
+    if target is None:
+        return None
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    for pattern, explanation in _candidates(examples):
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("Pattern synthesis ran out of time")
+                return None
+        try:
+            compiled = regex.compile(pattern)
+            spans = [match.span() for match in compiled.finditer(sample_text, concurrent=True, timeout=remaining)]
+        except regex.error:
+            continue
+        except TimeoutError:
+            logger.warning("Pattern synthesis ran out of time")
+            return None
+        if spans == target:
+            return {
+                "pattern": pattern,
+                "explanation": explanation,
+                "test_cases": [{"text": example, "should_match": True} for example in examples],
+                "flags": ""
+            }
+    return None
+
+async def synthesize_regex(expected_matches: Optional[str], sample_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Try to synthesize a pattern locally on the regex executor
+
+    Args:
+        expected_matches: Expected matches, one per line
+        sample_text: Sample text containing the expected matches
+
+    Returns:
+        AI-shaped result dictionary, or None if no candidate fits exactly
+    """
+    if not expected_matches or not expected_matches.strip():
+        return None
+    try:
+        return await get_executor().run(
+            synthesize_pattern,
+            expected_matches,
+            sample_text,
+            timeout=SYNTHESIS_TIMEOUT
+        )
+    except (RegexTimeoutError, RegexWorkerError) as e:
+        logger.warning(f"Pattern synthesis failed: {e}")
+        return None
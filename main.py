@@ -12,6 +12,9 @@ from dotenv import load_dotenv
 from app.routes import router as api_router
 from app.routes.views import router as views_router
 from app.database import create_db_and_tables
+from app.services.regex_executor import start_executor, shutdown_executor
+from app.services.ai_service import start_ai_client, close_ai_client
+from app.services.job_service import start_job_workers, stop_job_workers
 
 # Load environment variables
 load_dotenv()
@@ -43,6 +46,16 @@ app.include_router(views_router)
 @app.on_event("startup")
 async def startup_event():
     await create_db_and_tables()
+    start_executor()
+    start_ai_client()
+    await start_job_workers()
+
+# Stop generation job and regex executor workers and close pooled API connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_job_workers()
+    shutdown_executor()
+    await close_ai_client()
 
 # Root redirect
 @app.get("/")
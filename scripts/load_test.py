@@ -0,0 +1,254 @@
+"""
+Load test for the generate, test and pattern CRUD API routes
+
+Runs each scenario closed-loop at one or more concurrency levels against a
+running app and reports throughput and latency percentiles per operation.
+Results can be saved as JSON and compared with a run from another commit.
+
+Example:
+    python scripts/mock_llm_server.py &
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock uvicorn main:app &
+    python scripts/load_test.py --concurrency 1,8,32 --duration 10 --json results.json
+    python scripts/load_test.py --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import string
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# Descriptions for generation requests; none of them is answered by the built-in catalog
+DESCRIPTIONS = [
+    "US phone numbers",
+    "order numbers like ORD-12345",
+    "prices in dollars",
+    "hashtags",
+    "version numbers such as 1.2.3",
+    "temperatures like 21.5C",
+]
+
+# Patterns and text templates for regex test requests
+TEST_PATTERNS = [r"\d{3}-\d{4}", r"\b[A-Z][a-z]+\b", r"(\w+)@(\w+)\.com", r"#\w+", r"v?\d+\.\d+\.\d+"]
+TEST_TEXT = "Call 555-1234 or email Jane at jane@example.com about #release v1.2.3 on Monday. "
+
+# An operation returns (name, seconds, ok) for every request it made
+Outcome = Tuple[str, float, bool]
+
+def _token(length: int = 8) -> str:
+    """Random lowercase token to keep request inputs unique"""
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+async def _request(client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Tuple[Outcome, Any]:
+    """Send a request and time it; 4xx/5xx responses and status "error" bodies count as failures"""
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        body = response.json() if response.content else None
+        ok = response.status_code < 400 and not (isinstance(body, dict) and body.get("status") == "error")
+        return (name, elapsed, ok), body
+    except (httpx.HTTPError, ValueError):
+        return (name, time.perf_counter() - started, False), None
+
+def make_generate(args: argparse.Namespace) -> Callable[[httpx.AsyncClient], Awaitable[List[Outcome]]]:
+    """Operation posting a generation request"""
+    async def generate(client: httpx.AsyncClient) -> List[Outcome]:
+        description = random.choice(DESCRIPTIONS)
+        sample_text = "Call 555-1234, ref ORD-12345, $19.99, #tag, v1.2.3, 21.5C"
+        if not args.repeat_inputs:
+            description = f"{description} ({_token()})"
+            sample_text = f"{sample_text} {_token()}"
+        outcome, _ = await _request(client, "generate", "POST", "/api/regex/generate", json={
+            "description": description,
+            "sample_text": sample_text,
+            "bypass_cache": args.bypass_cache,
+        })
+        return [outcome]
+    return generate
+
+def make_test(args: argparse.Namespace) -> Callable[[httpx.AsyncClient], Awaitable[List[Outcome]]]:
+    """Operation posting a regex test request"""
+    async def test(client: httpx.AsyncClient) -> List[Outcome]:
+        text = TEST_TEXT * args.test_text_repeat
+        if not args.repeat_inputs:
+            text += _token()
+        outcome, _ = await _request(client, "test", "POST", "/api/regex/test", json={
+            "pattern": random.choice(TEST_PATTERNS),
+            "test_text": text,
+            "flags": "",
+        })
+        return [outcome]
+    return test
+
+def make_crud(args: argparse.Namespace) -> Callable[[httpx.AsyncClient], Awaitable[List[Outcome]]]:
+    """Operation creating, reading, updating and deleting a pattern"""
+    async def crud(client: httpx.AsyncClient) -> List[Outcome]:
+        pattern = {
+            "name": f"load-test {_token()}",
+            "pattern": random.choice(TEST_PATTERNS),
+            "sample_text": TEST_TEXT,
+            "description": "Created by the load test",
+        }
+        created, body = await _request(client, "crud.create", "POST", "/api/patterns", json=pattern)
+        if not created[2] or not isinstance(body, dict) or "id" not in body:
+            return [created]
+        url = f"/api/patterns/{body['id']}"
+        read, _ = await _request(client, "crud.read", "GET", url)
+        updated, _ = await _request(client, "crud.update", "PUT", url, json=dict(pattern, name=f"{pattern['name']} (updated)"))
+        listed, _ = await _request(client, "crud.list", "GET", "/api/patterns", params={"limit": 20})
+        deleted, _ = await _request(client, "crud.delete", "DELETE", url)
+        return [created, read, updated, listed, deleted]
+    return crud
+
+SCENARIOS = {
+    "generate": make_generate,
+    "test": make_test,
+    "crud": make_crud,
+}
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile of some values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def summarize(scenario: str, concurrency: int, elapsed: float, outcomes: List[Outcome]) -> List[Dict[str, Any]]:
+    """Aggregate outcomes into one result row per operation"""
+    rows = []
+    for name in sorted({outcome[0] for outcome in outcomes}):
+        latencies = [seconds for op, seconds, _ in outcomes if op == name]
+        errors = sum(1 for op, _, ok in outcomes if op == name and not ok)
+        rows.append({
+            "scenario": scenario,
+            "operation": name,
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        })
+    return rows
+
+async def run_level(
+    args: argparse.Namespace,
+    scenario: str,
+    concurrency: int
+) -> List[Dict[str, Any]]:
+    """Run one scenario closed-loop with the given number of concurrent clients"""
+    operation = SCENARIOS[scenario](args)
+    outcomes: List[Outcome] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        remaining = [args.requests] if args.requests else None
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                if remaining is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                outcomes.extend(await operation(client))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(scenario, concurrency, elapsed, outcomes)
+
+def git_commit() -> Optional[str]:
+    """Commit of the working tree the load test runs from, if it is a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(rows: List[Dict[str, Any]], baseline: Optional[Dict[Tuple[str, int], Dict[str, Any]]] = None) -> None:
+    """Print result rows, with changes relative to a baseline run if given"""
+    header = f"{'operation':<14}{'conc':>6}{'reqs':>8}{'errs':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'d req/s':>10}{'d p95':>10}"
+    print(header)
+    for row in rows:
+        line = (
+            f"{row['operation']:<14}{row['concurrency']:>6}{row['requests']:>8}{row['errors']:>6}"
+            f"{row['throughput']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+        )
+        previous = (baseline or {}).get((row["operation"], row["concurrency"]))
+        if previous:
+            for key in ("throughput", "p95_ms"):
+                change = (row[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+                line += f"{change:>+9.1f}%"
+        print(line)
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every scenario at every concurrency level"""
+    rows = []
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            print(f"Running {scenario} at concurrency {concurrency}...", flush=True)
+            rows.extend(await run_level(args, scenario, concurrency))
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "duration": args.duration,
+        "requests_per_level": args.requests,
+        "results": rows,
+    }
+
+def main():
+    """Parse options, run the load test and report the results"""
+    parser = argparse.ArgumentParser(description="Load test the regex API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Base URL of the running app")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+                        help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 8, 32], help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and level")
+    parser.add_argument("--requests", type=int, default=0, help="Stop each level after this many operations (0: no limit)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request (seconds)")
+    parser.add_argument("--repeat-inputs", action="store_true", help="Reuse inputs so caches can answer")
+    parser.add_argument("--bypass-cache", action="store_true", help="Ask the generate route not to reuse stored results")
+    parser.add_argument("--test-text-repeat", type=int, default=10, help="Copies of the test text per regex test")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for the generated inputs")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    report = asyncio.run(main_async(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        baseline = {(row["operation"], row["concurrency"]): row for row in previous["results"]}
+        print(f"\nCompared with {previous.get('commit') or args.compare} ({previous.get('timestamp')})")
+    print(f"\nCommit {report['commit'] or 'unknown'}")
+    print_table(report["results"], baseline)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
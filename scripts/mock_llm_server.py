@@ -0,0 +1,255 @@
+"""
+Local OpenAI-compatible stand-in for the chat completions API
+
+Serves canned or fuzzed regex generations with configurable latency,
+errors and hangs, so the generate path can be exercised and load tested
+without an API key or network access. Point the app at it with
+OPENAI_BASE_URL=http://127.0.0.1:8001/v1 and any OPENAI_API_KEY.
+
+Example:
+    python scripts/mock_llm_server.py --latency lognormal:-0.5,0.4 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Canned generations, picked by keywords in the prompt's description
+CANNED_RESPONSES = [
+    (("phone",), {
+        "pattern": r"\(?\d{3}\)?[-. ]?\d{3}[-. ]?\d{4}",
+        "explanation": "Three digits (optionally in parentheses), three digits and four digits, with optional separators.",
+        "test_cases": [
+            {"text": "555-123-4567", "should_match": True},
+            {"text": "(555) 123 4567", "should_match": True},
+            {"text": "12-34", "should_match": False},
+        ],
+        "flags": "",
+    }),
+    (("email", "e-mail"), {
+        "pattern": r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",
+        "explanation": "A local part, an @ and a dotted domain.",
+        "test_cases": [
+            {"text": "a@b.io", "should_match": True},
+            {"text": "first.last@example.co.uk", "should_match": True},
+            {"text": "not-an-email", "should_match": False},
+        ],
+        "flags": "",
+    }),
+    (("date",), {
+        "pattern": r"\d{4}-\d{2}-\d{2}",
+        "explanation": "Four digits, a dash, two digits, a dash and two digits.",
+        "test_cases": [
+            {"text": "2024-03-15", "should_match": True},
+            {"text": "15/03/2024", "should_match": False},
+            {"text": "2024-3-15", "should_match": False},
+        ],
+        "flags": "",
+    }),
+    (("number", "digit", "amount", "id"), {
+        "pattern": r"\d+",
+        "explanation": "One or more digits.",
+        "test_cases": [
+            {"text": "42", "should_match": True},
+            {"text": "id 7", "should_match": True},
+            {"text": "none", "should_match": False},
+        ],
+        "flags": "",
+    }),
+]
+
+# Generation used when no keyword matches
+DEFAULT_RESPONSE = {
+    "pattern": r"\b\w+\b",
+    "explanation": "Whole words.",
+    "test_cases": [
+        {"text": "word", "should_match": True},
+        {"text": "two words", "should_match": True},
+        {"text": "   ", "should_match": False},
+    ],
+    "flags": "",
+}
+
+# Building blocks of fuzzed patterns
+FUZZ_ATOMS = [r"\d", r"\w", r"[A-Z]", r"[a-z]", r"\s", "-", r"\.", "@", ":", "/", "[0-9a-f]", "(?:ab|cd)"]
+FUZZ_QUANTIFIERS = ["", "+", "*", "?", "{2}", "{1,3}"]
+
+def parse_latency(spec: str):
+    """
+    Parse a latency distribution spec into a sampling function
+
+    Args:
+        spec: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+            "lognormal:MU,SIGMA" or "exponential:MEAN" (seconds)
+
+    Returns:
+        Function returning a latency in seconds
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    samplers = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: random.uniform(values[0], values[1]),
+        "normal": lambda: random.gauss(values[0], values[1]),
+        "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+        "exponential": lambda: random.expovariate(1 / values[0]),
+    }
+    if kind not in samplers:
+        raise argparse.ArgumentTypeError(f"Unknown latency distribution: {kind}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+def canned_response(prompt: str) -> dict:
+    """Pick the canned generation whose keywords appear in the prompt's description"""
+    match = re.search(r"^Description: (.*)$", prompt, re.MULTILINE)
+    description = (match.group(1) if match else prompt).lower()
+    for keywords, response in CANNED_RESPONSES:
+        if any(keyword in description for keyword in keywords):
+            return response
+    return DEFAULT_RESPONSE
+
+def fuzzed_content(prompt: str) -> str:
+    """
+    Produce a plausible but unreliable model response
+
+    Patterns are random sequences of atoms and quantifiers; the JSON may be
+    fenced, miss fields, carry extra ones or use unexpected types.
+    """
+    pattern = "".join(random.choice(FUZZ_ATOMS) + random.choice(FUZZ_QUANTIFIERS) for _ in range(random.randint(1, 6)))
+    response = dict(canned_response(prompt), pattern=pattern, explanation="Fuzzed pattern.")
+    roll = random.random()
+    if roll < 0.1:
+        response.pop("test_cases")
+    elif roll < 0.2:
+        response["test_cases"] = ["plain string", {"text": "missing should_match"}]
+    elif roll < 0.3:
+        response["flags"] = random.choice(["i", "im", "x", None])
+    elif roll < 0.4:
+        response["confidence"] = round(random.random(), 2)
+    content = json.dumps(response)
+    if random.random() < 0.3:
+        content = f"```json\n{content}\n```"
+    return content
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    """
+    Build the mock API
+
+    Args:
+        args: Parsed command line options
+
+    Returns:
+        FastAPI application
+    """
+    app = FastAPI(title="Mock LLM server")
+    sample_latency = parse_latency(args.latency)
+    stats = {"requests": 0, "errors": 0, "hangs": 0, "invalid": 0}
+
+    def completion_content(prompt: str) -> str:
+        if random.random() < args.invalid_json_rate:
+            stats["invalid"] += 1
+            return "Sure! Here is a regex that should work: \\d+"
+        if args.mode == "fuzz" or (args.mode == "mixed" and random.random() < 0.5):
+            return fuzzed_content(prompt)
+        return json.dumps(canned_response(prompt))
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        prompt = "\n".join(message.get("content") or "" for message in body.get("messages", []))
+        latency = sample_latency()
+
+        roll = random.random()
+        if roll < args.hang_rate:
+            stats["hangs"] += 1
+            await asyncio.sleep(args.hang_seconds)
+        elif roll < args.hang_rate + args.error_rate:
+            stats["errors"] += 1
+            await asyncio.sleep(latency)
+            status = random.choice(args.error_statuses)
+            return JSONResponse(
+                status_code=status,
+                content={"error": {"message": f"Mock error {status}", "type": "server_error", "code": None}}
+            )
+
+        content = completion_content(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+
+        if body.get("stream"):
+            async def events():
+                # Spread the latency over the chunks, with a tenth of it before the first one
+                pieces = [content[i:i + args.chunk_chars] for i in range(0, len(content), args.chunk_chars)]
+                await asyncio.sleep(latency / 10)
+                for piece in pieces:
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(latency * 0.9 / len(pieces))
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "created": 0, "owned_by": "mock"}]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+def main():
+    """Parse options and run the mock server"""
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock for regex generation")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="normal:0.8,0.3", help="Latency distribution (see parse_latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error status")
+    parser.add_argument("--error-statuses", type=lambda value: [int(status) for status in value.split(",")],
+                        default=[500, 503, 429], help="Comma-separated error statuses to pick from")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=120.0, help="How long hanging requests hang")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0, help="Fraction of responses that aren't JSON")
+    parser.add_argument("--mode", choices=["canned", "fuzz", "mixed"], default="canned", help="How responses are produced")
+    parser.add_argument("--chunk-chars", type=int, default=8, help="Characters per streamed chunk")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
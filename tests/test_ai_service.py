@@ -0,0 +1,143 @@
+"""
+Unit tests for the AI service against a local fake OpenAI-compatible server
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import ai_service
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers chat completions with a canned regex"""
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_POST(self):
+        FakeOpenAIHandler.connections.add(self.client_address)
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = json.dumps({"pattern": r"\d+", "explanation": "digits", "test_cases": ["1"], "flags": ""})
+        if request.get("stream"):
+            self.send_stream(content)
+            return
+        body = json.dumps({
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "fake",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, content):
+        """Send the content as chat completion chunks of a few characters"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i in range(0, len(content), 5):
+            chunk = {
+                "id": "chatcmpl-1",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "fake",
+                "choices": [{"index": 0, "delta": {"content": content[i:i + 5]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeOpenAIHandler.connections.clear()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_generation_reuses_pooled_connection(fake_server):
+    """Test sequential generations share the client and its keep-alive connection"""
+    await ai_service.close_ai_client()
+    client = ai_service.start_ai_client(api_key="test-key", base_url=fake_server)
+    try:
+        for _ in range(3):
+            result = await ai_service.generate_regex_with_ai("digits", "a 1 b 2")
+            assert result["pattern"] == r"\d+"
+        
+        assert ai_service.get_ai_client() is client
+        assert len(FakeOpenAIHandler.connections) == 1
+    finally:
+        await ai_service.close_ai_client()
+
+
+def test_json_field_stream_reports_fields_as_they_complete():
+    """Test fields are decoded as soon as their value is complete"""
+    parser = ai_service.JSONFieldStream()
+
+    assert parser.feed('```json\n{"pattern": "a\\\\d{2,}", "expl') == [("pattern", "a\\d{2,}")]
+    assert parser.feed('anation": "x, {y}", "n": 3') == [("explanation", "x, {y}")]
+    assert parser.feed(', "test_cases": [{"text": "a]"}]}\n```') == [("n", 3), ("test_cases", [{"text": "a]"}])]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_response_content(fake_server):
+    """Test streamed content reassembles into the model's JSON"""
+    await ai_service.close_ai_client()
+    ai_service.start_ai_client(api_key="test-key", base_url=fake_server)
+    try:
+        parser = ai_service.JSONFieldStream()
+        fields = []
+        async for chunk in ai_service.stream_regex_with_ai("digits", "a 1 b 2"):
+            fields.extend(field for field, _ in parser.feed(chunk))
+        
+        assert fields == ["pattern", "explanation", "test_cases", "flags"]
+        assert parser.fields["pattern"] == r"\d+"
+    finally:
+        await ai_service.close_ai_client()
+
+
+class SlowOpenAIHandler(FakeOpenAIHandler):
+    """Takes too long to answer"""
+
+    def do_POST(self):
+        time.sleep(1)
+        super().do_POST()
+
+
+@pytest.mark.asyncio
+async def test_timeouts_open_the_circuit(monkeypatch):
+    """Test a slow provider is cut off at the breaker's timeout and then failed fast"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowOpenAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(ai_service, "ai_breaker", CircuitBreaker(failure_threshold=1, max_timeout=0.2))
+    await ai_service.close_ai_client()
+    ai_service.start_ai_client(api_key="test-key", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        started = time.monotonic()
+        with pytest.raises(ai_service.AIServiceError, match="did not respond"):
+            await ai_service.generate_regex_with_ai("digits", "a 1 b 2")
+        assert time.monotonic() - started < 0.9
+
+        with pytest.raises(CircuitOpenError):
+            await ai_service.generate_regex_with_ai("digits", "a 1 b 2")
+        assert ai_service.ai_breaker.stats()["state"] == "open"
+    finally:
+        await ai_service.close_ai_client()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,51 @@
+"""
+Unit tests for the pattern complexity benchmark
+"""
+from app.services.benchmark_service import classify_growth, fit_growth, run_benchmark
+
+
+def test_fit_growth_recovers_exponent():
+    """Test the log-log fit on a synthetic quadratic curve"""
+    points = [(size, 1e-6 * size ** 2) for size in (64, 128, 256, 512)]
+    exponent, last_ratio = fit_growth(points)
+    
+    assert abs(exponent - 2) < 1e-6
+    assert abs(last_ratio - 4) < 1e-6
+    assert classify_growth(exponent, last_ratio, False) == "polynomial"
+
+
+def test_classify_growth():
+    """Test growth classes for linear, exploding and timed-out curves"""
+    assert classify_growth(1.05, 2.1, False) == "linear"
+    assert classify_growth(None, 0.0, False) == "linear"
+    assert classify_growth(3.0, 500.0, False) == "exponential"
+    assert classify_growth(None, 0.0, True) == "exponential"
+
+
+def test_run_benchmark_detects_exponential_pattern():
+    """Test a catastrophic pattern against its pumped near-miss input"""
+    result = run_benchmark(r"(a|aa)+$", sample_text="aaa", max_size=256, budget=2)
+    
+    assert result["growth_class"] == "exponential"
+    assert any(point["timed_out"] for point in result["timings"]["adversarial"])
+
+
+def test_run_benchmark_linear_pattern():
+    """Test a simple pattern stays linear"""
+    result = run_benchmark(r"\d+", sample_text="call 555 1234", max_size=4096, budget=2)
+    
+    assert result["growth_class"] == "linear"
+    assert set(result["timings"]) == {"random", "adversarial", "adversarial_run", "sample"}
+
+
+def test_catastrophic_sample_text_does_not_hang_seed_search(monkeypatch):
+    """Test the near-miss seed search is bounded when the sample text itself is catastrophic"""
+    import time
+    from app.services import benchmark_service
+    
+    monkeypatch.setattr(benchmark_service, "BENCHMARK_RUN_TIMEOUT", 0.1)
+    started = time.perf_counter()
+    result = run_benchmark(r"(a|aa)+$", sample_text="a" * 60 + "b", max_size=64, budget=1)
+    
+    assert time.perf_counter() - started < 5
+    assert result["growth_class"] == "exponential"
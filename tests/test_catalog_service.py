@@ -0,0 +1,38 @@
+"""
+Unit tests for the curated pattern catalog
+"""
+import pytest
+import regex
+
+from app.services.catalog_service import CATALOG, describes_entry, match_catalog
+from app.services.redos_service import analyze_pattern
+
+
+@pytest.mark.parametrize("entry", CATALOG, ids=[entry["name"] for entry in CATALOG])
+def test_catalog_samples(entry):
+    """Test every catalog pattern against its validation samples"""
+    compiled = regex.compile(entry["pattern"])
+    for text in entry["matches"]:
+        match = compiled.search(text)
+        assert match is not None and match.group() == text, text
+    for text in entry["non_matches"]:
+        assert compiled.search(text) is None, text
+    assert analyze_pattern(entry["pattern"])["level"] == "low"
+
+
+def test_intent_matching():
+    """Test descriptions map to the right entries, most specific first"""
+    assert [entry["name"] for entry in match_catalog("Extract all E-mail addresses")] == ["email"]
+    assert [entry["name"] for entry in match_catalog("IP addresses")] == ["ipv4", "ipv6"]
+    assert [entry["name"] for entry in match_catalog("ISO 8601 timestamps")][0] == "iso_datetime"
+    assert match_catalog("US phone numbers") == []
+
+
+def test_describes_entry_rejects_qualified_descriptions():
+    """Test only descriptions asking for an entry's whole format name it exactly"""
+    ipv4 = match_catalog("IPv4 addresses")[0]
+    assert describes_entry("IPv4 addresses", ipv4)
+    assert describes_entry("find all valid IP addresses", ipv4)
+    assert not describes_entry("IPv4 addresses in private ranges", ipv4)
+    assert describes_entry("Extract all E-mail addresses", match_catalog("e-mail")[0])
+    assert not describes_entry("e-mail addresses at example.com", match_catalog("e-mail")[0])
@@ -0,0 +1,62 @@
+"""
+Unit tests for the AI provider circuit breaker
+"""
+import pytest
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_after_consecutive_failures_and_probes_after_reset():
+    """Test the closed -> open -> half-open -> closed cycle"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.record_success(1.0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # One probe goes through after the reset timeout; a failed probe reopens at once
+    clock.now = 10
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success(1.0)
+    assert breaker.state == "closed"
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_timeout_follows_latency_percentile():
+    """Test the timeout adapts to recent latencies within its bounds"""
+    breaker = CircuitBreaker(max_timeout=30, min_timeout=2, percentile=90, multiplier=2, min_samples=10)
+    assert breaker.before_call() == 30
+
+    for latency in [1.0] * 9 + [4.0]:
+        breaker.record_success(latency)
+    assert breaker.before_call() == 2
+
+    for latency in [3.0] * 10:
+        breaker.record_success(latency)
+    assert breaker.before_call() == 6
+    assert breaker.stats()["latency"]["p50"] == 3.0
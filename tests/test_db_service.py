@@ -0,0 +1,90 @@
+"""
+Unit tests for the database service
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.database import Base, add_missing_columns
+from app.models import PatternBenchmark
+from app.schemas import RegexPatternResponse
+from app.services.db_service import create_pattern, create_request, delete_pattern, get_patterns
+from app.services.similarity_service import similarity_index
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_created_and_listed_patterns_serialize_outside_the_session(db):
+    """Test pattern responses don't lazy-load test cases after the query"""
+    created = await create_pattern(db, name="Phone", pattern=r"\d{3}-\d{4}", sample_text="555-1234")
+    assert RegexPatternResponse.model_validate(created).test_cases == []
+
+    listed = await get_patterns(db)
+    assert [RegexPatternResponse.model_validate(pattern).id for pattern in listed] == [created.id]
+
+
+@pytest.mark.asyncio
+async def test_add_missing_columns_upgrades_old_tables():
+    """Test columns added since a table was created are added on startup"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE regex_patterns (id INTEGER PRIMARY KEY, name VARCHAR(100), pattern TEXT, "
+            "sample_text TEXT, description TEXT, created_at DATETIME, updated_at DATETIME)"
+        ))
+        await conn.execute(text(
+            "CREATE TABLE regex_requests (id INTEGER PRIMARY KEY, description TEXT, sample_text TEXT, "
+            "expected_matches TEXT, created_at DATETIME, result_pattern_id INTEGER REFERENCES regex_patterns (id))"
+        ))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+        # Running again on an up-to-date database changes nothing
+        await conn.run_sync(add_missing_columns)
+        
+        columns = await conn.run_sync(lambda sync: {c["name"] for c in inspect(sync).get_columns("regex_patterns")})
+        indexes = await conn.run_sync(lambda sync: {i["name"] for i in inspect(sync).get_indexes("regex_patterns")})
+        request_columns = await conn.run_sync(lambda sync: {c["name"] for c in inspect(sync).get_columns("regex_requests")})
+        request_indexes = await conn.run_sync(lambda sync: {i["name"] for i in inspect(sync).get_indexes("regex_requests")})
+    
+    assert "redos_score" in columns
+    assert "ix_regex_patterns_redos_score" in indexes
+    assert {"input_hash", "result_flags"} <= request_columns
+    assert "ix_regex_requests_input_hash" in request_indexes
+    
+    async with async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as session:
+        created = await create_pattern(session, name="Phone", pattern=r"\d{3}-\d{4}")
+        assert created.redos_score is not None
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_delete_pattern_deletes_its_benchmarks(db):
+    """Test deleting a pattern doesn't leave its benchmarks behind"""
+    pattern = await create_pattern(db, name="Phone", pattern=r"\d{3}-\d{4}")
+    db.add(PatternBenchmark(pattern=pattern.pattern, growth_class="linear", timings="[]", regex_pattern_id=pattern.id))
+    await db.commit()
+    
+    assert await delete_pattern(db, pattern.id) is True
+    assert await db.scalar(select(func.count()).select_from(PatternBenchmark)) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_pattern_drops_its_requests_from_the_similarity_index(db):
+    """Test similar requests aren't offered a deleted pattern"""
+    similarity_index.load([])
+    pattern = await create_pattern(db, name="Phone", pattern=r"\d{3}-\d{4}")
+    await create_request(db, "US phone numbers", "555-1234", result_pattern_id=pattern.id, input_hash="h", result_flags="")
+    assert [match[0] for match in similarity_index.query("US phone numbers")] == [pattern.id]
+    
+    await delete_pattern(db, pattern.id)
+    assert similarity_index.query("US phone numbers") == []
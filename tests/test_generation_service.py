@@ -0,0 +1,252 @@
+"""
+Unit tests for the generation service and its exact-match cache
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.database import Base
+from app.models import RegexPattern
+from app.services import generation_service
+from app.services.generation_service import (
+    generate_regex_pattern,
+    generate_regex_batch,
+    generation_input_hash,
+    produce_hedged_generation
+)
+from app.services.ai_service import AIServiceError
+from app.services.db_service import invalidate_cached_requests
+from app.services.similarity_service import similarity_index
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    similarity_index.load([])
+    async with async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    calls = []
+
+    async def fake_generate(description, sample_text, expected_matches=None):
+        calls.append(description)
+        return {
+            "pattern": r"\d{3}-\d{4}",
+            "explanation": "Phone number",
+            "test_cases": [{"text": "555-1234", "should_match": True}],
+            "flags": ""
+        }
+
+    monkeypatch.setattr(generation_service, "generate_regex_with_ai", fake_generate)
+    return calls
+
+
+def test_input_hash_normalization():
+    """Test cosmetic differences in the inputs share a hash"""
+    assert generation_input_hash("US  phone number", "call 555-1234\r\n", "a\nb") == \
+        generation_input_hash("us phone number ", "call 555-1234\n", "b\na\n")
+    assert generation_input_hash("phone", "call 555-1234") != generation_input_hash("phone", "call 555-9999")
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_reuse_stored_generation(db, fake_ai):
+    """Test a repeat request is served from the database without calling the AI"""
+    first = await generate_regex_pattern(db, "US phone number", "call 555-1234")
+    second = await generate_regex_pattern(db, "us phone  number", "call 555-1234")
+
+    assert first["source"] == "ai"
+    assert second["source"] == "cache"
+    assert second["pattern_id"] == first["pattern_id"]
+    assert second["test_cases"] == [{"test_text": "555-1234", "should_match": True}]
+    assert second["test_result"]["match_count"] == 1
+    assert len(fake_ai) == 1
+
+
+@pytest.mark.asyncio
+async def test_bypass_and_ttl(db, fake_ai, monkeypatch):
+    """Test the bypass flag calls the AI and an expired TTL skips the exact cache"""
+    await generate_regex_pattern(db, "phone", "call 555-1234")
+    bypassed = await generate_regex_pattern(db, "phone", "call 555-1234", bypass_cache=True)
+    assert bypassed["source"] == "ai"
+
+    monkeypatch.setattr(generation_service, "GENERATION_CACHE_TTL", 0)
+    disabled = await generate_regex_pattern(db, "phone", "call 555-1234")
+    assert disabled["source"] == "ai"
+    assert len(fake_ai) == 3
+
+    # Older than the TTL: neither the exact cache nor the similarity index may serve it
+    monkeypatch.setattr(generation_service, "GENERATION_CACHE_TTL", 0.05)
+    await asyncio.sleep(0.1)
+    expired = await generate_regex_pattern(db, "phone", "call 555-1234")
+    assert expired["source"] == "ai"
+    assert len(fake_ai) == 4
+
+
+@pytest.mark.asyncio
+async def test_invalidated_generations_are_not_reused(db, fake_ai):
+    """Test invalidated generations are dropped from the similarity index as well"""
+    first = await generate_regex_pattern(db, "US phone number", "call 555-1234")
+    await invalidate_cached_requests(db, first["pattern_id"])
+
+    again = await generate_regex_pattern(db, "US phone number", "call 555-1234")
+    assert again["source"] == "ai"
+    assert similarity_index.stats()["requests"] == 1
+
+    await invalidate_cached_requests(db)
+    paraphrase = await generate_regex_pattern(db, "phone numbers in the US", "call 555-1234")
+    assert paraphrase["source"] == "ai"
+    assert len(fake_ai) == 3
+
+
+@pytest.mark.asyncio
+async def test_generations_without_matches_are_not_reused(db, fake_ai):
+    """Test a pattern that matches nothing in the sample text isn't cached"""
+    await generate_regex_pattern(db, "phone", "no numbers here")
+    result = await generate_regex_pattern(db, "phone", "no numbers here")
+
+    assert result["source"] == "ai"
+    assert len(fake_ai) == 2
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_reuses_verified_similar_pattern(db, fake_ai):
+    """Test a paraphrased request reuses a pattern that works on its sample"""
+    await generate_regex_pattern(db, "US phone number", "call 555-1234")
+
+    similar = await generate_regex_pattern(db, "find a US phone number", "or text 555-9876", "555-9876")
+    assert similar["source"] == "similar"
+    assert similar["test_result"]["matches"][0]["full_match"] == "555-9876"
+
+    # The stored pattern can't produce the expected match here, so it isn't reused
+    rejected = await generate_regex_pattern(db, "US phone number please", "dial 5551234", "5551234")
+    assert rejected["source"] == "synthesized"
+    assert rejected["pattern"] != similar["pattern"]
+    assert len(fake_ai) == 1
+
+
+@pytest.mark.asyncio
+async def test_synthesized_pattern_skips_the_ai(db, fake_ai):
+    """Test expected matches a synthesized pattern fits exactly don't reach the AI"""
+    result = await generate_regex_pattern(db, "phone", "call 555-1234 or 555-9876 after 5pm", "555-1234\n555-9876")
+
+    assert result["source"] == "synthesized"
+    assert result["pattern"] == r"\d{3}-\d{4}"
+    assert result["test_result"]["match_count"] == 2
+    assert fake_ai == []
+
+    # Examples no candidate fits fall back to the AI
+    fallback = await generate_regex_pattern(db, "phone", "a@b.io, x.y@mail.example.com", "a@b.io\nx.y@mail.example.com")
+    assert fallback["source"] == "ai"
+    assert len(fake_ai) == 1
+
+
+@pytest.mark.asyncio
+async def test_catalog_pattern_is_verified_before_serving(db, fake_ai):
+    """Test a catalog pattern is served only if it works on the sample text"""
+    result = await generate_regex_pattern(db, "IP addresses", "from 10.0.0.1 to fe80::1", "fe80::1")
+    assert result["source"] == "catalog"
+    assert result["test_result"]["matches"][0]["full_match"] == "fe80::1"
+    assert {"test_text": "::1", "should_match": True} in result["test_cases"]
+
+    fallback = await generate_regex_pattern(db, "IP addresses", "call 555-1234")
+    assert fallback["source"] == "ai"
+    assert len(fake_ai) == 1
+
+    # A narrower request than the catalog entry, with nothing to verify it against
+    narrower = await generate_regex_pattern(db, "IPv4 addresses in private ranges", "from 10.0.0.1 to 8.8.8.8")
+    assert narrower["source"] == "ai"
+    assert len(fake_ai) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_generation(db, fake_ai, monkeypatch):
+    """Test a batch reuses stored results, generates duplicates once and reports failures per item"""
+    await generate_regex_pattern(db, "US phone number", "call 555-1234")
+
+    def item(description, sample_text, expected_matches=None):
+        return {"description": description, "sample_text": sample_text,
+                "expected_matches": expected_matches, "bypass_cache": False}
+
+    fake_generate = generation_service.generate_regex_with_ai
+
+    async def flaky_generate(description, sample_text, expected_matches=None):
+        if description == "broken":
+            raise RuntimeError("provider error")
+        return await fake_generate(description, sample_text, expected_matches)
+
+    monkeypatch.setattr(generation_service, "generate_regex_with_ai", flaky_generate)
+    results = await generate_regex_batch(db, [
+        item("US phone number", "call 555-1234"),
+        item("order ref", "ref 555-0000"),
+        item("order ref", "ref 555-0000"),
+        item("broken", "x"),
+        item("IP addresses", "host 10.0.0.1"),
+    ])
+
+    assert [result["status"] for result in results] == ["success"] * 3 + ["error", "success"]
+    assert [result.get("source") for result in results] == ["cache", "ai", "ai", None, "catalog"]
+    assert results[1]["pattern_id"] == results[2]["pattern_id"] != results[0]["pattern_id"]
+    assert results[3]["message"] == "provider error"
+    assert fake_ai == ["US phone number", "order ref"]
+
+    repeat = await generate_regex_pattern(db, "order ref", "ref 555-0000")
+    assert repeat["source"] == "cache" and repeat["pattern_id"] == results[1]["pattern_id"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_generation_returns_first_verified_candidate(monkeypatch):
+    """Test slow candidates are hedged, rejected ones replaced and the rest cancelled"""
+    calls = []
+    cancelled = []
+
+    async def fake_generate(description, sample_text, expected_matches=None, temperature=0.3):
+        index = len(calls)
+        calls.append(temperature)
+        try:
+            # The first call stalls, the second guesses wrong, the third is right
+            await asyncio.sleep([5, 0, 0.01][index])
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        pattern = [r"\d{3}-\d{4}", r"[a-z]+", r"\d{3}-\d{4}"][index]
+        return {"pattern": pattern, "explanation": str(index), "test_cases": [], "flags": ""}
+
+    monkeypatch.setattr(generation_service, "generate_regex_with_ai", fake_generate)
+    generation = await produce_hedged_generation("phone", "call 555-1234", "555-1234", candidates=3, hedge_delay=0.05)
+    await asyncio.sleep(0)
+
+    assert generation["explanation"] == "2"
+    assert calls == [0.3, generation_service.HEDGE_TEMPERATURE, generation_service.HEDGE_TEMPERATURE]
+    assert cancelled == [0]
+
+
+@pytest.mark.asyncio
+async def test_hedged_generation_falls_back_to_first_candidate(monkeypatch):
+    """Test the first arrived candidate is returned when none passes verification"""
+    async def fake_generate(description, sample_text, expected_matches=None, temperature=0.3):
+        return {"pattern": "x" if temperature == 0.3 else "y", "explanation": "", "test_cases": [], "flags": ""}
+
+    monkeypatch.setattr(generation_service, "generate_regex_with_ai", fake_generate)
+    generation = await produce_hedged_generation("phone", "call 555-1234", candidates=2, hedge_delay=0.05)
+    assert generation["pattern"] == "x"
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_stores_nothing(db, monkeypatch):
+    """Test a provider failure propagates instead of being saved as a pattern"""
+    async def failing_generate(description, sample_text, expected_matches=None):
+        raise AIServiceError("AI provider unavailable")
+
+    monkeypatch.setattr(generation_service, "generate_regex_with_ai", failing_generate)
+    with pytest.raises(AIServiceError):
+        await generate_regex_pattern(db, "phone", "call 555-1234")
+    assert await db.scalar(select(func.count()).select_from(RegexPattern)) == 0
@@ -0,0 +1,161 @@
+"""
+Unit tests for the generation job queue
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.database import Base
+from app.services import job_service
+from app.services.job_service import GenerationJobQueue, job_result
+from app.services.db_service import create_job, claim_next_job, get_job
+
+
+@pytest_asyncio.fixture
+async def sessions(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(job_service, "async_session", factory)
+    yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+def fake_generation(monkeypatch):
+    calls = []
+
+    async def fake_generate(db, description, sample_text, expected_matches=None, bypass_cache=False, candidates=None):
+        calls.append(description)
+        await asyncio.sleep(0.05)
+        if description == "boom":
+            raise RuntimeError("generation failed")
+        return {"pattern": r"\d+", "pattern_id": len(calls), "source": "ai"}
+
+    monkeypatch.setattr(job_service, "generate_regex_pattern", fake_generate)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_background_and_can_be_awaited(sessions, fake_generation):
+    """Test submitted jobs are processed by the workers and long polling returns the outcome"""
+    queue = GenerationJobQueue()
+    await queue.start(workers=2)
+    try:
+        jobs = [await queue.submit(f"job {index}", "1 2 3") for index in range(3)]
+        failing = await queue.submit("boom", "x")
+        assert jobs[0].status == "queued"
+
+        done = [await queue.wait(job.id, 5) for job in jobs]
+        assert [job.status for job in done] == ["succeeded"] * 3
+        assert job_result(done[0])["pattern"] == r"\d+"
+
+        failed = await queue.wait(failing.id, 5)
+        assert failed.status == "failed" and failed.error == "generation failed"
+        assert await queue.wait(12345, 0) is None
+    finally:
+        await queue.stop()
+    assert sorted(fake_generation) == ["boom", "job 0", "job 1", "job 2"]
+
+
+@pytest.mark.asyncio
+async def test_interrupted_jobs_are_requeued_on_start(sessions, fake_generation, monkeypatch):
+    """Test jobs left running by a crashed process run again, up to the attempt limit"""
+    monkeypatch.setattr(job_service, "JOB_MAX_ATTEMPTS", 2)
+    async with sessions() as db:
+        interrupted = await create_job(db, "interrupted", "1")
+        poisoned = await create_job(db, "poisoned", "1")
+        live = await create_job(db, "live", "1")
+        for _ in range(3):
+            await claim_next_job(db)
+        # Jobs started before the lease timeout are abandoned; the live one isn't
+        expired = datetime.utcnow() - timedelta(seconds=job_service.JOB_LEASE_TIMEOUT + 1)
+        (await get_job(db, interrupted.id)).started_at = expired
+        job = await get_job(db, poisoned.id)
+        job.started_at = expired
+        job.attempts = 2
+        await db.commit()
+
+    queue = GenerationJobQueue()
+    await queue.start(workers=1)
+    try:
+        assert (await queue.wait(interrupted.id, 5)).status == "succeeded"
+        poisoned = await queue.wait(poisoned.id, 0)
+        assert poisoned.status == "failed" and poisoned.attempts == 2
+        assert (await queue.wait(live.id, 0)).status == "running"
+    finally:
+        await queue.stop()
+    assert fake_generation == ["interrupted"]
+
+
+@pytest.mark.asyncio
+async def test_stop_requeues_jobs_in_progress(sessions, monkeypatch):
+    """Test jobs running when the queue stops go back in the queue without using up an attempt"""
+    started = asyncio.Event()
+
+    async def slow_generate(db, description, sample_text, expected_matches=None, bypass_cache=False, candidates=None):
+        started.set()
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(job_service, "generate_regex_pattern", slow_generate)
+    queue = GenerationJobQueue()
+    await queue.start(workers=1)
+    try:
+        job = await queue.submit("slow", "1")
+        await asyncio.wait_for(started.wait(), 5)
+    finally:
+        await queue.stop()
+
+    async with sessions() as db:
+        job = await get_job(db, job.id)
+    assert job.status == "queued" and job.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_polling_leaves_no_waiter_state(sessions, fake_generation):
+    """Test waits on missing, unfinished and finished jobs don't accumulate events"""
+    queue = GenerationJobQueue()
+    job = await queue.submit("job", "1")
+    for _ in range(3):
+        assert await queue.wait(12345, 0) is None
+        assert (await queue.wait(job.id, 0)).status == "queued"
+        assert (await queue.wait(job.id, 0.01)).status == "queued"
+    assert queue._finished == {} and not queue._waiters
+
+    await queue.start(workers=1)
+    try:
+        waits = [queue.wait(job.id, 5) for _ in range(2)]
+        assert [done.status for done in await asyncio.gather(*waits)] == ["succeeded"] * 2
+    finally:
+        await queue.stop()
+    assert queue._finished == {} and not queue._waiters
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_errors_recording_outcome(sessions, fake_generation, monkeypatch):
+    """Test a database error while finishing a job fails that job and the worker carries on"""
+    real_finish_job = job_service.finish_job
+    calls = []
+
+    async def flaky_finish_job(db, job_id, result=None, error=None):
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        await real_finish_job(db, job_id, result=result, error=error)
+
+    monkeypatch.setattr(job_service, "finish_job", flaky_finish_job)
+    queue = GenerationJobQueue()
+    await queue.start(workers=1)
+    try:
+        first = await queue.submit("first", "1")
+        second = await queue.submit("second", "2")
+
+        failed = await queue.wait(first.id, 5)
+        assert failed.status == "failed" and "database is locked" in failed.error
+        assert (await queue.wait(second.id, 5)).status == "succeeded"
+    finally:
+        await queue.stop()
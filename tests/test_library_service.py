@@ -0,0 +1,50 @@
+"""
+Unit tests for the pattern library scanner
+"""
+from app.services.library_service import PatternLibrary, run_library_scan
+
+
+def _scan(library, text):
+    shards, standalone = library.snapshot()
+    return run_library_scan(shards, standalone, text)
+
+
+def test_scan_reports_every_matching_pattern():
+    """Test that overlapping patterns are all reported in one scan"""
+    library = PatternLibrary(shard_size=8)
+    library.load([(1, r"\d+"), (2, r"\d{3}-\d{4}"), (3, r"[A-Z]{3}")])
+    
+    hits = _scan(library, "call 555-1234 now")
+    
+    assert hits[1] == [[5, 8], [9, 13]]
+    assert hits[2] == [[5, 13]]
+    assert 3 not in hits
+
+
+def test_standalone_and_invalid_patterns():
+    """Test backreference patterns are scanned alone and invalid ones skipped"""
+    library = PatternLibrary(shard_size=8)
+    library.load([(1, r"(\w)\1"), (2, r"[a-z"), (3, r"o+")])
+    
+    stats = library.stats()
+    assert stats["standalone"] == 1
+    assert stats["invalid"] == 1
+    
+    hits = _scan(library, "book")
+    assert hits == {1: [[1, 3]], 3: [[1, 3]]}
+
+
+def test_updates_only_rebuild_their_shard():
+    """Test incremental invalidation of shard matchers"""
+    library = PatternLibrary(shard_size=2)
+    library.load([(1, "a"), (2, "b"), (3, "c")])
+    library.snapshot()
+    assert library.rebuilds == 2
+    
+    library.upsert(3, "z")
+    library.remove(1)
+    hits = _scan(library, "abcz")
+    
+    # Shard 0 emptied out; only shard 1 needed a rebuild
+    assert library.rebuilds == 3
+    assert hits == {2: [[1, 2]], 3: [[3, 4]]}
@@ -0,0 +1,102 @@
+"""
+Unit tests for live regex sessions
+"""
+import random
+
+import regex
+
+from app.services.live_session import LiveSession, handle_live_message
+
+
+def _full_scan(pattern, text):
+    return [(m.start(), m.end()) for m in regex.finditer(pattern, text)]
+
+
+def _spans(session):
+    return [(m["start"], m["end"]) for m in session.matches]
+
+
+def test_edit_rescans_only_affected_window():
+    """Test an edit far from other matches leaves them untouched and shifted"""
+    session = LiveSession()
+    session.set_text("id 12 " + "x" * 200 + " id 34")
+    session.set_pattern(r"\d+")
+
+    update = session.apply_edit(0, 0, "99 ")
+
+    assert update["type"] == "update"
+    assert update["delta"] == 3
+    assert [m["full_match"] for m in update["matches"]] == ["99", "12"]
+    assert update["old_end"] < 200
+    assert _spans(session) == _full_scan(r"\d+", session.text)
+
+
+def test_edit_extends_match_across_window_edge():
+    """Test a match that grows past the re-scanned window is still found whole"""
+    session = LiveSession()
+    session.set_pattern(r"a+")
+    session.set_text("b" + "a" * 500)
+
+    update = session.apply_edit(0, 1, "a")
+
+    assert update["matches"][0]["end"] == 501
+    assert _spans(session) == [(0, 501)]
+
+
+def test_edit_completes_match_starting_far_before_it():
+    """Test a match beginning well before the edit's context is found from its start"""
+    session = LiveSession()
+    session.set_pattern(r"a+b")
+    session.set_text("a" * 100 + "x")
+
+    session.apply_edit(100, 101, "b")
+    assert _spans(session) == [(0, 101)]
+
+    session.set_pattern(r"[\w.]+@\w+\.com")
+    session.set_text("mail " + "first.last" * 8 + "@example.co")
+    session.apply_edit(len(session.text), len(session.text), "m")
+    assert _spans(session) == [(5, 97)]
+
+
+def test_edit_keeps_match_ending_far_after_it():
+    """Test a match that the edit shortens but doesn't remove is found again"""
+    session = LiveSession()
+    session.set_pattern(r"a.*?b")
+    session.set_text("a" + "x" * 100 + "a" + "x" * 100 + "b")
+
+    session.apply_edit(0, 1, "")
+    assert _spans(session) == [(100, 202)]
+
+
+def test_random_edits_match_full_rescan():
+    """Test incremental results equal a full rescan after many edits"""
+    cases = [
+        (r"\b\w+@\w+\.com\b|\d{2,4}", "ab1 @.com", "ab12 @.com"),
+        # Long left-hand matches and runs that only match once the edit completes them
+        (r"a+b|[\w.]+@\w+\.com", "a" * 200 + "x", "ab"),
+        (r"[\w.]+@\w+\.com", "a" * 100 + ".@x", "a@.com"),
+        (r"a*", "aab", "ab"),
+        # Long lazy matches that an edit near their start moves or shortens
+        (r"a.*?b", "a" * 10 + "x" * 150 + "b", "x"),
+    ]
+    for seed, (pattern, alphabet, insert_alphabet) in enumerate(cases):
+        rng = random.Random(seed)
+        session = LiveSession()
+        session.set_pattern(pattern)
+        session.set_text("".join(rng.choice(alphabet) for _ in range(400)))
+
+        for _ in range(200):
+            start = rng.randint(0, len(session.text))
+            end = min(len(session.text), start + rng.randint(0, 5))
+            replacement = "".join(rng.choice(insert_alphabet) for _ in range(rng.randint(0, 6)))
+            session.apply_edit(start, end, replacement)
+            assert _spans(session) == _full_scan(pattern, session.text)
+
+
+def test_handle_live_message_errors():
+    """Test invalid patterns and bad edits are reported, not raised"""
+    session = LiveSession()
+
+    assert handle_live_message(session, {"type": "pattern", "pattern": "[a-"})["error"]
+    assert handle_live_message(session, {"type": "edit", "start": 5, "end": 9, "text": ""})["type"] == "error"
+    assert handle_live_message(session, {"type": "unknown"})["type"] == "error"
@@ -0,0 +1,35 @@
+"""
+Unit tests for the provider rate limiter
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.rate_limiter import RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_limits_requests_and_tokens():
+    """Test calls beyond a bucket's burst wait for it to refill"""
+    limiter = RateLimiter(requests_per_minute=600)
+    started = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(602)))
+    # 600 fit the burst, two more need 0.1s each at 10 requests per second
+    assert 0.15 < time.monotonic() - started < 1
+
+    limiter = RateLimiter(tokens_per_minute=6000)
+    await limiter.acquire(6000)
+    started = time.monotonic()
+    await limiter.acquire(10)
+    assert 0.05 < time.monotonic() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_disabled_limiter_never_waits():
+    """Test a limiter without limits lets calls through at once"""
+    limiter = RateLimiter()
+    assert not limiter.enabled
+    started = time.monotonic()
+    await asyncio.gather(*(limiter.acquire(10 ** 6) for _ in range(1000)))
+    assert time.monotonic() - started < 0.5
@@ -0,0 +1,42 @@
+"""
+Unit tests for the static ReDoS analyzer
+"""
+import pytest
+from app.services.redos_service import analyze_pattern
+
+
+@pytest.mark.parametrize("pattern", [
+    r"(a+)+$",
+    r"(a|aa)+$",
+    r"(\w+\s?)*$",
+    r"^(([a-z])+.)+[A-Z]([a-z])+$",
+])
+def test_exponential_patterns_are_high_risk(pattern):
+    """Test classic catastrophic backtracking patterns"""
+    assert analyze_pattern(pattern)["level"] == "high"
+
+
+@pytest.mark.parametrize("pattern", [
+    r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+    r"\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12][0-9]|3[01])",
+    r"(?:\s*,\s*\w+)*",
+    r"(\d+,)*",
+    r"(?>a+)+",
+])
+def test_safe_patterns_are_low_risk(pattern):
+    """Test that common linear patterns aren't flagged"""
+    assert analyze_pattern(pattern)["level"] == "low"
+
+
+def test_adjacent_quantifiers_are_medium_risk():
+    """Test polynomial structures"""
+    result = analyze_pattern(r"\d+\d+x")
+    assert result["level"] == "medium"
+    assert result["findings"][0]["kind"] == "adjacent_quantifiers"
+
+
+def test_regex_module_syntax_falls_back_to_heuristic():
+    """Test patterns the standard parser can't read"""
+    result = analyze_pattern(r"(\p{L}+)+")
+    assert result["parsed"] is False
+    assert result["level"] == "high"
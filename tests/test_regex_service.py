@@ -1,6 +1,9 @@
 """
 Unit tests for regex service
 """
+import threading
+import time
+
 import pytest
 from app.services.regex_service import test_regex
 
@@ -80,4 +83,308 @@ async def test_with_flags():
     result = await test_regex(r"test", "This is a TEST")
     
     assert result["success"] is True
-    assert result["match_count"] == 0
\ No newline at end of file
+    assert result["match_count"] == 0
+
+def test_pattern_cache_hits_and_evictions():
+    """Test the compiled pattern cache counters and LRU eviction"""
+    from app.services.regex_service import PatternCache
+    
+    cache = PatternCache(maxsize=2)
+    first = cache.get(r"\d+")
+    assert cache.get(r"\d+") is first
+    cache.get(r"\w+")
+    cache.get(r"\s+")  # evicts \d+
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+def test_pattern_cache_stores_compile_errors():
+    """Test that invalid patterns are compiled only once"""
+    import regex
+    from app.services.regex_service import PatternCache
+    
+    cache = PatternCache(maxsize=4)
+    errors = []
+    for _ in range(3):
+        with pytest.raises(regex.error) as exc_info:
+            cache.get(r"[a-z")
+        errors.append(exc_info.value)
+    
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+    
+    # Each hit raises a new error, so tracebacks don't pile up on a shared instance
+    assert len({id(error) for error in errors}) == 3
+    with pytest.raises(regex.error) as expected:
+        regex.compile(r"[a-z")
+    assert all(str(error) == str(expected.value) and error.pos == expected.value.pos for error in errors)
+
+
+@pytest.mark.asyncio
+async def test_catastrophic_pattern_times_out():
+    """Test that a runaway pattern is cut off and its worker replaced"""
+    from app.services.regex_executor import RegexSandbox, set_executor
+    
+    sandbox = RegexSandbox(size=1)
+    previous = set_executor(sandbox)
+    try:
+        result = await test_regex(r"(a|aa)+$", "a" * 45 + "b", timeout=0.5)
+        
+        assert result["success"] is False
+        assert result["timed_out"] is True
+        assert sandbox.restarts == 1
+        
+        # The replacement worker keeps serving requests
+        result = await test_regex(r"\d+", "There are 123 items")
+        assert result["success"] is True
+        assert result["match_count"] == 1
+    finally:
+        set_executor(previous)
+
+
+def test_sandbox_replaces_worker_after_any_failure():
+    """Test a call failing in the parent doesn't lose its worker"""
+    from app.services.regex_executor import RegexSandbox
+    
+    sandbox = RegexSandbox(size=1)
+    try:
+        # Lambdas can't be pickled, so sending the job fails before the worker sees it
+        with pytest.raises(Exception):
+            sandbox.call(len, lambda: None)
+        
+        result = []
+        caller = threading.Thread(target=lambda: result.append(sandbox.call(len, "abc")), daemon=True)
+        caller.start()
+        caller.join(timeout=10)
+        assert result == [3]
+    finally:
+        sandbox.shutdown()
+
+
+def test_sandbox_shutdown_stops_busy_workers():
+    """Test shutdown kills workers in the middle of a call and fails waiting calls"""
+    from app.services.regex_executor import RegexSandbox, RegexWorkerError
+    
+    sandbox = RegexSandbox(size=1)
+    sandbox.start()
+    (worker,) = sandbox._workers
+    errors = []
+    
+    def call():
+        try:
+            sandbox.call(time.sleep, 30, timeout=60)
+        except RegexWorkerError as e:
+            errors.append(e)
+    
+    callers = [threading.Thread(target=call, daemon=True) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.5)
+    sandbox.shutdown()
+    for caller in callers:
+        caller.join(timeout=10)
+    
+    assert not worker.process.is_alive()
+    assert len(errors) == 2
+    assert sandbox._workers == set()
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_timeout():
+    """Test that the thread pool backend enforces the budget via the regex module"""
+    from app.services.regex_executor import RegexThreadExecutor, set_executor
+    
+    previous = set_executor(RegexThreadExecutor(size=2))
+    try:
+        result = await test_regex(r"(a|aa)+$", "a" * 45 + "b", timeout=0.2)
+        assert result["success"] is False
+        assert result["timed_out"] is True
+        
+        result = await test_regex(r"(\w+)@(\w+)", "user@example")
+        assert result["success"] is True
+        assert result["matches"][0]["groups"][1]["content"] == "example"
+    finally:
+        set_executor(previous)
+
+
+def test_iter_regex_matches_streams_with_summary():
+    """Test that streamed match records end with a summary trailer"""
+    from app.services.regex_service import iter_regex_matches
+    
+    records = list(iter_regex_matches(r"\d+", "1 22 333"))
+    
+    assert [r["full_match"] for r in records[:-1]] == ["1", "22", "333"]
+    assert records[-1] == {
+        "type": "summary", "success": True, "match_count": 3, "risk_score": 0, "risk_level": "low"
+    }
+    
+    records = list(iter_regex_matches(r"[a-z", "abc"))
+    assert len(records) == 1
+    assert records[0]["success"] is False
+
+
+@pytest.mark.asyncio
+async def test_max_matches_and_resume_offset():
+    """Test truncation and paging with the resume cursor"""
+    text = "a1 b22 c333 d4444"
+    
+    result = await test_regex(r"\d+", text, max_matches=2)
+    assert [m["full_match"] for m in result["matches"]] == ["1", "22"]
+    assert result["truncated"] is True
+    
+    result = await test_regex(r"\d+", text, offset=result["next_offset"], max_matches=2)
+    assert [m["full_match"] for m in result["matches"]] == ["333", "4444"]
+    assert result["truncated"] is False
+    assert result["next_offset"] is None
+
+
+@pytest.mark.asyncio
+async def test_count_only():
+    """Test counting matches without match details"""
+    result = await test_regex(r"\w", "abc def", count_only=True)
+    
+    assert result["success"] is True
+    assert result["match_count"] == 6
+    assert result["matches"] is None
+
+
+@pytest.mark.asyncio
+async def test_compact_match_format():
+    """Test columnar span arrays with a non-participating group"""
+    result = await test_regex(r"(\d)(x)?", "a 1 b 2x", compact=True)
+    
+    assert result["match_count"] == 2
+    assert result["matches"] is None
+    assert result["compact"] == {
+        "group_count": 2,
+        "starts": [[2, 6], [2, 6], [-1, 7]],
+        "ends": [[3, 8], [3, 7], [-1, 8]],
+    }
+
+
+@pytest.mark.asyncio
+async def test_regex_batch_grid():
+    """Test the pattern x text grid with a bad pattern isolated to its row"""
+    from app.services.regex_service import test_regex_batch
+    
+    rows = await test_regex_batch(
+        [(r"\d+", ""), (r"[a-z", ""), (r"ERROR", "i")],
+        ["error 1 2", "ok 33"]
+    )
+    
+    assert [cell["match_count"] for cell in rows[0]["cells"]] == [2, 1]
+    assert rows[0]["cells"][1]["spans"] == [[3, 5]]
+    assert rows[1]["success"] is False
+    assert rows[1]["cells"] == []
+    assert [cell["match_count"] for cell in rows[2]["cells"]] == [1, 0]
+
+
+def test_file_matching_reports_lines(tmp_path):
+    """Test memory-mapped file matching with byte offsets and line numbers"""
+    from app.services.regex_service import run_regex_file_test
+    
+    path = tmp_path / "sample.log"
+    path.write_bytes("first line\nERROR café 42\nok\nERROR 7\n".encode("utf-8"))
+    
+    result = run_regex_file_test(str(path), r"ERROR \S+ ?\d*", max_matches=1)
+    assert result["matches"][0]["line"] == 2
+    assert result["matches"][0]["column"] == 1
+    assert result["matches"][0]["full_match"] == "ERROR café 42"
+    assert result["truncated"] is True
+    
+    result = run_regex_file_test(str(path), r"\d+", offset=result["next_offset"])
+    assert [(m["full_match"], m["line"]) for m in result["matches"]] == [("7", 4)]
+    
+    # Columns stay right with many matches on one long line
+    path.write_bytes(b"x\n" + b"ab " * 1000)
+    result = run_regex_file_test(str(path), r"b")
+    assert result["match_count"] == 1000
+    assert (result["matches"][-1]["line"], result["matches"][-1]["column"]) == (2, 2999)
+
+
+@pytest.mark.asyncio
+async def test_file_matching_timeout_in_thread_executor(tmp_path):
+    """Test a file scan timing out in-process reports timed_out instead of failing to unmap"""
+    from app.services.regex_executor import RegexThreadExecutor, set_executor
+    from app.services.regex_service import test_regex_file
+    
+    path = tmp_path / "catastrophic.txt"
+    path.write_bytes(b"ok\n" + b"a" * 45 + b"b")
+    previous = set_executor(RegexThreadExecutor(size=1))
+    try:
+        result = await test_regex_file(str(path), r"(a|aa)+$", timeout=0.2)
+        assert result["success"] is False
+        assert result["timed_out"] is True
+    finally:
+        set_executor(previous)
+
+
+def test_redos_policy_applies_to_streamed_tests(monkeypatch):
+    """Test streamed tests reject or downgrade high-risk patterns like test_regex"""
+    from app.services import regex_service
+    from app.services.regex_service import iter_regex_matches
+    
+    monkeypatch.setattr(regex_service, "REDOS_POLICY", "reject")
+    summary = list(iter_regex_matches(r"(a+)+$", "a" * 45 + "b"))[-1]
+    assert summary["success"] is False and summary["error"].startswith("Pattern rejected")
+    assert summary["risk_level"] == "high"
+    
+    # Downgraded patterns get the short budget instead of the requested one
+    monkeypatch.setattr(regex_service, "REDOS_POLICY", "downgrade")
+    monkeypatch.setattr(regex_service, "REDOS_DOWNGRADE_TIMEOUT", 0.1)
+    summary = list(iter_regex_matches(r"(a|aa)+$", "a" * 45 + "b", timeout=30))[-1]
+    assert summary["timed_out"] is True and "0.1s" in summary["error"]
+
+
+@pytest.mark.asyncio
+async def test_redos_policy_applies_to_batch_rows(monkeypatch):
+    """Test batch rows reject or downgrade high-risk patterns like test_regex"""
+    from app.services import regex_service
+    from app.services.regex_executor import RegexThreadExecutor, set_executor
+    from app.services.regex_service import test_regex_batch
+    
+    monkeypatch.setattr(regex_service, "REDOS_POLICY", "reject")
+    rows = await test_regex_batch([(r"(a+)+$", ""), (r"\d+", "")], ["1 2"])
+    assert rows[0]["success"] is False and rows[0]["error"].startswith("Pattern rejected")
+    assert rows[1]["success"] is True and rows[1]["risk_level"] == "low"
+    
+    # Downgraded rows get the short cell budget instead of the requested one
+    monkeypatch.setattr(regex_service, "REDOS_POLICY", "downgrade")
+    monkeypatch.setattr(regex_service, "REDOS_DOWNGRADE_TIMEOUT", 0.1)
+    previous = set_executor(RegexThreadExecutor(size=2))
+    try:
+        rows = await test_regex_batch([(r"(a|aa)+$", "")], ["a" * 45 + "b"], timeout=30)
+        assert rows[0]["cells"][0]["timed_out"] is True and "0.1s" in rows[0]["cells"][0]["error"]
+        assert rows[0]["risk_level"] == "high"
+    finally:
+        set_executor(previous)
+
+
+@pytest.mark.asyncio
+async def test_redos_policy_applies_to_file_tests(tmp_path, monkeypatch):
+    """Test file tests reject or downgrade high-risk patterns like test_regex"""
+    from app.services import regex_service
+    from app.services.regex_executor import RegexThreadExecutor, set_executor
+    from app.services.regex_service import test_regex_file
+    
+    path = tmp_path / "sample.txt"
+    path.write_bytes(b"a" * 45 + b"b")
+    
+    monkeypatch.setattr(regex_service, "REDOS_POLICY", "reject")
+    result = await test_regex_file(str(path), r"(a+)+$")
+    assert result["success"] is False and result["error"].startswith("Pattern rejected")
+    
+    # Downgraded patterns get the short budget instead of the requested one
+    monkeypatch.setattr(regex_service, "REDOS_POLICY", "downgrade")
+    monkeypatch.setattr(regex_service, "REDOS_DOWNGRADE_TIMEOUT", 0.1)
+    previous = set_executor(RegexThreadExecutor(size=2))
+    try:
+        result = await test_regex_file(str(path), r"(a|aa)+$", timeout=30)
+        assert result["timed_out"] is True and result["risk_level"] == "high"
+    finally:
+        set_executor(previous)
@@ -0,0 +1,72 @@
+"""
+Unit tests for the result cache
+"""
+import asyncio
+
+import pytest
+
+from app.services.result_cache import ResultCache, content_key
+from app.services.regex_service import test_regex_cached as run_cached_test, result_cache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_lookups_share_one_computation():
+    """Test single-flight coalescing of identical keys"""
+    cache = ResultCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"success": True, "value": 42}
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    assert calls == 1
+    assert [source for _, source in results].count("computed") == 1
+    assert all(value == {"success": True, "value": 42} for value, _ in results)
+    assert (await cache.get_or_compute("k", compute))[1] == "cache"
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached():
+    """Test results rejected by the cacheable check are recomputed"""
+    cache = ResultCache()
+
+    async def compute():
+        return {"success": False}
+
+    await cache.get_or_compute("k", compute, cacheable=lambda value: value["success"])
+    _, source = await cache.get_or_compute("k", compute, cacheable=lambda value: value["success"])
+
+    assert source == "computed"
+    assert cache.stats()["entries"] == 0
+
+
+def test_byte_budget_evicts_least_recently_used():
+    """Test the cache stays within its byte budget"""
+    cache = ResultCache(max_bytes=300)
+    for i in range(5):
+        cache.put(content_key(i), "x" * 50)
+    cache.put(content_key("huge"), "x" * 1000)
+
+    stats = cache.stats()
+    assert stats["size_bytes"] <= 300
+    assert stats["evictions"] > 0
+    assert cache.get(content_key(4)) is not None
+    assert cache.get(content_key(0)) is None
+    assert cache.get(content_key("huge")) is None
+
+
+@pytest.mark.asyncio
+async def test_regex_results_are_cached_by_content():
+    """Test identical regex tests are served from the result cache"""
+    result_cache.clear()
+
+    first = await run_cached_test(r"\d+", "a 1 b 22")
+    second = await run_cached_test(r"\d+", "a 1 b 22")
+
+    assert first is second
+    assert first["match_count"] == 2
+    assert result_cache.stats()["hits"] == 1
@@ -0,0 +1,33 @@
+"""
+Unit tests for token-budgeted sample text reduction
+"""
+from app.services.ai_service import build_generation_prompt
+from app.services.sample_reducer import reduce_sample_text, line_shape, estimate_tokens
+
+
+def test_small_samples_are_unchanged():
+    """Test a sample within the budget is passed through as is"""
+    assert reduce_sample_text("a 1\nb 2", "b 2", max_tokens=100) == ("a 1\nb 2", 2, 2)
+    assert "Sample text:\n```\na 1\nb 2\n```" in build_generation_prompt("pairs", "a 1\nb 2")
+
+
+def test_reduction_keeps_matches_and_every_shape():
+    """Test a large sample keeps expected-match lines and one line per shape within the budget"""
+    lines = [f"2024-01-{i % 28 + 1:02d} INFO user{i} logged in" for i in range(2000)]
+    lines[700] = "-- heartbeat --"
+    lines[1500] = "2024-01-05 WARN order #A-99812 delayed"
+    excerpt, kept, total = reduce_sample_text("\n".join(lines), "A-99812", max_tokens=200)
+
+    assert total == 2000 and kept == len(excerpt.splitlines())
+    assert estimate_tokens(excerpt) <= 200
+    assert "2024-01-05 WARN order #A-99812 delayed" in excerpt
+    assert "-- heartbeat --" in excerpt
+    # Representatives are spread over the text and stay in their original order
+    numbers = [int(line.split("user")[1].split()[0]) for line in excerpt.splitlines() if "user" in line]
+    assert numbers == sorted(numbers) and numbers[-1] > 1000
+
+
+def test_line_shape():
+    """Test lines differing only in digits and words of the same case share a shape"""
+    assert line_shape("2024-01-02 ERROR disk full") == line_shape("2023-11-30 ERROR out of memory")
+    assert line_shape("2024-01-02 ERROR disk") != line_shape("Error: disk")
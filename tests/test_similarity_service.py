@@ -0,0 +1,48 @@
+"""
+Unit tests for the request similarity index
+"""
+from datetime import datetime, timedelta
+
+from app.services.similarity_service import SimilarityIndex
+
+
+def test_query_ranks_paraphrases_above_unrelated_requests():
+    """Test trigram similarity finds paraphrases and ignores unrelated requests"""
+    index = SimilarityIndex()
+    now = datetime.utcnow()
+    index.load([
+        (1, 10, "US phone number", None, "", now),
+        (2, 20, "email address", None, "i", now),
+        (3, 30, "IPv4 address", None, "", now),
+    ])
+
+    assert [pattern_id for pattern_id, _, _ in index.query("match email addresses")] == [20]
+    assert index.query("a US phone number")[0][:2] == (10, "")
+    assert index.query("hex colour code") == []
+
+
+def test_one_candidate_per_pattern():
+    """Test several requests for one pattern yield a single candidate"""
+    index = SimilarityIndex()
+    index.add(1, 10, "US phone number")
+    index.add(2, 10, "US phone numbers")
+
+    results = index.query("US phone number")
+    assert len(results) == 1
+    assert results[0][2] == 1.0
+
+
+def test_removed_and_expired_requests_are_not_offered():
+    """Test removed requests and requests past the max age drop out of the index"""
+    index = SimilarityIndex()
+    index.add(1, 10, "US phone number")
+    index.add(2, 20, "email address", created_at=datetime.utcnow() - timedelta(hours=2))
+
+    assert index.remove([1, 99]) == 1
+    assert index.query("US phone number") == []
+    assert index.query("email address", max_age=3600) == []
+    assert index.stats() == {"requests": 0, "trigrams": 0}
+
+    index.add(3, 30, "IPv4 address")
+    index.clear()
+    assert index.query("IPv4 address") == [] and index.loaded is False
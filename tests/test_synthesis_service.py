@@ -0,0 +1,42 @@
+"""
+Unit tests for the offline pattern synthesizer
+"""
+import itertools
+
+from app.services import synthesis_service
+from app.services.synthesis_service import synthesize_pattern, expected_spans
+
+
+def test_synthesizes_fixed_width_structure():
+    """Test digit runs of constant length keep their counts"""
+    result = synthesize_pattern("555-1234\n555-9876", "call 555-1234 or 555-9876, ext 12")
+    assert result["pattern"] == r"\d{3}-\d{4}"
+    assert result["test_cases"] == [
+        {"text": "555-1234", "should_match": True},
+        {"text": "555-9876", "should_match": True},
+    ]
+
+
+def test_sample_text_acts_as_negative_evidence():
+    """Test a candidate matching more than the expected spans is rejected"""
+    result = synthesize_pattern("ID-123\nAB-9", "ID-123 and AB-9 but not XID-12")
+    assert result["pattern"] == r"\b[A-Z]{2}-\d+\b"
+    assert "word boundaries" in result["explanation"]
+
+
+def test_gives_up_when_nothing_fits():
+    """Test unaligned examples and examples missing from the text yield None"""
+    assert synthesize_pattern("a@b.io\nx.y@mail.example.com", "a@b.io, x.y@mail.example.com") is None
+    assert synthesize_pattern("555-0000", "call 555-1234") is None
+    assert expected_spans(["ab"], "ab xab") == [(0, 2), (4, 6)]
+
+
+def test_timeout_is_shared_by_all_candidates(monkeypatch):
+    """Test the budget runs out across candidates, not per candidate"""
+    # Each clock reading is a second later than the last
+    clock = itertools.count()
+    monkeypatch.setattr(synthesis_service.time, "monotonic", lambda: next(clock))
+    
+    # The winning candidate comes after a rejected one
+    assert synthesize_pattern("ID-123\nAB-9", "ID-123 and AB-9 but not XID-12", timeout=1.5) is None
+    assert synthesize_pattern("ID-123\nAB-9", "ID-123 and AB-9 but not XID-12", timeout=100) is not None